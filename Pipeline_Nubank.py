@@ -2,106 +2,638 @@ import pandas as pd
 import os
 from pathlib import Path
 import numpy as np
-import math
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from armazenamento import salvar_dataset, carregar_dataset, colunas_dataset, ler_dataset_em_chunks, EscritorIncremental
+from banco_transacoes import eh_banco, atualizar_banco
+from ciclo_fatura import DIA_FECHAMENTO
+from conciliacao import Deduplicador, caminho_conciliacao, conciliar_creditos, conciliar_pagamentos
+from compactacao import compactar
+from cubo_agregado import caminho_cubo, construir_cubo, combinar_cubos, atualizar_cubo
+from formatacao import formatar_brl
+from instrumentacao import Instrumentacao
+from leitor_extratos import ler_extrato
 
 # --- CONFIGURAÇÃO ---
 # ⚠️ Substitua 'caminho/para/seus/extratos' pelo caminho real da sua pasta
 PASTA_EXTRATOS = Path('C:\\Users\\T-Gamer\\Desktop\\dash-finance\\extratos')
-ARQUIVO_SAIDA = 'extratos_nubank_consolidado_analise.csv'
+ARQUIVO_SAIDA = 'extratos_nubank_consolidado_analise.csv' # .parquet/.feather: colunar tipada; .sqlite: banco local indexado
 COLUNA_DATA_ORIGINAL = 'date' # Coluna que contém a data da transação no seu extrato
+# Manifesto do modo incremental: tamanho, mtime e hash de cada extrato já processado
+ARQUIVO_MANIFESTO = 'extratos_nubank_manifesto.json'
+COLUNA_ORIGEM = 'arquivo_origem' # Nome do extrato de onde veio cada transação
+NUM_WORKERS = 1 # Extratos processados em paralelo (1 = sequencial)
+TIPO_EXECUTOR = 'thread' # 'thread' ou 'process' (processos contornam o GIL nas transformações)
+TAMANHO_CHUNK = None # Linhas por bloco no modo streaming (None = carrega cada extrato inteiro)
+GERAR_CUBO = True # Materializa o cubo de agregados (<saída>_cubo.<ext>) ao lado do consolidado
+# Grava a coluna texto 'valor_formatado' (R$ 1.234,56) na saída. Desligado, o valor é
+# formatado só na exibição (formatacao.formatar_brl) e os arquivos ficam menores.
+# ⚠️ Mudança no esquema da saída: com o padrão (False), o consolidado não tem mais
+# 'valor_formatado' e ganhou COLUNA_ORIGEM (usada pelo modo incremental). Relatórios do
+# Power BI/Excel que usem 'valor_formatado' precisam de True (ou formatar 'amount').
+GRAVAR_VALOR_FORMATADO = False
+# Extratos consecutivos se sobrepõem: remove as transações que já vieram de um
+# extrato processado antes (ver conciliacao.py)
+DEDUPLICAR = True
+# Pareia estornos/créditos com o débito de origem e pagamentos com a fatura que quitam,
+# gravando os pares ao lado do consolidado (<saída>_conciliacao_creditos/_pagamentos;
+# ver conciliacao.py). Percorre o histórico inteiro a cada execução.
+CONCILIAR = False
+# Métricas de cada etapa (tempo, linhas, bytes lidos, pico de memória) acrescentadas a
+# um JSON Lines a cada execução, para acompanhar a evolução (None = não grava)
+ARQUIVO_METRICAS = None
+# Devolve o consolidado na representação compacta (textos como category, valor em
+# centavos int64, semanas em int8; ver compactacao.py). Os arquivos gravados não mudam.
+REPRESENTACAO_COMPACTA = False
 
-def criar_pipeline_nubank_etl(pasta_origem, arquivo_saida, coluna_data):
-    """
-    Pipeline que extrai, consolida, transforma e carrega os extratos mensais do Nubank.
+
+# =================================================================
+# FUNÇÕES AUXILIARES DO MODO INCREMENTAL (MANIFESTO)
+# =================================================================
+
+def _hash_arquivo(arquivo, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 do conteúdo do arquivo, lendo em blocos."""
+    h = hashlib.sha256()
+    with open(arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _carregar_manifesto(arquivo_manifesto):
+    """Lê o manifesto salvo na execução anterior (ou retorna vazio)."""
+    try:
+        with open(arquivo_manifesto, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _salvar_manifesto(manifesto, arquivo_manifesto):
+    with open(arquivo_manifesto, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+
+def _comparar_com_manifesto(arquivos_csv, manifesto):
     """
-    
-    # Lista para armazenar todos os DataFrames lidos
-    lista_dfs = []
-    
-    print("--- INICIANDO PIPELINE ETL ---")
-    
-    # =================================================================
-    # ETAPA 1: EXTRAÇÃO E CONSOLIDAÇÃO (UNION)
-    # =================================================================
-    
-    print(f"1. Extraindo arquivos de: {pasta_origem.resolve()}")
-    
-    # Busca por arquivos CSV na pasta
-    arquivos_csv = list(pasta_origem.glob('*.csv'))
+    Compara os extratos da pasta com o manifesto.
 
-    if not arquivos_csv:
-        print("⚠️ ERRO: Nenhum arquivo CSV encontrado na pasta especificada.")
-        return
+    Tamanho e mtime iguais -> arquivo inalterado (o hash nem é recalculado).
+    Se mudaram, o hash decide: conteúdo igual só atualiza o manifesto.
+    Retorna (novo_manifesto, arquivos_para_processar, nomes_removidos).
+    """
+    novo_manifesto = {}
+    para_processar = []
 
     for arquivo in arquivos_csv:
-        try:
-            # Leitura do arquivo CSV. Ajuste o delimitador se necessário (sep=',')
-            df = pd.read_csv(arquivo)
-            lista_dfs.append(df)
-            print(f"   - Arquivo lido: {arquivo.name}")
-        except Exception as e:
-            print(f"   - Falha ao ler {arquivo.name}: {e}")
-            
-    # Consolida todos os DataFrames em um único
-    df_consolidado = pd.concat(lista_dfs, ignore_index=True)
-    print(f"\n2. Consolidação concluída. Total de transações: {len(df_consolidado):,}")
-    
-    # =================================================================
-    # ETAPA 2: TRANSFORMAÇÃO (CRIAÇÃO DE FEATURES)
-    # =================================================================
-    
-    print("3. Iniciando Transformações...")
-    
+        stat = arquivo.stat()
+        anterior = manifesto.get(arquivo.name)
+        entrada = {'tamanho': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+        if anterior and anterior['tamanho'] == entrada['tamanho'] and anterior['mtime'] == entrada['mtime']:
+            novo_manifesto[arquivo.name] = anterior
+            continue
+
+        entrada['sha256'] = _hash_arquivo(arquivo)
+        novo_manifesto[arquivo.name] = entrada
+        if not anterior or anterior.get('sha256') != entrada['sha256']:
+            para_processar.append(arquivo)
+
+    removidos = [nome for nome in manifesto if nome not in novo_manifesto]
+    return novo_manifesto, para_processar, removidos
+
+
+# =================================================================
+# TRANSFORMAÇÕES POR LINHA
+# =================================================================
+
+def _transformar_extratos(df_consolidado, coluna_data):
+    """
+    Cria as colunas derivadas (data, MÊS, SEMANA_DO_MÊS e, se GRAVAR_VALOR_FORMATADO,
+    valor_formatado).
+    Todas dependem só da própria linha, por isso podem ser aplicadas apenas
+    às transações novas no modo incremental.
+    """
     # 3.1. Garantir que a coluna de data é datetime
-    # Fixed code
-    # converter datas (valores inválidos viram NaT)
+    # converter datas (na leitura por ler_extrato elas já chegam como datetime e nada é reprocessado)
     df_consolidado[coluna_data] = pd.to_datetime(df_consolidado[coluna_data])
-    print(f"   - Coluna '{coluna_data}' convertida para datetime (errors='coerce').")
 
-    
-        # garantir amount como float e criar string formatada no padrão brasileiro
+    # garantir amount como float e, se configurado, criar string formatada no padrão brasileiro
     df_consolidado['amount'] = df_consolidado['amount'].astype(float)
-    df_consolidado['valor_formatado'] = df_consolidado['amount'].map(lambda x: f"R$ {x:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.'))
-    print("   - Coluna 'valor_formatado' criada (formato brasileiro R$ X.XXX,XX).")
-    
-    # ...existing code...- Coluna 'valor_formatado' criada (string).")
+    if GRAVAR_VALOR_FORMATADO:
+        df_consolidado['valor_formatado'] = formatar_brl(df_consolidado['amount'])
 
     # criar coluna MÊS com abreviações em pt-br via mapeamento (mais robusto que indexação direta)
     meses_dict = {1: 'jan', 2: 'fev', 3: 'mar', 4: 'abr', 5: 'mai', 6: 'jun',
                   7: 'jul', 8: 'ago', 9: 'set', 10: 'out', 11: 'nov', 12: 'dez'}
     df_consolidado['MÊS'] = df_consolidado[coluna_data].dt.month.map(meses_dict)
-    print("   - Coluna 'MÊS' criada com abreviações.")
 
     # 3.3. Criar a coluna SEMANA_DO_MÊS (Lógica: ceil(Dia / 7))
     # Extrai o dia do mês
     dia_do_mes = df_consolidado[coluna_data].dt.day
-    
+
     # Aplica a lógica: ceil(dia / 7)
     df_consolidado['SEMANA_DO_MÊS'] = np.ceil(dia_do_mes / 7).astype('Int64')
-    print("   - Coluna 'SEMANA_DO_MÊS' criada com sucesso.")
 
     # Opcional: Reordenar colunas para melhor visualização
     cols = ['MÊS', 'SEMANA_DO_MÊS', coluna_data] + [col for col in df_consolidado.columns if col not in ['MÊS', 'SEMANA_DO_MÊS', coluna_data]]
-    df_consolidado = df_consolidado[cols]
+    return df_consolidado[cols]
+
+
+def _dtypes_extrato(coluna_data):
+    """Dtypes explícitos da saída, para que o concat final não precise converter nada."""
+    dtypes = {
+        'MÊS': 'string',
+        'SEMANA_DO_MÊS': 'Int64',
+        coluna_data: 'datetime64[ns]',
+        'title': 'string',
+        'amount': 'float64',
+        COLUNA_ORIGEM: 'string',
+    }
+    if GRAVAR_VALOR_FORMATADO:
+        dtypes['valor_formatado'] = 'string'
+    return dtypes
+
+
+def _ajustar_mantidas(df, coluna_data):
+    """
+    Põe as transações mantidas da saída anterior no layout atual. O
+    valor_formatado é refeito a partir de amount, para que ligar/desligar
+    GRAVAR_VALOR_FORMATADO entre execuções não quebre o modo incremental.
+    """
+    if GRAVAR_VALOR_FORMATADO:
+        df = df.assign(valor_formatado=formatar_brl(df['amount']))
+    dtypes = _dtypes_extrato(coluna_data)
+    return df[list(dtypes)].astype(dtypes)
+
+
+def _processar_extrato(arquivo, coluna_data, instrumentacao=None):
+    """
+    Lê um extrato e aplica as transformações por linha, devolvendo colunas já tipadas.
+    Fica no nível do módulo para poder ser enviada a um ProcessPoolExecutor.
+    Leitura, transformação e tipagem são medidas em `instrumentacao`, se houver.
+    """
+    instrumentacao = Instrumentacao() if instrumentacao is None else instrumentacao
+
+    # Leitura tipada do CSV (data, título e valor já convertidos; ver leitor_extratos.py)
+    with instrumentacao.etapa('leitura', bytes_lidos=arquivo.stat().st_size) as medicao:
+        df = ler_extrato(arquivo, coluna_data)
+        medicao['linhas_saida'] = len(df)
+    df[COLUNA_ORIGEM] = arquivo.name
+    with instrumentacao.etapa('transformacao', linhas_entrada=len(df)) as medicao:
+        df = _transformar_extratos(df, coluna_data)
+        medicao['linhas_saida'] = len(df)
+    with instrumentacao.etapa('tipagem', linhas_entrada=len(df)):
+        return df.astype(_dtypes_extrato(coluna_data))
+
+
+def _processar_extrato_medido(arquivo, coluna_data):
+    """_processar_extrato num worker: devolve (df, medições), que o processo principal incorpora."""
+    instrumentacao = Instrumentacao()
+    df = _processar_extrato(arquivo, coluna_data, instrumentacao)
+    return df, instrumentacao.medicoes
+
+
+def _extrair_extratos(arquivos_csv, coluna_data, num_workers, tipo_executor, instrumentacao=None):
+    """
+    Processa os extratos (sequencialmente ou num pool de threads/processos),
+    preservando a ordem dos arquivos. Retorna (lista_dfs, arquivos_com_falha).
+    """
+    instrumentacao = Instrumentacao() if instrumentacao is None else instrumentacao
+    if num_workers <= 1:
+        futuros = None
+    else:
+        executores = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+        if tipo_executor not in executores:
+            raise ValueError(f"tipo_executor deve ser 'thread' ou 'process', não {tipo_executor!r}")
+        executor = executores[tipo_executor](max_workers=num_workers)
+        futuros = [executor.submit(_processar_extrato_medido, arquivo, coluna_data) for arquivo in arquivos_csv]
+
+    lista_dfs = []
+    falhas = []
+    try:
+        for i, arquivo in enumerate(arquivos_csv):
+            try:
+                if futuros:
+                    df, medicoes = futuros[i].result()
+                    instrumentacao.incorporar(medicoes)
+                else:
+                    df = _processar_extrato(arquivo, coluna_data, instrumentacao)
+                lista_dfs.append(df)
+                print(f"   - Arquivo lido: {arquivo.name}")
+            except Exception as e:
+                print(f"   - Falha ao ler {arquivo.name}: {e}")
+                falhas.append(arquivo)
+    finally:
+        if futuros:
+            executor.shutdown()
+
+    return lista_dfs, falhas
+
+
+def _vazio_tipado(coluna_data):
+    df_vazio = pd.DataFrame(columns=[coluna_data, 'title', 'amount', COLUNA_ORIGEM])
+    return _transformar_extratos(df_vazio, coluna_data).astype(_dtypes_extrato(coluna_data))
+
+
+def _carregar_em_streaming(arquivos_csv, arquivo_saida, coluna_data, tamanho_chunk, substituidos=None,
+                           cubos=None, cubo_dos_mantidos=True, deduplicador=None, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Modo streaming: lê cada extrato em blocos de `tamanho_chunk` linhas, aplica as
+    transformações bloco a bloco e já grava cada um na saída. Nenhum momento
+    mantém mais de um bloco em memória, seja qual for o tamanho dos arquivos.
+
+    substituidos: no modo incremental, nomes dos extratos cujas linhas antigas
+    devem ser descartadas; as demais linhas da saída anterior são copiadas
+    (também em blocos). None = não há saída anterior a preservar.
+
+    cubos: lista opcional onde é acrescentado o cubo de agregados de cada bloco
+    (dos novos sempre; dos mantidos só se cubo_dos_mantidos=True).
+
+    deduplicador: Deduplicador opcional; as linhas mantidas são registradas nele
+    e as dos extratos novos que já vieram de um extrato anterior são descartadas.
+
+    dia_fechamento: ciclo da fatura usado pelos cubos e pelo MES_FATURA do banco.
+
+    A saída é montada num arquivo '.parcial' e só substitui a final no fim. Se um
+    extrato falhar no meio, a carga é interrompida e a saída anterior fica intacta.
+    Retorna (linhas_mantidas, linhas_novas).
+    """
+    destino = Path(arquivo_saida)
+    parcial = destino.with_name(destino.stem + '.parcial' + destino.suffix)
+    dtypes = _dtypes_extrato(coluna_data)
+    colunas = list(dtypes)
+    linhas_mantidas = linhas_novas = 0
+
+    try:
+        with EscritorIncremental(parcial, dia_fechamento) as escritor:
+            if substituidos is not None:
+                for chunk in ler_dataset_em_chunks(destino, tamanho_chunk, coluna_data):
+                    chunk = _ajustar_mantidas(chunk.loc[~chunk[COLUNA_ORIGEM].isin(substituidos)], coluna_data)
+                    escritor.escrever(chunk)
+                    if deduplicador is not None:
+                        deduplicador.registrar(chunk)
+                    if cubos is not None and cubo_dos_mantidos:
+                        cubos.append(construir_cubo(chunk, dia_fechamento=dia_fechamento))
+                    linhas_mantidas += len(chunk)
+
+            for arquivo in arquivos_csv:
+                # Leitura tipada do CSV em blocos (ver leitor_extratos.py)
+                for chunk in ler_extrato(arquivo, coluna_data, chunksize=tamanho_chunk):
+                    chunk[COLUNA_ORIGEM] = arquivo.name
+                    chunk = _transformar_extratos(chunk, coluna_data)[colunas].astype(dtypes)
+                    if deduplicador is not None:
+                        chunk = deduplicador.filtrar(chunk)
+                    escritor.escrever(chunk)
+                    if cubos is not None:
+                        cubos.append(construir_cubo(chunk, dia_fechamento=dia_fechamento))
+                    linhas_novas += len(chunk)
+                if deduplicador is not None:
+                    deduplicador.concluir_extrato()
+                print(f"   - Arquivo lido: {arquivo.name}")
+
+            if linhas_mantidas + linhas_novas == 0:
+                escritor.escrever(_vazio_tipado(coluna_data)[colunas])
+    except Exception:
+        parcial.unlink(missing_ok=True)
+        raise
+
+    os.replace(parcial, destino)
+    return linhas_mantidas, linhas_novas
+
+
+def _colunas_impressao(coluna_data):
+    """Colunas que identificam uma transação repetida entre extratos."""
+    return [coluna_data, 'title', 'amount']
+
+
+def _remover_duplicadas(lista_dfs, coluna_data, df_ja_consolidado=None):
+    """
+    Descarta, extrato a extrato (na ordem da lista), as transações que já
+    vieram de um extrato anterior ou de `df_ja_consolidado` (modo incremental).
+    """
+    deduplicador = Deduplicador(_colunas_impressao(coluna_data))
+    if df_ja_consolidado is not None:
+        deduplicador.registrar(df_ja_consolidado)
+    resultado = []
+    for df in lista_dfs:
+        resultado.append(deduplicador.filtrar(df))
+        deduplicador.concluir_extrato()
+    print(f"   - Deduplicação: {deduplicador.removidas:,} transações repetidas entre extratos removidas.")
+    return resultado
+
+
+def _conciliar(df, coluna_data, arquivo_saida, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Pareia créditos e pagamentos com a sua origem e salva os pares ao lado do
+    consolidado (ver caminho_conciliacao). indice_credito/indice_debito são as
+    posições das transações em `df`, a saída na ordem em que foi gravada.
+    """
+    creditos = conciliar_creditos(df, coluna_data)
+    pagamentos = conciliar_pagamentos(df, coluna_data, dia_fechamento)
+    for tipo, pares in (('creditos', creditos), ('pagamentos', pagamentos)):
+        salvar_dataset(pares, caminho_conciliacao(arquivo_saida, tipo))
+    pagos_com_diferenca = (pagamentos['diferenca'].abs() > 0.01).sum()
+    print(f"   - Conciliação: {creditos['indice_debito'].notna().sum()} de {len(creditos)} estornos/créditos "
+          f"pareados com o débito de origem; {pagos_com_diferenca} de {len(pagamentos)} pagamentos "
+          f"diferentes do total da fatura anterior (pares salvos em {caminho_conciliacao(arquivo_saida, '*')}).")
+
+
+def _tamanho_total(arquivos):
+    """Bytes somados dos arquivos (para a métrica de bytes lidos)."""
+    return sum(arquivo.stat().st_size for arquivo in arquivos)
+
+
+def _gravar_cubo(arquivo_cubo, cubo_novos, substituidos=None):
+    """
+    Salva o cubo de agregados. Com `substituidos`, atualiza o cubo existente:
+    só as células dos extratos alterados/removidos são trocadas.
+    """
+    if substituidos is not None:
+        cubo_novos = atualizar_cubo(carregar_dataset(arquivo_cubo), cubo_novos, substituidos)
+    salvar_dataset(cubo_novos, arquivo_cubo)
+    print(f"   - Cubo de agregados salvo como: {arquivo_cubo} ({len(cubo_novos):,} células)")
+
+
+def _descartar_cubo(arquivo_cubo):
+    """
+    Remove o cubo de uma execução anterior quando a saída é reescrita sem gerar
+    outro (gerar_cubo=False ou saída em banco): as análises que o encontrassem
+    leriam agregados que não correspondem mais às transações.
+    """
+    if arquivo_cubo.exists():
+        arquivo_cubo.unlink()
+        print(f"   - Cubo de agregados antigo removido: {arquivo_cubo}")
+
+
+def _descartar_conciliacao(arquivo_saida):
+    """Como _descartar_cubo, para os pares de uma conciliação anterior (conciliar=False ou modo streaming)."""
+    for tipo in ('creditos', 'pagamentos'):
+        arquivo = caminho_conciliacao(arquivo_saida, tipo)
+        if arquivo.exists():
+            arquivo.unlink()
+            print(f"   - Conciliação antiga removida: {arquivo}")
+
+
+def criar_pipeline_nubank_etl(pasta_origem, arquivo_saida, coluna_data,
+                              modo_incremental=False, arquivo_manifesto=ARQUIVO_MANIFESTO,
+                              num_workers=NUM_WORKERS, tipo_executor=TIPO_EXECUTOR,
+                              tamanho_chunk=TAMANHO_CHUNK, gerar_cubo=GERAR_CUBO,
+                              deduplicar=DEDUPLICAR, instrumentacao=None, arquivo_metricas=ARQUIVO_METRICAS,
+                              compacto=REPRESENTACAO_COMPACTA, dia_fechamento=DIA_FECHAMENTO,
+                              conciliar=CONCILIAR):
+    """
+    Pipeline que extrai, consolida, transforma e carrega os extratos mensais do Nubank.
+
+    Com modo_incremental=True, só os extratos novos ou alterados (segundo o
+    manifesto) são lidos e transformados; as transações deles substituem as
+    antigas no arquivo consolidado existente. Se nada mudou, nada é reescrito
+    e a função retorna None.
+
+    Com num_workers > 1, a leitura e as transformações de cada extrato rodam em
+    paralelo num pool de threads ou processos (tipo_executor).
+
+    Com tamanho_chunk, o pipeline roda em modo streaming (ver _carregar_em_streaming):
+    os extratos são processados em sequência, bloco a bloco, com memória limitada,
+    e a função retorna None em vez do DataFrame consolidado.
+
+    Com gerar_cubo=True, também materializa o cubo de agregados (ver
+    cubo_agregado.py); no modo incremental, só as células dos extratos
+    novos/alterados são recalculadas. Sem ele (ou com a saída em banco), um
+    cubo de uma execução anterior é removido, para não ficar desatualizado.
+
+    Se arquivo_saida for um banco (.sqlite/.db, ver banco_transacoes.py), o modo
+    incremental apaga/insere só as transações dos extratos alterados, sem reler
+    nem reescrever as demais, e a função retorna None. O cubo não é gerado: as
+    agregações são feitas pelo próprio banco (banco_transacoes.agregar).
+
+    Com deduplicar=True, uma transação que já veio de um extrato processado antes
+    (extratos consecutivos se sobrepõem) é descartada. No modo incremental, se um
+    extrato já processado mudou ou foi removido, tudo é reconstruído: a cópia
+    mantida de uma transação repetida pode ter vindo justamente dele.
+
+    Cada etapa (extração, com leitura/transformação/tipagem de cada extrato,
+    deduplicação, consolidação, carga, cubo e conciliação) é medida numa
+    Instrumentacao (ver instrumentacao.py): tempo, linhas, bytes lidos e, com
+    Instrumentacao(memoria=True), pico de memória; com perfil=True, a execução
+    roda sob o cProfile. Passe a sua em `instrumentacao` para consultar as
+    métricas depois. Com arquivo_metricas, o resumo da execução é acrescentado
+    a esse JSON Lines (histórico de execuções).
+
+    Com conciliar=True, estornos/créditos são pareados com o débito de origem e
+    pagamentos com a fatura que quitam, sobre a saída inteira, e os pares são
+    salvos ao lado dela (ver _conciliar). Não disponível no modo streaming.
+
+    Com compacto=True, o DataFrame devolvido vem na representação compacta de
+    compactacao.compactar (bem menor em memória; 'centavos' no lugar de amount).
+
+    dia_fechamento: último dia do ciclo da fatura, usado em tudo o que o pipeline
+    grava por fatura (cubo, MES_FATURA do banco) e na conciliação dos pagamentos.
+    No modo incremental, as linhas mantidas não são recalculadas: ao mudar o dia,
+    rode uma vez com modo_incremental=False.
+    """
+    instrumentacao = Instrumentacao() if instrumentacao is None else instrumentacao
+    with instrumentacao.capturar():
+        resultado = _executar_pipeline(pasta_origem, arquivo_saida, coluna_data, modo_incremental,
+                                       arquivo_manifesto, num_workers, tipo_executor, tamanho_chunk,
+                                       gerar_cubo, deduplicar, instrumentacao, dia_fechamento, conciliar)
+        if compacto and resultado is not None:
+            with instrumentacao.etapa('compactacao', linhas_entrada=len(resultado)):
+                resultado = compactar(resultado, coluna_data)
+    if arquivo_metricas:
+        contexto = {'arquivo_saida': str(arquivo_saida), 'modo_incremental': modo_incremental,
+                    'num_workers': num_workers, 'tipo_executor': tipo_executor, 'tamanho_chunk': tamanho_chunk,
+                    'compacto': compacto, 'dia_fechamento': dia_fechamento, 'conciliar': conciliar}
+        instrumentacao.salvar_json(arquivo_metricas, contexto)
+    return resultado
+
+
+def _executar_pipeline(pasta_origem, arquivo_saida, coluna_data, modo_incremental, arquivo_manifesto,
+                       num_workers, tipo_executor, tamanho_chunk, gerar_cubo, deduplicar, instrumentacao,
+                       dia_fechamento, conciliar):
+    """Etapas de criar_pipeline_nubank_etl, medidas em `instrumentacao`."""
+
+    print("--- INICIANDO PIPELINE ETL ---")
+
+    # =================================================================
+    # ETAPA 1: EXTRAÇÃO E CONSOLIDAÇÃO (UNION)
+    # =================================================================
+
+    print(f"1. Extraindo arquivos de: {pasta_origem.resolve()}")
+
+    # Busca por arquivos CSV na pasta
+    arquivos_csv = sorted(pasta_origem.glob('*.csv'))
+
+    if not arquivos_csv:
+        print("⚠️ ERRO: Nenhum arquivo CSV encontrado na pasta especificada.")
+        return
+
+    df_existente = None
+    substituidos = None
+    if modo_incremental:
+        # Sem arquivo consolidado anterior, o manifesto não vale: processa tudo
+        manifesto = _carregar_manifesto(arquivo_manifesto) if Path(arquivo_saida).exists() else {}
+
+        with instrumentacao.etapa('manifesto', linhas_entrada=len(arquivos_csv)):
+            novo_manifesto, arquivos_csv, removidos = _comparar_com_manifesto(arquivos_csv, manifesto)
+        print(f"   - Modo incremental: {len(arquivos_csv)} extrato(s) novo(s)/alterado(s), {len(removidos)} removido(s).")
+
+        if not arquivos_csv and not removidos:
+            _salvar_manifesto(novo_manifesto, arquivo_manifesto)
+            print("--- NADA A FAZER: ARQUIVO CONSOLIDADO JÁ ESTÁ ATUALIZADO ---")
+            return None
+
+        if manifesto:
+            alterados = [arquivo for arquivo in arquivos_csv if arquivo.name in manifesto]
+            if COLUNA_ORIGEM not in colunas_dataset(arquivo_saida):
+                # Saída gerada antes do modo incremental: reconstrói tudo
+                novo_manifesto, arquivos_csv, removidos = _comparar_com_manifesto(sorted(pasta_origem.glob('*.csv')), {})
+            elif deduplicar and (alterados or removidos):
+                print("   - Extrato já processado mudou/foi removido: reconstruindo tudo para refazer a deduplicação.")
+                novo_manifesto, arquivos_csv, removidos = _comparar_com_manifesto(sorted(pasta_origem.glob('*.csv')), {})
+            else:
+                # Transações dos extratos alterados/removidos serão trocadas pelas novas
+                substituidos = {arquivo.name for arquivo in arquivos_csv} | set(removidos)
+
+    # No banco, as agregações saem de GROUP BY indexados; o cubo seria redundante
+    gerar_cubo = gerar_cubo and not eh_banco(arquivo_saida)
+    # O cubo só pode ser atualizado se já existir; senão é construído com todas as transações
+    arquivo_cubo = caminho_cubo(arquivo_saida)
+    atualizar_cubo_existente = substituidos is not None and arquivo_cubo.exists()
+
+    if tamanho_chunk:
+        print(f"   - Modo streaming: blocos de {tamanho_chunk:,} linhas, gravados direto em {arquivo_saida}")
+        cubos = [] if gerar_cubo else None
+        with instrumentacao.etapa('streaming', bytes_lidos=_tamanho_total(arquivos_csv)) as medicao:
+            linhas_mantidas, linhas_novas = _carregar_em_streaming(arquivos_csv, arquivo_saida, coluna_data,
+                                                                   tamanho_chunk, substituidos, cubos,
+                                                                   cubo_dos_mantidos=not atualizar_cubo_existente,
+                                                                   deduplicador=Deduplicador(_colunas_impressao(coluna_data)) if deduplicar else None,
+                                                                   dia_fechamento=dia_fechamento)
+            medicao['linhas_saida'] = linhas_mantidas + linhas_novas
+        if gerar_cubo:
+            with instrumentacao.etapa('cubo', linhas_entrada=len(cubos)):
+                cubo = combinar_cubos(cubos)
+                if cubo is None:
+                    cubo = construir_cubo(_vazio_tipado(coluna_data), dia_fechamento=dia_fechamento)
+                _gravar_cubo(arquivo_cubo, cubo, substituidos if atualizar_cubo_existente else None)
+        else:
+            _descartar_cubo(arquivo_cubo)
+        if conciliar:
+            print("   - Conciliação não disponível no modo streaming (exige o histórico inteiro em memória).")
+        _descartar_conciliacao(arquivo_saida)
+        if modo_incremental:
+            _salvar_manifesto(novo_manifesto, arquivo_manifesto)
+        print(f"\n2-4. Extração, transformação e carga concluídas: {linhas_novas:,} transações novas, "
+              f"{linhas_mantidas:,} mantidas. Arquivo final salvo como: {arquivo_saida}")
+        print("--- PIPELINE CONCLUÍDO COM SUCESSO ---")
+        return None
+
+    if substituidos is not None and not eh_banco(arquivo_saida):
+        with instrumentacao.etapa('leitura_existente', bytes_lidos=Path(arquivo_saida).stat().st_size) as medicao:
+            df_existente = carregar_dataset(arquivo_saida, coluna_data=coluna_data)
+            medicao['linhas_saida'] = len(df_existente)
+
+    # Cada extrato já volta transformado e com dtypes explícitos (ver _processar_extrato)
+    with instrumentacao.etapa('extracao', bytes_lidos=_tamanho_total(arquivos_csv)) as medicao:
+        lista_dfs, falhas = _extrair_extratos(arquivos_csv, coluna_data, num_workers, tipo_executor, instrumentacao)
+        medicao['linhas_saida'] = sum(len(df) for df in lista_dfs)
+    if modo_incremental:
+        # Não registra no manifesto para tentar de novo na próxima execução
+        for arquivo in falhas:
+            novo_manifesto.pop(arquivo.name, None)
+
+    # =================================================================
+    # ETAPA 2: TRANSFORMAÇÃO (CRIAÇÃO DE FEATURES)
+    # =================================================================
+
+    # As transformações são por linha e já foram aplicadas arquivo a arquivo
+    print("\n2. Transformações aplicadas: 'date' (datetime), 'MÊS' e 'SEMANA_DO_MÊS'"
+          + (" e 'valor_formatado'." if GRAVAR_VALOR_FORMATADO else "."))
+
+    if deduplicar:
+        # No modo incremental, as transações já consolidadas também contam como vistas
+        ja_consolidado = None
+        if df_existente is not None:
+            ja_consolidado = df_existente[~df_existente[COLUNA_ORIGEM].isin(substituidos)]
+        elif substituidos is not None:
+            # Banco: só as colunas da impressão são lidas
+            ja_consolidado = carregar_dataset(arquivo_saida, colunas=_colunas_impressao(coluna_data),
+                                              coluna_data=coluna_data)
+        with instrumentacao.etapa('deduplicacao', linhas_entrada=sum(len(df) for df in lista_dfs)) as medicao:
+            lista_dfs = _remover_duplicadas(lista_dfs, coluna_data, ja_consolidado)
+            medicao['linhas_saida'] = sum(len(df) for df in lista_dfs)
+
+    # Consolida todos os DataFrames em um único
+    with instrumentacao.etapa('consolidacao', linhas_entrada=sum(len(df) for df in lista_dfs)) as medicao:
+        if lista_dfs:
+            df_consolidado = pd.concat(lista_dfs, ignore_index=True)
+        else:
+            df_consolidado = _vazio_tipado(coluna_data)
+        medicao['linhas_saida'] = len(df_consolidado)
+    print(f"3. Consolidação concluída. Total de transações: {len(df_consolidado):,}")
+
+    df_novos = df_consolidado
+
+    if df_existente is not None:
+        # Remove as transações dos extratos alterados/removidos e junta as novas
+        with instrumentacao.etapa('merge_incremental', linhas_entrada=len(df_existente)) as medicao:
+            df_existente = _ajustar_mantidas(df_existente[~df_existente[COLUNA_ORIGEM].isin(substituidos)], coluna_data)
+            df_consolidado = pd.concat([df_existente, df_consolidado], ignore_index=True)
+            medicao['linhas_saida'] = len(df_consolidado)
+        print(f"   - Merge incremental: {len(df_existente):,} transações mantidas, total de {len(df_consolidado):,}.")
 
     # =================================================================
     # ETAPA 3: CARREGAMENTO (LOAD)
     # =================================================================
-    
-    # Salva o DataFrame final em um novo arquivo CSV
-    df_consolidado.to_csv(arquivo_saida, index=False, encoding='utf-8')
-    
+
+    if substituidos is not None and eh_banco(arquivo_saida):
+        # Banco: troca só as transações dos extratos alterados/removidos (upsert)
+        with instrumentacao.etapa('carga', linhas_entrada=len(df_novos)):
+            atualizar_banco(df_novos, arquivo_saida, substituidos, coluna_data, dia_fechamento)
+        df_consolidado = None
+    else:
+        # Salva o DataFrame final (CSV, Parquet, Feather ou banco, conforme a extensão)
+        with instrumentacao.etapa('carga', linhas_entrada=len(df_consolidado)):
+            salvar_dataset(df_consolidado, arquivo_saida, dia_fechamento)
+    if gerar_cubo:
+        df_cubo = df_novos if atualizar_cubo_existente else df_consolidado
+        with instrumentacao.etapa('cubo', linhas_entrada=len(df_cubo)):
+            _gravar_cubo(arquivo_cubo, construir_cubo(df_cubo, dia_fechamento=dia_fechamento),
+                         substituidos if atualizar_cubo_existente else None)
+    else:
+        _descartar_cubo(arquivo_cubo)
+    if conciliar:
+        df_conciliacao = df_consolidado
+        if df_conciliacao is None:
+            # Banco atualizado no lugar: só as colunas usadas são lidas de volta
+            df_conciliacao = carregar_dataset(arquivo_saida, colunas=_colunas_impressao(coluna_data),
+                                              coluna_data=coluna_data)
+        with instrumentacao.etapa('conciliacao', linhas_entrada=len(df_conciliacao)):
+            _conciliar(df_conciliacao, coluna_data, arquivo_saida, dia_fechamento)
+    else:
+        _descartar_conciliacao(arquivo_saida)
+    if modo_incremental:
+        # O manifesto só é gravado depois da saída, para não marcar como processado o que não foi salvo
+        _salvar_manifesto(novo_manifesto, arquivo_manifesto)
+
     print(f"\n4. Carregamento concluído! Arquivo final salvo como: {arquivo_saida}")
     print("--- PIPELINE CONCLUÍDO COM SUCESSO ---")
-    
+
     return df_consolidado
 
 # --- EXECUÇÃO DO PIPELINE ---
 # Para testar, lembre-se de criar uma pasta de exemplo com alguns arquivos CSV de extrato.
-df_final = criar_pipeline_nubank_etl(PASTA_EXTRATOS, ARQUIVO_SAIDA, COLUNA_DATA_ORIGINAL)
+# Use modo_incremental=True para reprocessar apenas os extratos novos/alterados.
+# O guard é necessário para num_workers > 1 com tipo_executor='process' (os processos
+# filhos reimportam este módulo e não podem disparar o pipeline de novo).
+if __name__ == '__main__':
+    df_final = criar_pipeline_nubank_etl(PASTA_EXTRATOS, ARQUIVO_SAIDA, COLUNA_DATA_ORIGINAL)
 
 # --- Exemplo de Teste da Lógica (Se precisar):
 # data_teste = pd.to_datetime(['2024-01-01', '2024-01-07', '2024-01-08', '2024-01-15', '2024-01-29'])
 # semana_teste = np.ceil(data_teste.day / 7).astype(int)
-# print(f"\nTeste da Lógica (dias 1, 7, 8, 15, 29): {semana_teste.tolist()}") 
+# print(f"\nTeste da Lógica (dias 1, 7, 8, 15, 29): {semana_teste.tolist()}")
 # Esperado: [1, 1, 2, 3, 5]
\ No newline at end of file
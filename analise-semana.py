@@ -1,115 +1,111 @@
-import pandas as pd
-import locale
-
-# Configuração para formatar valores monetários em BRL (Brasil)
-# 'pt_BR.UTF-8' é um locale comum para sistemas Linux/macOS. Pode ser diferente no Windows.
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
+from armazenamento import carregar_dataset
+from consulta import Consulta
+from cubo_agregado import caminho_cubo, consultar_cubo
+from formatacao import formatar_brl
+
+ARQUIVO_ENTRADA = "extratos_nubank_consolidado_analise.csv" # .csv, .parquet, .feather ou .sqlite
+
+
+def analisar_semanas(arquivo_entrada=ARQUIVO_ENTRADA):
+    """
+    Imprime a análise dos padrões de gasto por semana do mês do arquivo
+    consolidado (.csv, .parquet, .feather ou .sqlite) e retorna a tabela final.
+    """
+    # Carregando o cubo de agregados gerado pelo pipeline (ver cubo_agregado.py).
+    # Se ele não existir (ou a entrada for o banco local), cada agregação é uma
+    # consulta preguiçosa sobre as transações (ver consulta.py): só as colunas
+    # usadas são lidas e, no banco, o agrupamento é feito pelo próprio SQLite.
     try:
-        # Tenta um locale comum no Windows
-        locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')
-    except locale.Error:
-        print("Aviso: Não foi possível configurar o locale para BRL. Usando formatação simples.")
-        # Define uma função de formatação simples como fallback
-        def format_currency(value):
-            return f"R$ {value:,.2f}".replace(",", "_TEMP_").replace(".", ",").replace("_TEMP_", ".")
-        locale_ativo = False
-    else:
-        locale_ativo = True
-else:
-    locale_ativo = True
-
-# Função de formatação que usa o locale, ou o fallback simples
-if locale_ativo:
-    def format_currency(value):
-        return locale.currency(value, grouping=True, symbol=True)
-else:
-    # A função format_currency já está definida no bloco 'except' acima
-    pass
-
-
-# Carregando o arquivo consolidado
-try:
-    df = pd.read_csv("extratos_nubank_consolidado_analise.csv")
-except FileNotFoundError:
-    print("ERRO: O arquivo 'extratos_nubank_consolidado_analise.csv' não foi encontrado.")
-    # Adicionar código para carregar o arquivo real se for o caso
-    raise
-
-# Convertendo a coluna 'amount' (valor) para numérica
-df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-# Filtrando valores nulos e estornos/pagamentos de fatura para análise de gasto puro
-# Consideramos apenas gastos (valores positivos)
-df_gastos = df[df['title'] != 'Pagamento recebido']
-
-print(df_gastos)
-
-print("=" * 70)
-print("ANÁLISE DE PADRÕES DE GASTO POR SEMANA DO MÊS")
-print(f"Base de dados analisada: {len(df_gastos)} transações (após remover estornos/nulos)")
-print("=" * 70)
-
-# 1. Agregação principal por SEMANA_DO_MÊS
-analise_semana = df_gastos.groupby('SEMANA_DO_MÊS')['amount'].agg(
-    Gasto_Total='sum',
-    Num_Transacoes='count',
-    Gasto_Medio_Transacao='mean'
-).reset_index()
-
-# 2. Adicionar o Gasto Médio Semanal e a representatividade
-# Calcula o número de meses únicos na base (para normalizar)
-num_meses = df_gastos['MÊS'].nunique()
-
-analise_semana['Gasto_Medio_Semanal'] = analise_semana['Gasto_Total'] / num_meses
-analise_semana['%_Gasto_Total'] = (analise_semana['Gasto_Total'] / analise_semana['Gasto_Total'].sum()) * 100
-
-# 3. Formatação
-analise_semana['Gasto_Total'] = analise_semana['Gasto_Total'].apply(format_currency)
-analise_semana['Gasto_Medio_Semanal'] = analise_semana['Gasto_Medio_Semanal'].apply(format_currency)
-analise_semana['Gasto_Medio_Transacao'] = analise_semana['Gasto_Medio_Transacao'].apply(format_currency)
-analise_semana['%_Gasto_Total'] = analise_semana['%_Gasto_Total'].map('{:.1f}%'.format)
-
-
-# Renomeando as semanas para um formato mais legível
-mapeamento_semana = {
-    1: 'Semana 1 (Dias 1-7)',
-    2: 'Semana 2 (Dias 8-14)',
-    3: 'Semana 3 (Dias 15-21)',
-    4: 'Semana 4 (Dias 22-28)',
-    5: 'Semana 5 (Dias 29+)'
-}
-analise_semana['Semana_Periodo'] = analise_semana['SEMANA_DO_MÊS'].map(mapeamento_semana)
-
-# Ordenando e Selecionando Colunas Finais
-analise_final = analise_semana[['Semana_Periodo', 'Gasto_Total', '%_Gasto_Total', 'Gasto_Medio_Transacao', 'Num_Transacoes']]
-
-print("\nPADRÕES DE GASTO CONSOLIDADOS POR SEMANA DO MÊS:\n")
-#print(analise_final.to_markdown(index=False))
-
-print("\n--- INSIGHTS DE NEGÓCIO ---\n")
-
-# Extraindo insights (Qual semana tem o maior gasto?)
-# Refazendo o cálculo sem formatação para encontrar o máximo
-gasto_por_semana_sem_formatar = df_gastos.groupby('SEMANA_DO_MÊS')['amount'].sum()
-semana_de_pico = gasto_por_semana_sem_formatar.idxmax()
-
-print(semana_de_pico)
-
-valor_pico = format_currency(gasto_por_semana_sem_formatar.max())
-perc_pico = (gasto_por_semana_sem_formatar.max() / df_gastos['amount'].sum()) * 100
-
-print(f"1. Semana de PICO: A {mapeamento_semana[semana_de_pico]} concentra o maior gasto, totalizando {valor_pico} ({perc_pico:.1f}% do total).")
-
-# Extraindo insights (Qual semana tem mais transações?)
-transacoes_por_semana = df_gastos.groupby('SEMANA_DO_MÊS')['amount'].count()
-semana_mais_ativa = transacoes_por_semana.idxmax()
-num_transacoes_pico = transacoes_por_semana.max()
-
-print(f"2. Frequência de Uso: A {mapeamento_semana[semana_mais_ativa]} é a mais ativa, com {num_transacoes_pico} transações registradas.")
-
-# Extraindo insights (Qual semana o gasto médio é maior/menor?)
-gasto_medio_por_semana = df_gastos.groupby('SEMANA_DO_MÊS')['amount'].mean()
-semana_medio_alto = gasto_medio_por_semana.idxmax()
-
-print(f"3. Ticket Médio: O gasto médio por transação é mais alto na {mapeamento_semana[semana_medio_alto]} ({format_currency(gasto_medio_por_semana.max())}).")
\ No newline at end of file
+        cubo = carregar_dataset(caminho_cubo(arquivo_entrada))
+    except FileNotFoundError:
+        cubo = None
+
+    # Filtrando valores nulos e estornos/pagamentos de fatura para análise de gasto puro
+    gastos = Consulta(arquivo_entrada).excluir_pagamentos()
+
+    def consultar(por):
+        if cubo is not None:
+            return consultar_cubo(cubo, por, excluir_pagamentos=True)
+        return gastos.agrupar(por).executar()
+
+    try:
+        analise_semana = consultar(['SEMANA_DO_MÊS'])
+    except FileNotFoundError:
+        print(f"ERRO: O arquivo '{arquivo_entrada}' não foi encontrado.")
+        raise
+
+    print("=" * 70)
+    print("ANÁLISE DE PADRÕES DE GASTO POR SEMANA DO MÊS")
+    print(f"Base de dados analisada: {analise_semana['quantidade'].sum()} transações (após remover estornos/nulos)")
+    print("=" * 70)
+
+    # 1. Agregação principal por SEMANA_DO_MÊS
+    analise_semana = analise_semana.rename(columns={
+        'soma': 'Gasto_Total',
+        'quantidade': 'Num_Transacoes',
+        'media': 'Gasto_Medio_Transacao',
+    })
+
+    # Valores sem formatação, usados nos insights ao final
+    gasto_por_semana_sem_formatar = analise_semana.set_index('SEMANA_DO_MÊS')['Gasto_Total']
+    transacoes_por_semana = analise_semana.set_index('SEMANA_DO_MÊS')['Num_Transacoes']
+    gasto_medio_por_semana = analise_semana.set_index('SEMANA_DO_MÊS')['Gasto_Medio_Transacao']
+
+    # 2. Adicionar o Gasto Médio Semanal e a representatividade
+    # Calcula o número de meses únicos na base (para normalizar)
+    num_meses = len(consultar(['MÊS']))
+
+    analise_semana['Gasto_Medio_Semanal'] = analise_semana['Gasto_Total'] / num_meses
+    analise_semana['%_Gasto_Total'] = (analise_semana['Gasto_Total'] / analise_semana['Gasto_Total'].sum()) * 100
+
+    # 3. Formatação (uma chamada por coluna, sem depender do locale do sistema)
+    for coluna in ['Gasto_Total', 'Gasto_Medio_Semanal', 'Gasto_Medio_Transacao']:
+        analise_semana[coluna] = formatar_brl(analise_semana[coluna])
+    analise_semana['%_Gasto_Total'] = analise_semana['%_Gasto_Total'].map('{:.1f}%'.format)
+
+
+    # Renomeando as semanas para um formato mais legível
+    mapeamento_semana = {
+        1: 'Semana 1 (Dias 1-7)',
+        2: 'Semana 2 (Dias 8-14)',
+        3: 'Semana 3 (Dias 15-21)',
+        4: 'Semana 4 (Dias 22-28)',
+        5: 'Semana 5 (Dias 29+)'
+    }
+    analise_semana['Semana_Periodo'] = analise_semana['SEMANA_DO_MÊS'].map(mapeamento_semana)
+
+    # Ordenando e Selecionando Colunas Finais
+    analise_final = analise_semana[['Semana_Periodo', 'Gasto_Total', '%_Gasto_Total', 'Gasto_Medio_Transacao', 'Num_Transacoes']]
+
+    print("\nPADRÕES DE GASTO CONSOLIDADOS POR SEMANA DO MÊS:\n")
+    #print(analise_final.to_markdown(index=False))
+
+    print("\n--- INSIGHTS DE NEGÓCIO ---\n")
+
+    # Extraindo insights (Qual semana tem o maior gasto?)
+    # Usando os valores sem formatação guardados antes da etapa 3
+    semana_de_pico = gasto_por_semana_sem_formatar.idxmax()
+
+    print(semana_de_pico)
+
+    valor_pico = formatar_brl(gasto_por_semana_sem_formatar.max())
+    perc_pico = (gasto_por_semana_sem_formatar.max() / gasto_por_semana_sem_formatar.sum()) * 100
+
+    print(f"1. Semana de PICO: A {mapeamento_semana[semana_de_pico]} concentra o maior gasto, totalizando {valor_pico} ({perc_pico:.1f}% do total).")
+
+    # Extraindo insights (Qual semana tem mais transações?)
+    semana_mais_ativa = transacoes_por_semana.idxmax()
+    num_transacoes_pico = transacoes_por_semana.max()
+
+    print(f"2. Frequência de Uso: A {mapeamento_semana[semana_mais_ativa]} é a mais ativa, com {num_transacoes_pico} transações registradas.")
+
+    # Extraindo insights (Qual semana o gasto médio é maior/menor?)
+    semana_medio_alto = gasto_medio_por_semana.idxmax()
+
+    print(f"3. Ticket Médio: O gasto médio por transação é mais alto na {mapeamento_semana[semana_medio_alto]} ({formatar_brl(gasto_medio_por_semana.max())}).")
+
+    return analise_final
+
+
+if __name__ == '__main__':
+    analisar_semanas()
\ No newline at end of file
@@ -0,0 +1,181 @@
+import pandas as pd
+from pathlib import Path
+
+from banco_transacoes import (EXTENSOES_BANCO, salvar_banco, carregar_banco, colunas_banco,
+                              ler_banco_em_chunks, EscritorBanco)
+from ciclo_fatura import DIA_FECHAMENTO
+from compactacao import compactar
+from leitor_extratos import ler_extrato, ler_cabecalho
+
+# --- CONFIGURAÇÃO ---
+# O formato de cada arquivo intermediário é decidido pela extensão do caminho:
+#   .csv      -> texto (padrão, compatível com Excel/Power BI)
+#   .parquet  -> colunar, comprimido, com tipos preservados (requer pyarrow)
+#   .feather  -> Arrow IPC, leitura mapeada em memória (requer pyarrow)
+#   .sqlite/.db -> banco SQLite local, com índices e upsert (ver banco_transacoes.py)
+FORMATOS_SUPORTADOS = ('.csv', '.parquet', '.feather') + EXTENSOES_BANCO
+
+# Colunas de baixa cardinalidade gravadas como categóricas nos formatos colunares
+COLUNAS_CATEGORICAS = ['MÊS', 'MES_FATURA']
+
+
+def _formato(caminho):
+    formato = Path(caminho).suffix.lower()
+    if formato not in FORMATOS_SUPORTADOS:
+        raise ValueError(f"Formato '{formato}' não suportado. Use um de: {', '.join(FORMATOS_SUPORTADOS)}")
+    return formato
+
+
+def salvar_dataset(df, caminho, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Salva o DataFrame no formato indicado pela extensão do caminho.
+    Nos formatos colunares, MÊS/MES_FATURA viram categóricas e as datas
+    continuam datetime64, sem conversão para texto.
+    dia_fechamento: só para o banco, que calcula MES_FATURA se ela faltar.
+    """
+    formato = _formato(caminho)
+
+    if formato == '.csv':
+        df.to_csv(caminho, index=False, encoding='utf-8')
+        return
+    if formato in EXTENSOES_BANCO:
+        salvar_banco(df, caminho, dia_fechamento=dia_fechamento)
+        return
+
+    categoricas = {col: df[col].astype('category') for col in COLUNAS_CATEGORICAS if col in df.columns}
+    df_tipado = df.assign(**categoricas).reset_index(drop=True)
+
+    if formato == '.parquet':
+        df_tipado.to_parquet(caminho, index=False)
+    else:
+        df_tipado.to_feather(caminho)
+
+
+def carregar_dataset(caminho, colunas=None, coluna_data='date', compacto=False):
+    """
+    Carrega um dataset salvo por salvar_dataset.
+
+    colunas: lista opcional com as colunas necessárias; nos formatos colunares
+    só elas são lidas do disco. A coluna de data sempre volta como datetime
+    (no CSV, a leitura é tipada por leitor_extratos.ler_extrato; no
+    Parquet/Feather ela já vem tipada).
+    compacto: devolve a representação compacta de compactacao.compactar,
+    para manter históricos grandes em memória.
+    """
+    formato = _formato(caminho)
+
+    if formato in EXTENSOES_BANCO:
+        df = carregar_banco(caminho, colunas, coluna_data)
+    elif formato == '.parquet':
+        df = pd.read_parquet(caminho, columns=colunas)
+    elif formato == '.feather':
+        df = pd.read_feather(caminho, columns=colunas)
+    else:
+        df = ler_extrato(caminho, coluna_data, colunas=colunas)
+
+    return compactar(df, coluna_data) if compacto else df
+
+
+def colunas_dataset(caminho):
+    """Nomes das colunas do dataset, lendo só o cabeçalho/esquema."""
+    formato = _formato(caminho)
+
+    if formato == '.csv':
+        return ler_cabecalho(caminho)
+    if formato in EXTENSOES_BANCO:
+        return colunas_banco(caminho)
+
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+    if formato == '.parquet':
+        return pq.read_schema(caminho).names
+    with ipc.open_file(caminho) as leitor:
+        return leitor.schema.names
+
+
+def ler_dataset_em_chunks(caminho, tamanho_chunk, coluna_data='date'):
+    """
+    Lê o dataset em blocos de até `tamanho_chunk` linhas, sem carregá-lo inteiro.
+    Cada bloco sai com a coluna de data já como datetime.
+    """
+    formato = _formato(caminho)
+
+    if formato == '.csv':
+        yield from ler_extrato(caminho, coluna_data, chunksize=tamanho_chunk)
+        return
+    if formato in EXTENSOES_BANCO:
+        yield from ler_banco_em_chunks(caminho, tamanho_chunk, coluna_data)
+        return
+
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+    if formato == '.parquet':
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho_chunk):
+            yield lote.to_pandas()
+        return
+    with ipc.open_file(caminho) as leitor:
+        for i in range(leitor.num_record_batches):
+            lote = leitor.get_batch(i)
+            for inicio in range(0, lote.num_rows, tamanho_chunk):
+                yield lote.slice(inicio, tamanho_chunk).to_pandas()
+
+
+class EscritorIncremental:
+    """
+    Grava um dataset bloco a bloco (CSV, Parquet, Feather ou banco), para que a memória
+    usada não dependa do tamanho total. Todos os blocos devem ter as mesmas
+    colunas e dtypes. Diferente de salvar_dataset, as colunas de texto não são
+    convertidas em categóricas (o dicionário mudaria de um bloco para outro).
+
+    dia_fechamento: só para o banco (ver salvar_dataset).
+
+    Uso:
+        with EscritorIncremental('saida.parquet') as escritor:
+            for chunk in chunks:
+                escritor.escrever(chunk)
+    """
+
+    def __init__(self, caminho, dia_fechamento=DIA_FECHAMENTO):
+        self.caminho = caminho
+        self.dia_fechamento = dia_fechamento
+        self.formato = _formato(caminho)
+        self._escritor = None
+        self._cabecalho_escrito = False
+
+    def escrever(self, df):
+        if self.formato == '.csv':
+            df.to_csv(self.caminho, mode='a' if self._cabecalho_escrito else 'w',
+                      header=not self._cabecalho_escrito, index=False, encoding='utf-8')
+            self._cabecalho_escrito = True
+            return
+        if self.formato in EXTENSOES_BANCO:
+            if self._escritor is None:
+                self._escritor = EscritorBanco(self.caminho, dia_fechamento=self.dia_fechamento)
+            self._escritor.escrever(df)
+            return
+
+        import pyarrow as pa
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        if self._escritor is None:
+            if self.formato == '.parquet':
+                import pyarrow.parquet as pq
+                self._escritor = pq.ParquetWriter(self.caminho, tabela.schema)
+            else:
+                # Feather V2 é o formato de arquivo Arrow IPC
+                self._escritor = pa.ipc.new_file(self.caminho, tabela.schema)
+        self._escritor.write_table(tabela)
+
+    def fechar(self):
+        if self._escritor is not None:
+            if self.formato in EXTENSOES_BANCO:
+                self._escritor.fechar()
+            else:
+                self._escritor.close()
+            self._escritor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
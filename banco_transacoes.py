@@ -0,0 +1,313 @@
+import datetime
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from categorizacao import categorizar_descricoes
+from ciclo_fatura import atribuir_ciclo_fatura, DIA_FECHAMENTO
+
+# --- CONFIGURAÇÃO ---
+# Banco SQLite local (biblioteca padrão do Python, sem dependência extra).
+# Um arquivo com uma destas extensões vira um banco com a tabela TABELA.
+EXTENSOES_BANCO = ('.sqlite', '.db')
+TABELA = 'transacoes'
+# Chave do upsert: a mesma transação no mesmo extrato é atualizada, não duplicada.
+# 'ocorrencia' numera as repetições legítimas (ex.: duas passagens de metrô iguais
+# no mesmo dia), que sem ela seriam fundidas numa linha só.
+COLUNA_OCORRENCIA = 'ocorrencia'
+CHAVE = ['date', 'title', 'amount', 'arquivo_origem', COLUNA_OCORRENCIA]
+COLUNAS_INDEXADAS = ['date', 'MES_FATURA', 'title']
+TITULO_PAGAMENTO = 'Pagamento recebido'
+# Dimensões calculadas no próprio banco (podem ser usadas em `por` nas agregações)
+EXPRESSOES = {
+    'mes_ano': "strftime('%Y-%m', \"date\")",
+    'dia': "date(\"date\")",
+}
+_MAX_PARAMETROS = 900 # Abaixo do limite de parâmetros por comando das versões antigas do SQLite
+
+
+def eh_banco(caminho):
+    return Path(caminho).suffix.lower() in EXTENSOES_BANCO
+
+
+def _q(nome):
+    """Nome de coluna entre aspas (as colunas MÊS e SEMANA_DO_MÊS têm acento)."""
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _conectar(caminho, criar=False):
+    """Conexão com o banco. Só a escrita cria o arquivo; na leitura, ausente = FileNotFoundError."""
+    if not criar and not Path(caminho).exists():
+        raise FileNotFoundError(f"Banco '{caminho}' não encontrado.")
+    return sqlite3.connect(caminho)
+
+
+def _preparar(df, coluna_data, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Linhas no formato do banco: datas como texto ISO (comparáveis e indexáveis),
+    colunas derivadas para os índices/consultas (MES_FATURA, SEMANA_FATURA, pelo
+    dia de fechamento, e categoria, se faltarem) e o número da ocorrência de
+    cada chave repetida.
+    """
+    df = df.copy()
+    if coluna_data in df.columns:
+        datas = pd.to_datetime(df[coluna_data])
+        if 'MES_FATURA' not in df.columns:
+            df['MES_FATURA'], df['SEMANA_FATURA'] = atribuir_ciclo_fatura(datas, dia_fechamento)
+        df[coluna_data] = datas.dt.strftime('%Y-%m-%d %H:%M:%S')
+    if 'title' in df.columns and 'categoria' not in df.columns:
+        df['categoria'] = categorizar_descricoes(df['title'])
+
+    chave = [c for c in CHAVE if c != COLUNA_OCORRENCIA]
+    if all(c in df.columns for c in chave):
+        df[COLUNA_OCORRENCIA] = df.groupby(chave, dropna=False, sort=False).cumcount()
+    return df
+
+
+def _tipo_sql(serie):
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(serie):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _criar_tabela(con, df, indices=True):
+    colunas = ', '.join(f"{_q(c)} {_tipo_sql(df[c])}" for c in df.columns)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {TABELA} ({colunas})")
+    if indices:
+        _criar_indices(con, df.columns)
+
+
+def _criar_indices(con, colunas):
+    if all(c in colunas for c in CHAVE):
+        con.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{TABELA}_chave ON {TABELA} "
+                    f"({', '.join(_q(c) for c in CHAVE)})")
+    for i, coluna in enumerate(COLUNAS_INDEXADAS):
+        if coluna in colunas:
+            con.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABELA}_{i} ON {TABELA} ({_q(coluna)})")
+
+
+def _inserir(con, df, upsert=True):
+    """INSERT com upsert pela CHAVE (quando a tabela tem todas as colunas dela)."""
+    colunas = list(df.columns)
+    comando = (f"INSERT INTO {TABELA} ({', '.join(_q(c) for c in colunas)}) "
+               f"VALUES ({', '.join('?' for _ in colunas)})")
+    if upsert and all(c in colunas for c in CHAVE):
+        atualizar = [c for c in colunas if c not in CHAVE]
+        acao = ', '.join(f"{_q(c)} = excluded.{_q(c)}" for c in atualizar) if atualizar else None
+        comando += f" ON CONFLICT ({', '.join(_q(c) for c in CHAVE)}) " + (f"DO UPDATE SET {acao}" if acao else "DO NOTHING")
+    # astype(object) + where: tipos nativos do Python e None no lugar de NaN/NA/NaT
+    valores = df.astype(object).where(df.notna(), None)
+    con.executemany(comando, valores.itertuples(index=False, name=None))
+
+
+def salvar_banco(df, caminho, coluna_data='date', dia_fechamento=DIA_FECHAMENTO):
+    """Substitui todo o conteúdo da tabela pelo DataFrame (esquema e índices recriados)."""
+    df = _preparar(df, coluna_data, dia_fechamento)
+    with _conectar(caminho, criar=True) as con:
+        con.execute(f"DROP TABLE IF EXISTS {TABELA}")
+        _criar_tabela(con, df)
+        _inserir(con, df)
+    con.close()
+
+
+def atualizar_banco(df_novos, caminho, substituidos, coluna_data='date', dia_fechamento=DIA_FECHAMENTO):
+    """
+    Carga incremental numa única transação: apaga as transações dos extratos
+    alterados/removidos (`substituidos`) e faz o upsert das novas. As demais
+    linhas do banco não são lidas nem reescritas.
+    """
+    df_novos = _preparar(df_novos, coluna_data, dia_fechamento)
+    substituidos = list(substituidos)
+    with _conectar(caminho, criar=True) as con:
+        _criar_tabela(con, df_novos)
+        for i in range(0, len(substituidos), _MAX_PARAMETROS):
+            lote = substituidos[i:i + _MAX_PARAMETROS]
+            con.execute(f"DELETE FROM {TABELA} WHERE {_q('arquivo_origem')} IN ({', '.join('?' for _ in lote)})", lote)
+        _inserir(con, df_novos)
+    con.close()
+
+
+def colunas_banco(caminho):
+    with _conectar(caminho) as con:
+        colunas = [linha[1] for linha in con.execute(f"PRAGMA table_info({TABELA})")]
+    con.close()
+    return [c for c in colunas if c != COLUNA_OCORRENCIA]
+
+
+def dia_seguinte(fim):
+    """
+    Para um fim de período dado como date (sem hora), o início do dia seguinte:
+    o filtro vira `< dia seguinte` e inclui as transações com hora no último dia,
+    que `<= 'AAAA-MM-DD 00:00:00'` deixaria de fora. None para os demais tipos.
+    """
+    if isinstance(fim, datetime.date) and not isinstance(fim, datetime.datetime):
+        return pd.Timestamp(fim) + pd.Timedelta(days=1)
+    return None
+
+
+def _where(filtros, coluna_data='date'):
+    """
+    Monta o WHERE a partir de {coluna: condição}. A condição pode ser um valor
+    (igualdade), uma lista (IN) ou uma tupla (início, fim) com limites inclusivos,
+    onde None deixa o lado aberto. Na coluna de data, os valores podem ser
+    Timestamp, date ou texto 'AAAA-MM-DD'; um fim do tipo date cobre o dia todo
+    (ver dia_seguinte). Retorna (cláusulas, parâmetros).
+    """
+    clausulas, parametros = [], []
+
+    for coluna, condicao in (filtros or {}).items():
+        coluna_data_atual = coluna == coluna_data
+        if coluna_data_atual:
+            def valor(v):
+                return pd.Timestamp(v).strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            def valor(v):
+                return v
+        coluna = EXPRESSOES.get(coluna, _q(coluna))
+        if isinstance(condicao, tuple):
+            inicio, fim = condicao
+            if inicio is not None:
+                clausulas.append(f"{coluna} >= ?")
+                parametros.append(valor(inicio))
+            if fim is not None and coluna_data_atual and dia_seguinte(fim) is not None:
+                clausulas.append(f"{coluna} < ?")
+                parametros.append(valor(dia_seguinte(fim)))
+            elif fim is not None:
+                clausulas.append(f"{coluna} <= ?")
+                parametros.append(valor(fim))
+        elif isinstance(condicao, (list, set)):
+            condicao = list(condicao)
+            clausulas.append(f"{coluna} IN ({', '.join('?' for _ in condicao)})")
+            parametros.extend(valor(v) for v in condicao)
+        else:
+            clausulas.append(f"{coluna} = ?")
+            parametros.append(valor(condicao))
+    return clausulas, parametros
+
+
+def _sql_where(clausulas):
+    return " WHERE " + " AND ".join(clausulas) if clausulas else ""
+
+
+def carregar_banco(caminho, colunas=None, coluna_data='date', filtros=None, ordem=None, limite=None,
+                   deslocamento=None):
+    """
+    Lê as transações do banco. Só as `colunas` pedidas e as linhas que passam nos
+    `filtros` (ver _where) saem do SQLite; os filtros em date, MES_FATURA e title
+    usam os índices. `ordem`: coluna de ordenação ('-coluna' = decrescente).
+    `limite`/`deslocamento`: LIMIT/OFFSET, para ler uma página por vez (com
+    ordem por date, o SQLite percorre o índice em vez de ordenar a tabela).
+    """
+    colunas = colunas or colunas_banco(caminho)
+    clausulas, parametros = _where(filtros, coluna_data)
+    sql = f"SELECT {', '.join(_q(c) for c in colunas)} FROM {TABELA}{_sql_where(clausulas)}"
+    if ordem:
+        sql += f" ORDER BY {_q(ordem.lstrip('-'))}" + (" DESC" if ordem.startswith('-') else "")
+    if limite or deslocamento:
+        sql += f" LIMIT {int(limite) if limite else -1}"
+    if deslocamento:
+        sql += f" OFFSET {int(deslocamento)}"
+
+    with _conectar(caminho) as con:
+        df = pd.read_sql_query(sql, con, params=parametros)
+    con.close()
+    if coluna_data in df.columns:
+        df[coluna_data] = pd.to_datetime(df[coluna_data])
+    return df
+
+
+def intervalo_datas(caminho, coluna_data='date'):
+    """
+    (primeira, última) data do banco, pelo índice de data (sem varrer a tabela).
+    Com a tabela vazia, retorna (None, None).
+    """
+    with _conectar(caminho) as con:
+        primeira, ultima = con.execute(f"SELECT MIN({_q(coluna_data)}), MAX({_q(coluna_data)}) FROM {TABELA}").fetchone()
+    con.close()
+    if primeira is None:
+        return None, None
+    return pd.to_datetime(primeira), pd.to_datetime(ultima)
+
+
+def ler_banco_em_chunks(caminho, tamanho_chunk, coluna_data='date'):
+    colunas = ', '.join(_q(c) for c in colunas_banco(caminho))
+    con = _conectar(caminho)
+    try:
+        for chunk in pd.read_sql_query(f"SELECT {colunas} FROM {TABELA}", con, chunksize=tamanho_chunk):
+            if coluna_data in chunk.columns:
+                chunk[coluna_data] = pd.to_datetime(chunk[coluna_data])
+            yield chunk
+    finally:
+        con.close()
+
+
+def agregar(caminho, por, filtros=None, excluir_pagamentos=False, sinal=None, coluna_valor='amount',
+            coluna_data='date'):
+    """
+    Agregação feita pelo próprio SQLite (GROUP BY), sem carregar as transações.
+
+    por: dimensões do resultado; colunas da tabela ou chaves de EXPRESSOES (ex.: 'mes_ano').
+    filtros: ver _where. excluir_pagamentos e sinal como em cubo_agregado.consultar_cubo.
+    Retorna um DataFrame com `por` + soma, quantidade, media, minimo e maximo.
+    """
+    clausulas, parametros = _where(filtros, coluna_data)
+    valor = _q(coluna_valor)
+    if excluir_pagamentos:
+        clausulas.append(f"{_q('title')} IS NOT ?")
+        parametros.append(TITULO_PAGAMENTO)
+    if sinal is not None:
+        clausulas.append(f"{valor} {'<' if sinal < 0 else '>' if sinal > 0 else '='} 0")
+
+    selecao = [f"{EXPRESSOES.get(d, _q(d))} AS {_q(d)}" for d in por] + [
+        f"SUM({valor}) AS soma", f"COUNT({valor}) AS quantidade", f"AVG({valor}) AS media",
+        f"MIN({valor}) AS minimo", f"MAX({valor}) AS maximo",
+    ]
+    sql = f"SELECT {', '.join(selecao)} FROM {TABELA}{_sql_where(clausulas)}"
+    if por:
+        posicoes = ', '.join(str(i + 1) for i in range(len(por)))
+        sql += f" GROUP BY {posicoes} ORDER BY {posicoes}"
+
+    with _conectar(caminho) as con:
+        resultado = pd.read_sql_query(sql, con, params=parametros)
+    con.close()
+    return resultado
+
+
+class EscritorBanco:
+    """
+    Contraparte de armazenamento.EscritorIncremental para o banco: grava os
+    blocos numa única transação. Uma mesma transação repetida pode cair em
+    blocos diferentes, então a 'ocorrencia' é renumerada e os índices são
+    criados só no fechamento, com a tabela completa.
+    """
+
+    def __init__(self, caminho, coluna_data='date', dia_fechamento=DIA_FECHAMENTO):
+        self.coluna_data = coluna_data
+        self.dia_fechamento = dia_fechamento
+        self._con = _conectar(caminho, criar=True)
+        self._con.execute(f"DROP TABLE IF EXISTS {TABELA}")
+        self._colunas = None
+
+    def escrever(self, df):
+        df = _preparar(df, self.coluna_data, self.dia_fechamento)
+        _criar_tabela(self._con, df, indices=False)
+        _inserir(self._con, df, upsert=False)
+        self._colunas = list(df.columns)
+
+    def fechar(self):
+        if self._con is None:
+            return
+        if self._colunas is not None:
+            if all(c in self._colunas for c in CHAVE):
+                particao = ', '.join(_q(c) for c in CHAVE if c != COLUNA_OCORRENCIA)
+                self._con.execute(
+                    f"UPDATE {TABELA} SET {_q(COLUNA_OCORRENCIA)} = n.o FROM ("
+                    f"SELECT rowid AS r, ROW_NUMBER() OVER (PARTITION BY {particao} ORDER BY rowid) - 1 AS o "
+                    f"FROM {TABELA}) AS n WHERE {TABELA}.rowid = n.r")
+            _criar_indices(self._con, self._colunas)
+        self._con.commit()
+        self._con.close()
+        self._con = None
@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import gc
+import importlib
+import io
+import json
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+from gerador_extratos import gerar_extratos_sinteticos
+
+# --- CONFIGURAÇÃO ---
+# Cenários de tamanho: nome -> (número de extratos mensais, total de transações)
+CENARIOS = {
+    'mes': (1, 60),
+    'ano': (12, 5_000),
+    'grande': (24, 200_000),
+    'milhoes': (36, 2_000_000),
+}
+REPETICOES = 3 # O tempo reportado é o melhor de N execuções de cada etapa
+TOLERANCIA_REGRESSAO = 0.20 # Mais de 20% de queda no throughput em relação à base = regressão
+COLUNA_DATA = 'date'
+
+
+# =================================================================
+# ETAPAS MEDIDAS
+# =================================================================
+# Cada etapa recebe o contexto (arquivos gerados e resultados das etapas
+# anteriores) e retorna o resultado que as seguintes usam. Elas chamam as
+# mesmas funções que os scripts, sem os efeitos colaterais (arquivos de saída).
+
+def _etapa_extracao(ctx):
+    """Pipeline_Nubank.py: leitura, transformações por linha e consolidação dos extratos."""
+    pipeline = importlib.import_module('Pipeline_Nubank')
+    lista_dfs, _ = pipeline._extrair_extratos(ctx['arquivos'], COLUNA_DATA, ctx['num_workers'], ctx['tipo_executor'])
+    return pd.concat(lista_dfs, ignore_index=True)
+
+
+def _etapa_ciclo_fatura(ctx):
+    """analise-semanal-nubank.py: MES_FATURA e SEMANA_FATURA pelo dia de fechamento."""
+    from ciclo_fatura import atribuir_ciclo_fatura
+    datas = pd.to_datetime(ctx['extracao'][COLUNA_DATA], utc=True)
+    return atribuir_ciclo_fatura(datas)
+
+
+def _etapa_agregacao_semanal(ctx):
+    """analise-semana.py: cubo de agregados e consultas por semana e por mês."""
+    from cubo_agregado import construir_cubo, consultar_cubo
+    df = ctx['extracao'][[COLUNA_DATA, 'MÊS', 'SEMANA_DO_MÊS', 'title', 'amount']]
+    cubo = construir_cubo(df)
+    return (consultar_cubo(cubo, ['SEMANA_DO_MÊS'], excluir_pagamentos=True),
+            consultar_cubo(cubo, ['MÊS'], excluir_pagamentos=True))
+
+
+def _etapa_categorizacao(ctx):
+    """categorizacao.py: categorização de todas as descrições (usada pelo dashboard)."""
+    from categorizacao import categorizar_descricoes, _categoria_normalizada
+    # Sem o cache das execuções anteriores, senão as repetições só medem o lookup
+    _categoria_normalizada.cache_clear()
+    return categorizar_descricoes(ctx['extracao']['title'])
+
+
+def _etapa_upload_dashboard(ctx):
+    """processamento_uploads.py: parsing completo do upload do dashboard, a partir dos bytes do CSV."""
+    from processamento_uploads import process_uploaded_csv
+    return process_uploaded_csv(io.BytesIO(ctx['upload']))
+
+
+ETAPAS = {
+    'extracao': _etapa_extracao,
+    'ciclo_fatura': _etapa_ciclo_fatura,
+    'agregacao_semanal': _etapa_agregacao_semanal,
+    'categorizacao': _etapa_categorizacao,
+    'upload_dashboard': _etapa_upload_dashboard,
+}
+
+
+# =================================================================
+# MEDIÇÃO
+# =================================================================
+
+def _medir(funcao, ctx, repeticoes):
+    """
+    Executa a etapa `repeticoes` vezes e retorna (resultado, melhor_tempo, pico_bytes).
+
+    O tempo é medido sem o tracemalloc (que deixa tudo mais lento); o pico de
+    memória vem de uma execução extra com ele ligado. NumPy e pandas registram
+    suas alocações no tracemalloc, então os arrays entram na conta.
+    """
+    tempos = []
+    # As etapas imprimem o andamento e avisos: ficam fora do relatório
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for _ in range(repeticoes):
+            gc.collect()
+            inicio = time.perf_counter()
+            resultado = funcao(ctx)
+            tempos.append(time.perf_counter() - inicio)
+
+        del resultado
+        gc.collect()
+        tracemalloc.start()
+        try:
+            resultado = funcao(ctx)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return resultado, min(tempos), pico
+
+
+def executar_benchmark(cenario, etapas=None, repeticoes=REPETICOES, num_workers=1, tipo_executor='thread',
+                       pasta_trabalho=None, semente=42):
+    """
+    Gera os extratos sintéticos do cenário e mede cada etapa.
+
+    cenario: nome em CENARIOS ou tupla (num_meses, num_linhas).
+    etapas: nomes em ETAPAS (None = todas). 'extracao' sempre roda, pois as
+    demais usam o DataFrame consolidado.
+    Retorna uma lista de dicts: etapa, linhas, segundos, linhas_por_segundo, pico_mb.
+    """
+    num_meses, num_linhas = CENARIOS[cenario] if isinstance(cenario, str) else cenario
+    etapas = list(ETAPAS) if etapas is None else [e for e in ETAPAS if e in etapas or e == 'extracao']
+
+    with tempfile.TemporaryDirectory(dir=pasta_trabalho) as pasta:
+        arquivos = gerar_extratos_sinteticos(Path(pasta), num_linhas, num_meses, semente=semente)
+        ctx = {'arquivos': arquivos, 'num_workers': num_workers, 'tipo_executor': tipo_executor}
+
+        if 'upload_dashboard' in etapas:
+            # O upload é um arquivo só, com as transações de todos os extratos
+            ctx['upload'] = b''.join(a.read_bytes() if i == 0 else a.read_bytes().split(b'\n', 1)[1]
+                                     for i, a in enumerate(arquivos))
+
+        resultados = []
+        for nome in etapas:
+            ctx[nome], segundos, pico = _medir(ETAPAS[nome], ctx, repeticoes)
+            linhas = len(ctx['extracao'])
+            resultados.append({
+                'etapa': nome,
+                'linhas': linhas,
+                'segundos': segundos,
+                'linhas_por_segundo': linhas / segundos if segundos > 0 else float('inf'),
+                'pico_mb': pico / 1024 ** 2,
+            })
+    return resultados
+
+
+def comparar_com_base(resultados, base, tolerancia=TOLERANCIA_REGRESSAO):
+    """
+    Compara com um relatório salvo anteriormente (mesmo cenário).
+    Retorna as etapas cujo throughput caiu mais que `tolerancia`.
+    """
+    base = {r['etapa']: r for r in base if 'linhas_por_segundo' in r}
+    regressoes = []
+    for r in resultados:
+        anterior = base.get(r['etapa'])
+        if anterior is None or 'linhas_por_segundo' not in r:
+            continue
+        variacao = r['linhas_por_segundo'] / anterior['linhas_por_segundo'] - 1
+        if variacao < -tolerancia:
+            regressoes.append((r['etapa'], variacao))
+    return regressoes
+
+
+def imprimir_relatorio(cenario, resultados):
+    print("=" * 78)
+    print(f"BENCHMARK - cenário: {cenario}")
+    print("=" * 78)
+    print(f"{'Etapa':<20}{'Linhas':>12}{'Tempo (s)':>12}{'Linhas/s':>16}{'Pico (MB)':>14}")
+    for r in resultados:
+        print(f"{r['etapa']:<20}{r['linhas']:>12,}{r['segundos']:>12.3f}"
+              f"{r['linhas_por_segundo']:>16,.0f}{r['pico_mb']:>14.1f}")
+
+
+# --- EXECUÇÃO ---
+# Ex.: python benchmark.py --cenario grande --salvar base.json
+#      python benchmark.py --cenario grande --comparar base.json
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline com extratos sintéticos.")
+    parser.add_argument('--cenario', default='ano', choices=list(CENARIOS))
+    parser.add_argument('--etapas', nargs='+', choices=list(ETAPAS), help="Padrão: todas")
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    parser.add_argument('--num-workers', type=int, default=1)
+    parser.add_argument('--tipo-executor', default='thread', choices=['thread', 'process'])
+    parser.add_argument('--salvar', help="Grava os resultados em JSON (para servir de base)")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    args = parser.parse_args()
+
+    resultados = executar_benchmark(args.cenario, args.etapas, args.repeticoes, args.num_workers, args.tipo_executor)
+    imprimir_relatorio(args.cenario, resultados)
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump({'cenario': args.cenario, 'resultados': resultados}, f, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get('cenario') != args.cenario:
+            print(f"\n⚠️ A base é do cenário '{base.get('cenario')}', não '{args.cenario}': comparação ignorada.")
+        else:
+            regressoes = comparar_com_base(resultados, base['resultados'])
+            for etapa, variacao in regressoes:
+                print(f"\n⚠️ REGRESSÃO em '{etapa}': throughput {variacao:+.1%} em relação à base.")
+            if regressoes:
+                raise SystemExit(1)
+            print("\nSem regressões em relação à base.")
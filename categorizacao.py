@@ -0,0 +1,60 @@
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+from vetorizacao import aplicar_por_valores_distintos
+
+# --- CONFIGURAÇÃO ---
+# Palavras-chave por categoria. A ORDEM IMPORTA: quando uma descrição contém
+# palavras de mais de uma categoria, vence a que aparece primeiro aqui.
+CATEGORIAS = {
+    'Alimentação': ['restaurante', 'lanchonete', 'padaria', 'supermercado', 'mercado', 'ifood', 'comida'],
+    'Transporte': ['uber', 'taxi', 'combustivel', 'posto', 'gasolina', 'metro'],
+    'Lazer': ['cinema', 'teatro', 'show', 'netflix', 'spotify', 'amazon', "shopee"],
+    'Saque': ['saque dinheiro banco 24h'],
+    'Serviços/Contas': ['tarifa', 'servico', 'agua', 'energia', 'net', 'pix enviado'],
+    'Educação': ['escola', 'curso', 'livro'],
+    'Remuneração': ['salario', 'credito de', 'remuneracao'],
+}
+CATEGORIA_PADRAO = 'Outros'
+
+
+def _compilar_regex(categorias):
+    """
+    Compila a tabela de palavras-chave em UMA regex ancorada, com um grupo por
+    categoria na ordem do dicionário. As alternativas de uma regex são tentadas
+    em ordem, então o primeiro grupo que casar é a categoria de maior precedência
+    (o mesmo resultado do loop categoria -> palavra-chave com `in`).
+    """
+    alternativas = []
+    for i, palavras in enumerate(categorias.values()):
+        palavras = sorted(palavras, key=len, reverse=True)
+        alternativas.append(f"(?P<c{i}>.*?(?:{'|'.join(re.escape(p) for p in palavras)}))")
+    return re.compile(f"^(?:{'|'.join(alternativas)})", re.DOTALL)
+
+
+_REGEX_CATEGORIAS = _compilar_regex(CATEGORIAS)
+_NOMES_CATEGORIAS = list(CATEGORIAS)
+
+
+@lru_cache(maxsize=65536)
+def _categoria_normalizada(descricao):
+    """Categoria de uma descrição já em minúsculas (memoizada: estabelecimentos se repetem muito)."""
+    encontrado = _REGEX_CATEGORIAS.match(descricao)
+    if encontrado is None:
+        return CATEGORIA_PADRAO
+    return _NOMES_CATEGORIAS[int(encontrado.lastgroup[1:])]
+
+
+def categorize_transaction(description):
+    """
+    Categoriza transações baseado na descrição.
+    """
+    return _categoria_normalizada(str(description).lower())
+
+
+def categorizar_descricoes(descricoes):
+    """Categoriza uma coluna inteira de descrições (a regex roda uma vez por descrição distinta)."""
+    descricoes = pd.Series(descricoes)
+    return pd.Series(aplicar_por_valores_distintos(descricoes, categorize_transaction), index=descricoes.index)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from vetorizacao import aplicar_por_valores_distintos
+
+# --- CONFIGURAÇÃO ---
+# Dia de fechamento da fatura: o ciclo vai do dia seguinte ao fechamento no mês
+# anterior até o dia de fechamento no mês da fatura.
+# Ex.: com 16, a fatura de FEVEREIRO reúne os gastos de 17/Jan a 16/Fev.
+DIA_FECHAMENTO = 16
+ROTULO_FORA_DO_PERIODO = 'FORA_DO_PERÍODO' # Usado apenas para datas ausentes (NaT)
+
+SIGLAS_MESES = np.array(['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN',
+                         'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ'])
+
+
+def atribuir_ciclo_fatura(datas, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Calcula MES_FATURA e SEMANA_FATURA para qualquer intervalo de datas, em uma
+    única passada vetorizada (sem lista de ciclos fixa por ano).
+
+    MES_FATURA: rótulo 'AAAA-MM (MMM)' do mês da fatura. Datas depois do dia de
+    fechamento pertencem à fatura do mês seguinte.
+
+    SEMANA_FATURA (1 = início do ciclo), pelos dias do mês civil:
+        1: os 7 primeiros dias do ciclo (ex.: 17 a 23)
+        2: o restante do mês de início (ex.: 24 a 31)
+        3: dias 1 a 7 do mês da fatura
+        4: dia 8 até o fechamento (ex.: 8 a 16)
+        0: data ausente
+
+    Retorna (mes_fatura, semana_fatura) como Series alinhadas ao índice de `datas`.
+    """
+    if not 1 <= dia_fechamento <= 28:
+        raise ValueError(f"dia_fechamento deve estar entre 1 e 28, não {dia_fechamento}")
+
+    datas = pd.Series(datas)
+    validas = datas.notna().to_numpy()
+    ano = datas.dt.year.to_numpy(dtype=float, na_value=0).astype(np.int64)
+    mes = datas.dt.month.to_numpy(dtype=float, na_value=1).astype(np.int64)
+    dia = datas.dt.day.to_numpy(dtype=float, na_value=0).astype(np.int64)
+
+    # Índice absoluto do mês da fatura (ano * 12 + mês), avançando um mês após o fechamento
+    apos_fechamento = dia > dia_fechamento
+    indice_fatura = ano * 12 + (mes - 1) + apos_fechamento
+
+    rotulos = aplicar_por_valores_distintos(indice_fatura,
+                                            lambda c: f"{c // 12}-{c % 12 + 1:02d} ({SIGLAS_MESES[c % 12]})")
+    mes_fatura = np.where(validas, rotulos, ROTULO_FORA_DO_PERIODO)
+
+    semana_fatura = np.where(
+        apos_fechamento,
+        np.where(dia <= dia_fechamento + 7, 1, 2),
+        np.where(dia <= 7, 3, 4),
+    )
+    semana_fatura = np.where(validas, semana_fatura, 0)
+
+    return (pd.Series(mes_fatura, index=datas.index, dtype=object),
+            pd.Series(semana_fatura, index=datas.index))
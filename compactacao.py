@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from formatacao import formatar_brl
+
+# --- CONFIGURAÇÃO ---
+# Representação compacta do histórico em memória (ver compactar):
+#   textos repetidos  -> category (cada texto distinto guardado uma vez + códigos inteiros)
+#   amount            -> centavos em int64 (somas exatas, sem erro de arredondamento do float)
+#   semanas/contadores -> int8/int16
+#   valor_formatado   -> removido; refeito sob demanda por valor_formatado()
+COLUNA_VALOR = 'amount'
+COLUNA_CENTAVOS = 'centavos'
+COLUNAS_DERIVADAS_TEXTO = ['valor_formatado'] # Texto calculável a partir de outras colunas
+COLUNAS_INTEIRAS_PEQUENAS = ['SEMANA_DO_MÊS', 'SEMANA_FATURA', 'ocorrencia', 'sinal']
+# Uma coluna de texto vira category se tiver no máximo esta fração de valores distintos
+# (acima disso, o dicionário quase não se repete e não economiza memória)
+FRACAO_MAX_DISTINTOS = 0.5
+
+
+def _eh_texto(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def _inteiro_pequeno(serie):
+    """Menor inteiro que comporta a coluna (Int8/Int16 anuláveis, se houver ausentes)."""
+    numeros = pd.to_numeric(serie)
+    if numeros.isna().any():
+        maior = numeros.abs().max()
+        return numeros.astype('Int8' if pd.isna(maior) or maior <= np.iinfo(np.int8).max else 'Int16')
+    return pd.to_numeric(numeros.astype(np.int64), downcast='integer')
+
+
+def _como_categoria(serie):
+    """
+    Dicionário de textos + códigos, com uma única passada de hash (factorize).
+    Textos quase todos distintos ficam como estão.
+    """
+    codigos, unicos = pd.factorize(serie, sort=True)
+    if len(unicos) > FRACAO_MAX_DISTINTOS * len(serie):
+        return serie
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=unicos), index=serie.index, name=serie.name)
+
+
+def compactar(df, coluna_data='date', coluna_valor=COLUNA_VALOR):
+    """
+    Versão compacta do DataFrame de transações, para manter históricos grandes
+    em memória: textos repetidos (title, MÊS, MES_FATURA, categoria, extrato de
+    origem...) como category, o valor como centavos int64 (coluna 'centavos',
+    no lugar de `coluna_valor`), semanas como int8 e a data como datetime64.
+    valor_formatado é descartado: use valor_formatado(df) na exibição.
+
+    Somas de 'centavos' são exatas (ex.: Consulta(...).agrupar(por, coluna_valor='centavos')).
+    O DataFrame recebido não é alterado; expandir() faz o caminho de volta.
+    """
+    colunas = {}
+    for nome, serie in df.items():
+        if nome in COLUNAS_DERIVADAS_TEXTO:
+            continue
+        if nome == coluna_valor:
+            valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            centavos = np.rint(valores * 100)
+            # Valores ausentes só são possíveis no inteiro anulável (Int64)
+            colunas[COLUNA_CENTAVOS] = (pd.array(centavos, dtype='Int64') if np.isnan(centavos).any()
+                                        else centavos.astype(np.int64))
+        elif nome == coluna_data:
+            colunas[nome] = pd.to_datetime(serie)
+        elif nome in COLUNAS_INTEIRAS_PEQUENAS:
+            colunas[nome] = _inteiro_pequeno(serie)
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            colunas[nome] = serie
+        elif _eh_texto(serie):
+            colunas[nome] = _como_categoria(serie)
+        else:
+            colunas[nome] = serie
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def expandir(df, coluna_valor=COLUNA_VALOR):
+    """
+    Volta da representação compacta para o layout do pipeline: category ->
+    'string', centavos -> `coluna_valor` em float64 (reais), inteiros pequenos -> Int64.
+    """
+    colunas = {}
+    for nome, serie in df.items():
+        if nome == COLUNA_CENTAVOS:
+            colunas[coluna_valor] = serie.astype('Float64').astype(float) / 100
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            colunas[nome] = serie.astype('string')
+        elif nome in COLUNAS_INTEIRAS_PEQUENAS:
+            colunas[nome] = serie.astype('Int64')
+        else:
+            colunas[nome] = serie
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def valor_formatado(df):
+    """O antigo 'valor_formatado' (R$ 1.234,56), calculado sob demanda a partir dos centavos."""
+    return formatar_brl(df[COLUNA_CENTAVOS].astype('Float64').astype(float) / 100)
+
+
+def uso_memoria_mb(df):
+    """Memória ocupada pelo DataFrame, contando o conteúdo dos textos (memory_usage deep)."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
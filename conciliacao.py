@@ -0,0 +1,191 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from banco_transacoes import eh_banco
+from ciclo_fatura import atribuir_ciclo_fatura, DIA_FECHAMENTO, SIGLAS_MESES
+from vetorizacao import aplicar_por_valores_distintos
+
+# --- CONFIGURAÇÃO ---
+# Colunas que identificam uma transação. Extratos consecutivos se sobrepõem
+# (ex.: Nubank_2025-02-23.csv traz linhas do fim de janeiro), então a mesma
+# transação pode aparecer em mais de um arquivo.
+COLUNAS_IMPRESSAO = ['date', 'title', 'amount']
+TITULO_PAGAMENTO = 'Pagamento recebido'
+# Créditos que desfazem um débito específico: regex do título do crédito -> título
+# do débito de origem (pode usar os grupos da regex). O débito precisa ter o
+# mesmo valor (em módulo) e data igual ou anterior à do crédito.
+REGRAS_CONCILIACAO = [
+    (r'^Estorno de "(.+)"$', r'\1'),
+    (r'^Crédito de atraso$', 'Saldo em atraso'),
+    (r'^Encerramento de dívida$', 'Juros de dívida encerrada'),
+]
+
+
+def impressoes(df, colunas=COLUNAS_IMPRESSAO):
+    """
+    Impressão digital (hash de 64 bits) de cada linha, calculada de uma vez para
+    o DataFrame inteiro. Valores são arredondados para centavos e datas levadas
+    a nanossegundos (o Parquet pode devolver outra unidade) antes do hash.
+    """
+    chaves = df[colunas].copy()
+    for coluna in chaves.columns:
+        if pd.api.types.is_datetime64_any_dtype(chaves[coluna]):
+            chaves[coluna] = chaves[coluna].astype('datetime64[ns]')
+    if 'amount' in chaves.columns:
+        chaves['amount'] = pd.to_numeric(chaves['amount'], errors='coerce').round(2)
+    if 'title' in chaves.columns:
+        chaves['title'] = chaves['title'].astype(object)
+    return pd.util.hash_pandas_object(chaves, index=False).to_numpy()
+
+
+class Deduplicador:
+    """
+    Remove as transações que já vieram de um extrato processado antes.
+
+    Só repetições entre arquivos diferentes contam: dentro de um mesmo extrato,
+    linhas iguais são compras legítimas (ex.: duas passagens de metrô no mesmo dia).
+    As impressões vistas ficam num array ordenado (8 bytes por transação); cada
+    bloco é verificado com searchsorted, sem comparar linhas duas a duas.
+
+    colunas: colunas da impressão (padrão: COLUNAS_IMPRESSAO).
+
+    Uso:
+        dedup = Deduplicador()
+        dedup.registrar(df_ja_consolidado)      # opcional (modo incremental)
+        for df_extrato in extratos:
+            df_extrato = dedup.filtrar(df_extrato)   # um ou mais blocos do extrato
+            dedup.concluir_extrato()
+    """
+
+    def __init__(self, colunas=COLUNAS_IMPRESSAO):
+        self.colunas = colunas
+        self._vistas = np.empty(0, dtype=np.uint64)
+        self._pendentes = []
+        self.removidas = 0
+
+    def _posicoes(self, impressao):
+        """Posições de inserção de `impressao` nas vistas e quais delas já estão lá."""
+        posicoes = np.searchsorted(self._vistas, impressao)
+        vista = posicoes < len(self._vistas)
+        vista[vista] = self._vistas[posicoes[vista]] == impressao[vista]
+        return posicoes, vista
+
+    def _adicionar(self, novas):
+        # Só o lote novo é ordenado; ele entra nas vistas por inserção (uma cópia
+        # linear do array), sem reordenar todo o histórico a cada extrato
+        novas = np.unique(novas)
+        posicoes, vista = self._posicoes(novas)
+        self._vistas = np.insert(self._vistas, posicoes[~vista], novas[~vista])
+
+    def registrar(self, df):
+        """Marca como vistas as transações de um DataFrame já deduplicado."""
+        if len(df):
+            self._adicionar(impressoes(df, self.colunas))
+
+    def filtrar(self, df):
+        """Devolve só as linhas de `df` que não vieram de um extrato anterior."""
+        if not len(df):
+            return df
+        impressao = impressoes(df, self.colunas)
+        _, repetida = self._posicoes(impressao)
+
+        self._pendentes.append(impressao[~repetida])
+        self.removidas += int(repetida.sum())
+        return df[~repetida]
+
+    def concluir_extrato(self):
+        """Fim de um extrato: as linhas dele passam a contar para os próximos."""
+        if self._pendentes:
+            self._adicionar(np.concatenate(self._pendentes))
+            self._pendentes = []
+
+
+def caminho_conciliacao(arquivo_saida, tipo):
+    """
+    Arquivo de um pareamento ('creditos' ou 'pagamentos'), salvo ao lado do
+    consolidado: <nome>_conciliacao_<tipo>.<extensão> (.csv se a saída for um banco).
+    """
+    arquivo_saida = Path(arquivo_saida)
+    extensao = '.csv' if eh_banco(arquivo_saida) else arquivo_saida.suffix
+    return arquivo_saida.with_name(f"{arquivo_saida.stem}_conciliacao_{tipo}{extensao}")
+
+
+def conciliar_creditos(df, coluna_data='date', regras=REGRAS_CONCILIACAO):
+    """
+    Pareia créditos (estornos, créditos de atraso, encerramentos de dívida) com
+    o débito que eles desfazem: o mais recente com o título de origem e o mesmo
+    valor, até a data do crédito. Usa merge_asof (ordenação + busca binária),
+    sem comparar as linhas duas a duas. Se dois créditos apontarem para o mesmo
+    débito, só o primeiro fica pareado.
+
+    Retorna um DataFrame com uma linha por crédito: indice_credito, data_credito,
+    titulo_credito, valor_credito e as mesmas colunas de _debito (NaN se não
+    houver débito de origem).
+    """
+    df = df[df[coluna_data].notna() & pd.to_numeric(df['amount'], errors='coerce').notna()]
+    titulos = df['title'].astype(object)
+    valores = pd.to_numeric(df['amount'], errors='coerce')
+    centavos = np.rint(valores.abs() * 100).astype(np.int64)
+
+    # Título do débito de origem de cada crédito, pela primeira regra que casar
+    origem = pd.Series(np.nan, index=df.index, dtype=object)
+    for padrao, destino in regras:
+        casou = origem.isna() & (valores < 0) & titulos.str.match(padrao)
+        origem[casou] = titulos[casou].str.replace(padrao, destino, regex=True, flags=re.DOTALL)
+
+    colunas = {coluna_data: 'data', 'title': 'titulo', 'amount': 'valor'}
+    eh_credito = origem.notna()
+    eh_debito = valores > 0
+    creditos = (df.loc[eh_credito, [coluna_data, 'title', 'amount']].rename(columns=colunas)
+                .assign(chave=origem[eh_credito], centavos=centavos[eh_credito], indice=df.index[eh_credito])
+                .sort_values('data'))
+    debitos = (df.loc[eh_debito, [coluna_data, 'title', 'amount']].rename(columns=colunas)
+               .assign(chave=titulos[eh_debito], centavos=centavos[eh_debito], indice=df.index[eh_debito])
+               .sort_values('data'))
+    debitos['data_debito'] = debitos['data']
+    if creditos.empty or debitos.empty:
+        # merge_asof não aceita lados vazios: nenhum crédito fica pareado
+        pares = creditos.rename(columns={'data': 'data_credito', 'titulo': 'titulo_credito',
+                                         'valor': 'valor_credito', 'indice': 'indice_credito'})
+        pares = pares.assign(indice_debito=np.nan, data_debito=pd.NaT, titulo_debito=np.nan, valor_debito=np.nan)
+    else:
+        pares = pd.merge_asof(creditos, debitos, on='data', by=['chave', 'centavos'],
+                              direction='backward', suffixes=('_credito', '_debito'))
+        pares = pares.rename(columns={'data': 'data_credito'})
+
+    # Um débito só desfaz um crédito
+    repetido = pares['indice_debito'].notna() & pares['indice_debito'].duplicated()
+    pares.loc[repetido, ['indice_debito', 'data_debito', 'titulo_debito', 'valor_debito']] = np.nan
+
+    return pares[['indice_credito', 'data_credito', 'titulo_credito', 'valor_credito',
+                  'indice_debito', 'data_debito', 'titulo_debito', 'valor_debito']]
+
+
+def conciliar_pagamentos(df, coluna_data='date', dia_fechamento=DIA_FECHAMENTO):
+    """
+    Pareia cada 'Pagamento recebido' com a fatura que ele quita: a do ciclo
+    anterior ao ciclo em que o pagamento entrou (ver ciclo_fatura.py).
+
+    Retorna um DataFrame com data, valor_pago, fatura_paga, total_fatura
+    (soma de tudo o que não é pagamento no ciclo) e diferenca (pago - total).
+    """
+    df = df[df[coluna_data].notna()]
+    valores = pd.to_numeric(df['amount'], errors='coerce')
+    mes_fatura, _ = atribuir_ciclo_fatura(df[coluna_data], dia_fechamento)
+    eh_pagamento = df['title'].astype(object) == TITULO_PAGAMENTO
+
+    # Total por fatura, com os rótulos 'AAAA-MM (MMM)' transformados em períodos mensais
+    periodo = pd.PeriodIndex.from_ordinals(aplicar_por_valores_distintos(
+        mes_fatura, lambda r: pd.Period(r[:7], freq='M').ordinal, dtype=np.int64), freq='M')
+    totais = valores[~eh_pagamento.to_numpy()].groupby(periodo[~eh_pagamento.to_numpy()]).sum().round(2)
+
+    paga = periodo[eh_pagamento.to_numpy()] - 1
+    return pd.DataFrame({
+        'data': df.loc[eh_pagamento, coluna_data].to_numpy(),
+        'valor_pago': -valores[eh_pagamento].to_numpy(),
+        'fatura_paga': [f"{p.year}-{p.month:02d} ({SIGLAS_MESES[p.month - 1]})" for p in paga],
+        'total_fatura': totais.reindex(paga).to_numpy(),
+    }).assign(diferenca=lambda x: (x['valor_pago'] - x['total_fatura']).round(2))
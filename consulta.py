@@ -0,0 +1,263 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import carregar_dataset
+from banco_transacoes import eh_banco, agregar, carregar_banco, dia_seguinte
+
+# --- CONFIGURAÇÃO ---
+TITULO_PAGAMENTO = 'Pagamento recebido'
+METRICAS = ['soma', 'quantidade', 'media', 'minimo', 'maximo']
+
+
+def _mascara(serie, condicao, eh_data=False):
+    """
+    Máscara booleana de uma condição no formato de banco_transacoes._where:
+    valor (igualdade), lista/set (IN) ou tupla (início, fim) inclusiva, com None
+    deixando o lado aberto. Na coluna de data, os limites passam por pd.Timestamp
+    e um fim do tipo date cobre o dia todo.
+    """
+    def valor(v):
+        if not eh_data:
+            return v
+        v = pd.Timestamp(v)
+        fuso = getattr(serie.dt, 'tz', None)
+        return v.tz_localize(fuso) if fuso is not None and v.tzinfo is None else v
+
+    if isinstance(condicao, tuple):
+        inicio, fim = condicao
+        mascara = np.ones(len(serie), dtype=bool)
+        if inicio is not None:
+            mascara &= (serie >= valor(inicio)).to_numpy()
+        if fim is not None and eh_data and dia_seguinte(fim) is not None:
+            mascara &= (serie < valor(dia_seguinte(fim))).to_numpy()
+        elif fim is not None:
+            mascara &= (serie <= valor(fim)).to_numpy()
+        return mascara
+    if isinstance(condicao, (list, set)):
+        return serie.isin([valor(v) for v in condicao]).to_numpy()
+    return (serie == valor(condicao)).to_numpy()
+
+
+class Consulta:
+    """
+    Consulta preguiçosa sobre as transações. filtrar, derivar, agrupar etc. só
+    montam o plano (cada chamada devolve uma nova Consulta, então uma consulta
+    base pode ser reaproveitada); nada é lido nem calculado até executar().
+
+    Na execução, o plano roda de uma vez:
+      - só as colunas usadas pelo plano são lidas (nos formatos colunares, as
+        demais nem saem do disco; no CSV, só elas são convertidas);
+      - os filtros viram uma única máscara, aplicada antes das colunas
+        derivadas, que só são calculadas nas linhas que sobraram;
+      - no banco SQLite, sem colunas derivadas, o plano inteiro vira um único
+        comando SQL (ver banco_transacoes.agregar e carregar_banco).
+    O DataFrame de origem não é copiado inteiro nem alterado.
+
+    fonte: DataFrame ou caminho de um dataset (ver armazenamento.py).
+
+    Uso:
+        gastos = Consulta('extratos.parquet').excluir_pagamentos().com_sinal(1)
+        por_semana = gastos.agrupar(['SEMANA_DO_MÊS']).executar()
+        por_mes = gastos.agrupar(['MÊS']).executar()
+    """
+
+    def __init__(self, fonte, coluna_data='date'):
+        self.fonte = fonte
+        self.coluna_data = coluna_data
+        self._filtros = {}
+        self._derivadas = {} # nome -> (função, colunas de entrada)
+        self._coluna_titulo = None # Preenchida por excluir_pagamentos()
+        self._sinal = None
+        self._por = None
+        self._coluna_valor = 'amount'
+        self._colunas = None
+        self._ordem = None
+        self._limite = None
+        self._deslocamento = 0
+
+    def _com(self, **mudancas):
+        nova = copy.copy(self)
+        nova._filtros = dict(self._filtros)
+        nova._derivadas = dict(self._derivadas)
+        for nome, valor in mudancas.items():
+            setattr(nova, '_' + nome, valor)
+        return nova
+
+    # -----------------------------------------------------------------
+    # MONTAGEM DO PLANO
+    # -----------------------------------------------------------------
+
+    def filtrar(self, filtros):
+        """
+        Mantém só as linhas que passam em {coluna: condição} (todas ao mesmo
+        tempo). A condição segue banco_transacoes._where: valor, lista ou tupla
+        (início, fim). Um novo filtro na mesma coluna substitui o anterior.
+        """
+        nova = self._com()
+        nova._filtros.update(filtros)
+        return nova
+
+    def excluir_pagamentos(self, coluna_titulo='title'):
+        """Ignora as linhas 'Pagamento recebido', como nas análises de gasto."""
+        return self._com(coluna_titulo=coluna_titulo)
+
+    def com_sinal(self, sinal):
+        """Mantém só valores negativos (-1), positivos (1) ou zerados (0)."""
+        return self._com(sinal=sinal)
+
+    def derivar(self, nome, funcao, colunas):
+        """
+        Acrescenta a coluna `nome`, calculada por `funcao` a partir de um DataFrame
+        que contém (pelo menos) `colunas`, já filtrado. Pode ser usada nos filtros,
+        no agrupamento e na seleção, inclusive por derivadas seguintes.
+        """
+        nova = self._com()
+        nova._derivadas[nome] = (funcao, list(colunas))
+        return nova
+
+    def agrupar(self, por, coluna_valor='amount'):
+        """
+        Agrega `coluna_valor` por `por` (lista vazia = total geral) em soma,
+        quantidade, media, minimo e maximo, como cubo_agregado.consultar_cubo.
+        """
+        return self._com(por=list(por), coluna_valor=coluna_valor)
+
+    def selecionar(self, colunas):
+        """Colunas do resultado, quando não há agrupamento."""
+        return self._com(colunas=list(colunas))
+
+    def ordenar(self, coluna):
+        """Ordena o resultado pela coluna ('-coluna' = decrescente)."""
+        return self._com(ordem=coluna)
+
+    def limitar(self, limite, deslocamento=0):
+        """
+        Devolve só `limite` linhas (depois da ordenação), pulando as primeiras
+        `deslocamento`: uma página da tabela, sem materializar as demais.
+        """
+        return self._com(limite=limite, deslocamento=deslocamento)
+
+    # -----------------------------------------------------------------
+    # EXECUÇÃO
+    # -----------------------------------------------------------------
+
+    def colunas_necessarias(self):
+        """Colunas da fonte que o plano usa (None = todas, sem agrupamento nem seleção)."""
+        if self._por is None and self._colunas is None:
+            return None
+
+        usadas = list(self._filtros)
+        if self._coluna_titulo is not None:
+            usadas.append(self._coluna_titulo)
+        if self._sinal is not None or self._por is not None:
+            usadas.append(self._coluna_valor)
+        for _, entradas in self._derivadas.values():
+            usadas.extend(entradas)
+        usadas.extend(self._por if self._por is not None else self._colunas)
+        if self._ordem:
+            usadas.append(self._ordem.lstrip('-'))
+        return list(dict.fromkeys(c for c in usadas if c not in self._derivadas))
+
+    def explicar(self):
+        """Descrição do plano, na ordem em que ele é executado."""
+        colunas = self.colunas_necessarias()
+        etapas = [f"ler {'todas as colunas' if colunas is None else colunas} de "
+                  f"{'DataFrame' if isinstance(self.fonte, pd.DataFrame) else self.fonte}"]
+        filtros = {c: v for c, v in self._filtros.items() if c not in self._derivadas}
+        if filtros or self._coluna_titulo or self._sinal is not None:
+            etapas.append(f"filtrar (uma máscara): {filtros}"
+                          + (", sem pagamentos" if self._coluna_titulo else "")
+                          + (f", sinal {self._sinal}" if self._sinal is not None else ""))
+        for nome in self._derivadas:
+            etapas.append(f"derivar '{nome}'")
+        derivados = {c: v for c, v in self._filtros.items() if c in self._derivadas}
+        if derivados:
+            etapas.append(f"filtrar derivadas: {derivados}")
+        if self._por is not None:
+            etapas.append(f"agrupar '{self._coluna_valor}' por {self._por}")
+        else:
+            etapas.extend(f for f in (self._ordem and f"ordenar por {self._ordem}",
+                                      self._limite and f"limitar a {self._limite}",
+                                      self._deslocamento and f"a partir da linha {self._deslocamento}") if f)
+        if self._sql_direto():
+            etapas = ["SQL único no banco: " + "; ".join(etapas[1:] or ["ler tudo"])]
+        return "\n".join(f"{i}. {etapa}" for i, etapa in enumerate(etapas, 1))
+
+    def _sql_direto(self):
+        """O plano pode ser executado inteiro pelo SQLite?"""
+        if isinstance(self.fonte, pd.DataFrame) or not eh_banco(self.fonte) or self._derivadas:
+            return False
+        if self._por is not None:
+            return self._coluna_titulo in (None, 'title')
+        return self._coluna_titulo is None and self._sinal is None
+
+    def executar(self):
+        """Executa o plano e devolve o resultado como DataFrame."""
+        if isinstance(self.fonte, pd.DataFrame):
+            return self._executar_pandas(self.fonte)
+
+        if self._sql_direto():
+            if self._por is not None:
+                return agregar(self.fonte, self._por, self._filtros, excluir_pagamentos=self._coluna_titulo is not None,
+                               sinal=self._sinal, coluna_valor=self._coluna_valor, coluna_data=self.coluna_data)
+            return carregar_banco(self.fonte, self._colunas, self.coluna_data, self._filtros,
+                                  ordem=self._ordem, limite=self._limite, deslocamento=self._deslocamento)
+
+        colunas = self.colunas_necessarias()
+        if eh_banco(self.fonte):
+            # Os filtros nas colunas da tabela continuam sendo feitos pelo SQLite
+            filtros = {c: v for c, v in self._filtros.items() if c not in self._derivadas}
+            df = carregar_banco(self.fonte, colunas, self.coluna_data, filtros)
+            restante = self._com()
+            restante._filtros = {c: v for c, v in self._filtros.items() if c in self._derivadas}
+            return restante._executar_pandas(df)
+        return self._executar_pandas(carregar_dataset(self.fonte, colunas, self.coluna_data))
+
+    def _executar_pandas(self, df):
+        # 1. Filtros nas colunas da fonte, combinados numa máscara só
+        mascara = np.ones(len(df), dtype=bool)
+        for coluna, condicao in self._filtros.items():
+            if coluna not in self._derivadas:
+                mascara &= _mascara(df[coluna], condicao, coluna == self.coluna_data)
+        if self._coluna_titulo is not None:
+            mascara &= (df[self._coluna_titulo] != TITULO_PAGAMENTO).to_numpy()
+        if self._sinal is not None:
+            valor = pd.to_numeric(df[self._coluna_valor], errors='coerce')
+            mascara &= (np.sign(valor) == self._sinal).to_numpy()
+
+        # 2. Única cópia: linhas filtradas, só com as colunas do plano
+        colunas = self.colunas_necessarias()
+        df = df.loc[mascara, df.columns if colunas is None else colunas]
+
+        # 3. Colunas derivadas (só nas linhas que sobraram) e filtros sobre elas
+        for nome, (funcao, _) in self._derivadas.items():
+            df[nome] = funcao(df)
+        mascara = np.ones(len(df), dtype=bool)
+        for coluna, condicao in self._filtros.items():
+            if coluna in self._derivadas:
+                mascara &= _mascara(df[coluna], condicao)
+        if not mascara.all():
+            df = df[mascara]
+
+        # 4. Agregação ou seleção final
+        if self._por is not None:
+            return self._agregar(df)
+        if self._ordem:
+            df = df.sort_values(self._ordem.lstrip('-'), ascending=not self._ordem.startswith('-'), kind='stable')
+        if self._limite or self._deslocamento:
+            fim = self._deslocamento + self._limite if self._limite else None
+            df = df.iloc[self._deslocamento:fim]
+        return (df if self._colunas is None else df[self._colunas]).reset_index(drop=True)
+
+    def _agregar(self, df):
+        valor = pd.to_numeric(df[self._coluna_valor], errors='coerce')
+        if self._por:
+            grupos = valor.groupby([df[c] for c in self._por], dropna=False, observed=True, sort=True)
+            resultado = grupos.agg(soma='sum', quantidade='count', minimo='min', maximo='max').reset_index()
+        else:
+            resultado = pd.DataFrame({'soma': [valor.sum()], 'quantidade': [valor.count()],
+                                      'minimo': [valor.min()], 'maximo': [valor.max()]})
+        resultado['media'] = resultado['soma'] / resultado['quantidade'].where(resultado['quantidade'] > 0)
+        return resultado[self._por + METRICAS]
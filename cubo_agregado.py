@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from categorizacao import categorizar_descricoes
+from ciclo_fatura import atribuir_ciclo_fatura, DIA_FECHAMENTO
+
+# --- CONFIGURAÇÃO ---
+# Dimensões do cubo. Toda análise semanal/mensal/por categoria é uma soma de
+# células deste cubo, então pode ser respondida sem reler as transações.
+DIMENSOES = ['MES_FATURA', 'SEMANA_FATURA', 'MÊS', 'SEMANA_DO_MÊS', 'categoria']
+# Dimensões auxiliares, sempre presentes, usadas como filtros nas consultas
+COLUNA_PAGAMENTO = 'pagamento' # True para 'Pagamento recebido' (excluído das análises de gasto)
+COLUNA_SINAL = 'sinal' # -1, 0 ou 1: sinal do valor (despesa/receita no extrato da conta)
+TITULO_PAGAMENTO = 'Pagamento recebido'
+# Partição por extrato de origem: permite trocar só as células de um extrato no modo incremental
+COLUNA_PARTICAO = 'arquivo_origem'
+METRICAS = ['soma', 'quantidade', 'media', 'minimo', 'maximo']
+
+
+def caminho_cubo(arquivo_saida):
+    """Arquivo do cubo, salvo ao lado do consolidado: <nome>_cubo.<extensão>."""
+    arquivo_saida = Path(arquivo_saida)
+    return arquivo_saida.with_name(arquivo_saida.stem + '_cubo' + arquivo_saida.suffix)
+
+
+def construir_cubo(df, dimensoes=DIMENSOES, coluna_valor='amount', coluna_titulo='title',
+                   coluna_data='date', dia_fechamento=DIA_FECHAMENTO):
+    """
+    Agrega as transações em soma, quantidade, média, mínimo e máximo do valor
+    por combinação das dimensões (+ pagamento, sinal e, se existir, extrato de origem).
+
+    Dimensões ausentes no DataFrame são derivadas quando possível: 'categoria'
+    a partir do título e MES_FATURA/SEMANA_FATURA a partir da data. O DataFrame
+    recebido não é alterado.
+    """
+    valor = pd.to_numeric(df[coluna_valor], errors='coerce')
+    chaves = {}
+
+    ciclo = None
+    for dim in dimensoes:
+        if dim in df.columns:
+            chaves[dim] = df[dim]
+        elif dim == 'categoria' and coluna_titulo in df.columns:
+            chaves[dim] = categorizar_descricoes(df[coluna_titulo])
+        elif dim in ('MES_FATURA', 'SEMANA_FATURA') and coluna_data in df.columns:
+            if ciclo is None:
+                ciclo = dict(zip(('MES_FATURA', 'SEMANA_FATURA'),
+                                 atribuir_ciclo_fatura(df[coluna_data], dia_fechamento)))
+            chaves[dim] = ciclo[dim]
+        else:
+            raise KeyError(f"Dimensão '{dim}' não existe no DataFrame e não pode ser derivada.")
+
+    if coluna_titulo in df.columns:
+        chaves[COLUNA_PAGAMENTO] = df[coluna_titulo] == TITULO_PAGAMENTO
+    else:
+        chaves[COLUNA_PAGAMENTO] = pd.Series(False, index=df.index)
+    chaves[COLUNA_SINAL] = np.sign(valor).fillna(0).astype('int8')
+    if COLUNA_PARTICAO in df.columns:
+        chaves[COLUNA_PARTICAO] = df[COLUNA_PARTICAO]
+
+    grupos = valor.groupby([serie.rename(nome) for nome, serie in chaves.items()],
+                           dropna=False, observed=True, sort=False)
+    cubo = grupos.agg(soma='sum', quantidade='count', minimo='min', maximo='max').reset_index()
+    return _finalizar(cubo)
+
+
+def _finalizar(cubo):
+    cubo['media'] = cubo['soma'] / cubo['quantidade'].where(cubo['quantidade'] > 0)
+    chaves = [c for c in cubo.columns if c not in METRICAS]
+    return cubo[chaves + METRICAS]
+
+
+def _reagregar(cubo, por):
+    """Soma de somas/quantidades, mínimo dos mínimos e máximo dos máximos; a média é recalculada."""
+    agregado = cubo.groupby(por, dropna=False, observed=True, sort=True).agg(
+        soma=('soma', 'sum'), quantidade=('quantidade', 'sum'),
+        minimo=('minimo', 'min'), maximo=('maximo', 'max'),
+    ).reset_index()
+    return _finalizar(agregado)
+
+
+def combinar_cubos(cubos):
+    """Junta cubos parciais (ex.: de blocos no modo streaming) num cubo só."""
+    cubos = [c for c in cubos if len(c)]
+    if not cubos:
+        return None
+    cubo = pd.concat(cubos, ignore_index=True)
+    chaves = [c for c in cubo.columns if c not in METRICAS]
+    return _reagregar(cubo, chaves)
+
+
+def atualizar_cubo(cubo, cubo_novos, substituidos):
+    """
+    Atualização incremental: descarta as células dos extratos alterados/removidos
+    (`substituidos`) e acrescenta as células dos extratos novos.
+    """
+    cubo = cubo[~cubo[COLUNA_PARTICAO].isin(substituidos)]
+    return combinar_cubos([cubo, cubo_novos])
+
+
+def consultar_cubo(cubo, por, excluir_pagamentos=False, sinal=None):
+    """
+    Responde uma agregação a partir do cubo (sem reler as transações).
+
+    por: dimensões do resultado (ex.: ['SEMANA_DO_MÊS'] ou ['categoria']).
+    excluir_pagamentos: ignora 'Pagamento recebido', como nas análises de gasto.
+    sinal: -1 só despesas (valores negativos), 1 só receitas, None todos.
+    Retorna um DataFrame com `por` + soma, quantidade, media, minimo e maximo.
+    """
+    filtro = pd.Series(True, index=cubo.index)
+    if excluir_pagamentos:
+        filtro &= ~cubo[COLUNA_PAGAMENTO].astype(bool)
+    if sinal is not None:
+        filtro &= cubo[COLUNA_SINAL] == sinal
+    return _reagregar(cubo[filtro], por)
@@ -1,196 +1,313 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import io
+import os
+import hashlib
+
+from banco_transacoes import intervalo_datas
+from consulta import Consulta
+from deteccao import detectar_padroes
+from formatacao import formatar_brl
+from processamento_uploads import GerenciadorUploads, LIMITE_ANOMALIAS_EXIBIDAS
+from serie_temporal import reduzir_resolucao
 
 # ----------------------------------------------------
 # 1. FUNÇÕES DE LÓGICA E CATEGORIZAÇÃO
 # ----------------------------------------------------
 
-def categorize_transaction(description):
-    """
-    Categoriza transações baseado na descrição. 
-    (Utilize a lógica de palavras-chave que você já implementou)
-    """
-    # Lógica de Categorização (Exemplo baseado no seu código anterior)
-    description = str(description).lower()
-    
-    categories = {
-        'Alimentação': ['restaurante', 'lanchonete', 'padaria', 'supermercado', 'mercado', 'ifood', 'comida'],
-        'Transporte': ['uber', 'taxi', 'combustivel', 'posto', 'gasolina', 'metro'],
-        'Lazer': ['cinema', 'teatro', 'show', 'netflix', 'spotify', 'amazon', "shopee"],
-        'Saque': ['saque dinheiro banco 24h'],
-        'Serviços/Contas': ['tarifa', 'servico', 'agua', 'energia', 'net', 'pix enviado'],
-        'Educação': ['escola', 'curso', 'livro'],
-        'Remuneração': ['salario', 'credito de', 'remuneracao'],
-    }
-    
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword in description:
-                return category
-                
-    return 'Outros'
-
-def process_uploaded_csv(uploaded_file):
-    """
-    Lê e padroniza o DataFrame de extrato CSV, consolidando Crédito e Débito.
-    """
-    # 1. Leitura do CSV
-    csv_content = uploaded_file.read().decode('utf-8')
-    df = pd.read_csv(io.StringIO(csv_content), sep=",")
-
-    print(df)  # Debug: Verifique as primeiras linhas do DataFrame
-    
-    # 2. Padronização das Colunas (Adaptando para extratos típicos)
-    
-# Tenta identificar as colunas automaticamente
-# Procura por colunas que podem conter datas, valores e descrições
-    date_col = None
-    value_col = None
-    description_col = None
-
-    for col in df.columns:
-        col_lower = col.lower()
-        if any(word in col_lower for word in ['data', 'date', 'dt']):
-            date_col = col
-        elif any(word in col_lower for word in ['valor', 'value', 'amount', 'quantia']):
-            value_col = col
-        elif any(word in col_lower for word in ['descricao', 'description', 'historico', 'desc']):
-            description_col = col
-
-    # Se não encontrou as colunas, usa as primeiras disponíveis
-    if not date_col and len(df.columns) > 0:
-        date_col = df.columns[0]
-    if not value_col and len(df.columns) > 1:
-        value_col = df.columns[1]
-    if not description_col and len(df.columns) > 2:
-        description_col = df.columns[2]
-
-    # Limpa e converte os dados
-    df[value_col] = pd.to_numeric(df[value_col].astype(str).str.replace('.', ',').str.replace(r'[^\d.-]', '', regex=True), errors='coerce')
-
-    # Remove linhas com valores NaN
-    df = df.dropna(subset=[value_col])
-
-    # Categoriza as transações
-    if description_col:
-        df['categoria'] = df[description_col].apply(categorize_transaction)
-    else:
-        df['categoria'] = 'Outros'
-
-    # Converte datas
-    if date_col:
-        df[date_col] = pd.to_datetime(df[date_col], errors='coerce', dayfirst=True)
-        df = df.dropna(subset=[date_col])
-        df['mes_ano'] = df[date_col].dt.to_period('M').astype(str)
-    else:
-        df['mes_ano'] = 'N/A'
+# A tabela de palavras-chave e o categorizador compilado ficam em categorizacao.py.
+# A leitura do CSV enviado (process_uploaded_csv) e os agregados do upload ficam em
+# processamento_uploads.py, que os executa em segundo plano, num pool de processos.
 
-    # Calcula métricas
-    receitas = df[df[value_col] > 0][value_col].sum()
-    despesas = abs(df[df[value_col] < 0][value_col].sum())
-    saldo = receitas - despesas
+# ----------------------------------------------------
+# 2. PROCESSAMENTO DOS UPLOADS EM SEGUNDO PLANO
+# ----------------------------------------------------
 
-    print(f"Receitas: {receitas}, Despesas: {despesas}, Saldo: {saldo}")
+# Cada interação com um widget reexecuta o script inteiro. Para não reprocessar
+# o mesmo upload, tudo é chaveado pelo hash do conteúdo do arquivo. O número de
+# entradas é limitado (as menos usadas recentemente são descartadas), para a
+# memória não crescer sem limite com muitos usuários.
+MAX_UPLOADS_EM_CACHE = 8
+MAX_AGREGADOS_EM_CACHE = 32
+# A tabela de transações é paginada no servidor: só as linhas da página vão ao navegador
+TAMANHOS_PAGINA = [50, 100, 500]
+INTERVALO_ATUALIZACAO = 0.5 # Segundos entre duas consultas ao andamento de um upload em processamento
 
-    # Aplica a categorização
-    df['categoria'] = df[description_col].apply(categorize_transaction)
+def hash_conteudo(conteudo):
+    """Chave do cache: SHA-256 dos bytes do upload."""
+    return hashlib.sha256(conteudo).hexdigest()
 
-    return df
+# Um único gerenciador (e um único pool de processos) para todas as sessões: o
+# mesmo arquivo enviado por duas sessões é processado uma vez, e o número de
+# uploads processados ao mesmo tempo fica limitado ao número de processos
+@st.cache_resource(show_spinner=False)
+def obter_gerenciador():
+    return GerenciadorUploads(max_tarefas=MAX_UPLOADS_EM_CACHE)
 
 # ----------------------------------------------------
-# 2. INTERFACE STREAMLIT
+# 3. CONSULTAS AO BANCO LOCAL
 # ----------------------------------------------------
 
-st.set_page_config(layout="wide")
-st.title("💸 Dashboard de Análise de Extratos")
-st.caption("Faça o upload do seu extrato no formato CSV.")
-
-# Widget de Upload
-uploaded_file = st.file_uploader("Selecione o arquivo CSV", type=['csv'])
-
-if uploaded_file is not None:
-    
-    with st.spinner('Processando e analisando dados...'):
-        
-        df_final = process_uploaded_csv(uploaded_file)
-
-        print(df_final)  # Debug: Verifique as primeiras linhas do DataFrame final   
-        
-        if df_final is not None:
-
-            print(df_final)  # Debug
-            
-            # Cálculo de Métricas
-            print(df_final['Valor'].sum()) 
-             # Debug: Verifique os valores na coluna 'valor'
-            receitas = df_final[df_final['Valor'] > 0]['Valor'].sum()
-            print("Receitas calculadas:", receitas)  # Debug
-            despesas = abs(df_final[df_final['Valor'] < 0]['Valor'].sum())
-            saldo = receitas - despesas
-
-            # ----------------------------------
-            # Exibição de Métricas (KPIs)
-            # ----------------------------------
-            st.header("Resumo Financeiro")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Receitas Totais", f"R$ {receitas:.2f}")
-            col2.metric("Despesas Totais", f"R$ {despesas:.2f}")
-            col3.metric("Saldo Líquido", f"R$ {saldo:.2f}", delta=f"{saldo:.2f}")
-
-            st.markdown("---")
-            
-            # ----------------------------------
-            # Gráfico 1: Despesas por Categoria (Pizza)
-            # ----------------------------------
-            st.subheader("Distribuição de Gastos")
-            
-            # Filtra apenas despesas
-            df_despesas = df_final[df_final['Valor'] < 0].copy()
-            
-            # Agrupa e calcula a soma absoluta
-            despesas_por_categoria = df_despesas.groupby('categoria')['Valor'].sum().abs().reset_index()
-            
-            fig_pizza = px.pie(
-                despesas_por_categoria,
-                values='Valor',
-                names='categoria',
-                title='Proporção de Gastos por Categoria',
-                hole=.3 # Cria o efeito "Donut"
-            )
-            st.plotly_chart(fig_pizza, use_container_width=True)
-
-            # ----------------------------------
-            # Gráfico 2: Evolução Mensal (Barras)
-            # ----------------------------------
-            st.subheader("Evolução Mensal das Despesas")
-            
-            df_despesas['mes_ano'] = df_despesas['Data'].dt.to_period('M').astype(str)
-            
-            despesas_mensais = df_despesas.groupby('mes_ano')['Valor'].sum().abs().reset_index()
-            
-            fig_barras = px.bar(
-                despesas_mensais,
-                x='mes_ano',
-                y='Valor',
-                title='Gastos Totais por Mês',
-                labels={'mes_ano': 'Mês/Ano', 'Valor': 'Despesa Total (R$)'}
-            )
-            st.plotly_chart(fig_barras, use_container_width=True)
-
-            st.markdown("---")
-            st.subheader("Tabela de Transações Categorizadas")
-            st.dataframe(df_final.sort_values(by='data', ascending=False), use_container_width=True)
+# Banco gerado pelo pipeline com ARQUIVO_SAIDA .sqlite (ver banco_transacoes.py).
+# Filtros e agrupamentos são feitos pelo SQLite; só os resultados chegam ao pandas.
+ARQUIVO_BANCO = 'extratos_nubank_consolidado_analise.sqlite'
+COLUNAS_TABELA_BANCO = ['date', 'title', 'amount', 'categoria', 'MES_FATURA']
+
+# A versão (mtime do arquivo) entra na chave do cache: uma nova carga do pipeline invalida tudo
+@st.cache_data(max_entries=MAX_AGREGADOS_EM_CACHE, show_spinner=False)
+def consultar_intervalo_banco(caminho, versao):
+    return intervalo_datas(caminho)
+
+@st.cache_data(max_entries=MAX_AGREGADOS_EM_CACHE, show_spinner=False)
+def consultar_banco(caminho, versao, inicio, fim):
+    # No extrato do cartão, gastos são positivos e pagamentos/estornos negativos.
+    # Sem colunas derivadas, cada consulta vira um único comando SQL.
+    periodo = Consulta(caminho).filtrar({'date': (inicio, fim)})
+    gastos = periodo.com_sinal(1).agrupar([]).executar()['soma'].fillna(0).iloc[0]
+    creditos = abs(periodo.com_sinal(-1).agrupar([]).executar()['soma'].fillna(0).iloc[0])
+    kpis = (creditos, gastos, creditos - gastos)
+
+    despesas = periodo.excluir_pagamentos().com_sinal(1)
+    por_categoria = despesas.agrupar(['categoria']).executar()
+    mensais = despesas.agrupar(['mes_ano']).executar()
+    por_dia = despesas.agrupar(['dia']).executar()
+    total_transacoes = int(periodo.agrupar([]).executar()['quantidade'].iloc[0])
+    return (kpis,
+            por_categoria.rename(columns={'soma': 'Valor'})[['categoria', 'Valor']],
+            mensais.rename(columns={'soma': 'Valor'})[['mes_ano', 'Valor']],
+            reduzir_resolucao(por_dia.set_index(pd.to_datetime(por_dia['dia']))['soma']),
+            total_transacoes)
+
+@st.cache_data(max_entries=MAX_AGREGADOS_EM_CACHE, show_spinner=False)
+def consultar_padroes_banco(caminho, versao, inicio, fim):
+    # Só as 4 colunas usadas saem do SQLite; a detecção roda sobre o período escolhido
+    transacoes = (Consulta(caminho).filtrar({'date': (inicio, fim)})
+                  .selecionar(['date', 'title', 'amount', 'MES_FATURA']).executar())
+    recorrencias, anomalias = detectar_padroes(transacoes)
+    return recorrencias, anomalias.head(LIMITE_ANOMALIAS_EXIBIDAS), len(anomalias)
+
+@st.cache_data(max_entries=MAX_AGREGADOS_EM_CACHE, show_spinner=False)
+def consultar_pagina_banco(caminho, versao, inicio, fim, pagina, tamanho):
+    # ORDER BY date DESC com LIMIT/OFFSET: o SQLite percorre o índice de data e só devolve a página
+    return (Consulta(caminho).filtrar({'date': (inicio, fim)}).selecionar(COLUNAS_TABELA_BANCO)
+            .ordenar('-date').limitar(tamanho, (pagina - 1) * tamanho).executar())
 
 # ----------------------------------------------------
-# Instrução para Execução
+# 4. INTERFACE STREAMLIT
 # ----------------------------------------------------
-st.sidebar.markdown(
+
+def exibir_kpis(receitas, despesas, saldo):
+    # ----------------------------------
+    # Exibição de Métricas (KPIs)
+    # ----------------------------------
+    st.header("Resumo Financeiro")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Receitas Totais", formatar_brl(receitas))
+    col2.metric("Despesas Totais", formatar_brl(despesas))
+    col3.metric("Saldo Líquido", formatar_brl(saldo), delta=f"{saldo:.2f}")
+
+    st.markdown("---")
+
+def exibir_graficos(despesas_por_categoria, despesas_mensais, despesas_no_tempo):
+    """despesas_no_tempo: (série, resolução) de reduzir_resolucao."""
+    # ----------------------------------
+    # Gráfico 1: Despesas por Categoria (Pizza)
+    # ----------------------------------
+    st.subheader("Distribuição de Gastos")
+
+    fig_pizza = px.pie(
+        despesas_por_categoria,
+        values='Valor',
+        names='categoria',
+        title='Proporção de Gastos por Categoria',
+        hole=.3 # Cria o efeito "Donut"
+    )
+    st.plotly_chart(fig_pizza, use_container_width=True)
+
+    # ----------------------------------
+    # Gráfico 2: Evolução Mensal (Barras)
+    # ----------------------------------
+    st.subheader("Evolução Mensal das Despesas")
+
+    fig_barras = px.bar(
+        despesas_mensais,
+        x='mes_ano',
+        y='Valor',
+        title='Gastos Totais por Mês',
+        labels={'mes_ano': 'Mês/Ano', 'Valor': 'Despesa Total (R$)'}
+    )
+    st.plotly_chart(fig_barras, use_container_width=True)
+
+    # ----------------------------------
+    # Gráfico 3: Despesas ao Longo do Tempo (Linha)
+    # ----------------------------------
+    serie, resolucao = despesas_no_tempo
+    fig_linha = px.line(
+        serie.rename_axis('Data').reset_index(name='Valor'),
+        x='Data',
+        y='Valor',
+        title=f'Despesas por {resolucao}',
+        labels={'Valor': 'Despesa (R$)'}
+    )
+    st.plotly_chart(fig_linha, use_container_width=True)
+
+def exibir_tabela(total_transacoes, buscar_pagina):
+    """buscar_pagina(pagina, tamanho): DataFrame só com as transações da página."""
+    st.markdown("---")
+    st.subheader("Tabela de Transações Categorizadas")
+    col_tamanho, col_pagina = st.columns([1, 3])
+    tamanho = col_tamanho.selectbox("Linhas por página", TAMANHOS_PAGINA)
+    num_paginas = max(1, -(-total_transacoes // tamanho))
+    # A chave muda com o total/tamanho: um novo período ou upload volta para a página 1
+    pagina = col_pagina.number_input(f"Página (de {num_paginas})", min_value=1, max_value=num_paginas,
+                                     value=1, step=1, key=f"pagina_{total_transacoes}_{tamanho}")
+    st.dataframe(buscar_pagina(int(pagina), tamanho), use_container_width=True)
+    st.caption(f"{total_transacoes:,} transações".replace(',', '.'))
+
+def exibir_painel(receitas, despesas, saldo, despesas_por_categoria, despesas_mensais, despesas_no_tempo,
+                  total_transacoes, buscar_pagina):
+    exibir_kpis(receitas, despesas, saldo)
+    exibir_graficos(despesas_por_categoria, despesas_mensais, despesas_no_tempo)
+    exibir_tabela(total_transacoes, buscar_pagina)
+
+def exibir_padroes(recorrencias, anomalias, total_anomalias, coluna_data, coluna_titulo, coluna_valor):
+    """Assinaturas/recorrências e cobranças atípicas (ver deteccao.py)."""
+    st.markdown("---")
+    st.subheader("Assinaturas e Cobranças Recorrentes")
+    assinaturas = recorrencias[recorrencias['recorrente']]
+    if assinaturas.empty:
+        st.info("Nenhuma cobrança recorrente encontrada no período.")
+    else:
+        st.dataframe(pd.DataFrame({
+            'Estabelecimento': assinaturas['estabelecimento'],
+            'Periodicidade': assinaturas['periodicidade'],
+            'Valor típico': formatar_brl(assinaturas['valor_tipico']),
+            'Última cobrança': assinaturas['ultima'].dt.date,
+            'Próxima prevista': assinaturas['proxima_prevista'].dt.date,
+            'Ativa': assinaturas['ativa'],
+        }), use_container_width=True, hide_index=True)
+
+    st.subheader("Cobranças Atípicas")
+    st.caption("Tarifas/encargos, valores muito acima do histórico do estabelecimento e "
+               "recorrências cobradas duas vezes na mesma fatura.")
+    if anomalias.empty:
+        st.info("Nenhuma cobrança atípica encontrada no período.")
+        return
+    st.dataframe(pd.DataFrame({
+        'Data': anomalias[coluna_data].dt.date,
+        'Descrição': anomalias[coluna_titulo],
+        'Valor': formatar_brl(anomalias[coluna_valor]),
+        'Tipo': anomalias['tipo'],
+        'Valor típico': formatar_brl(anomalias['valor_tipico']),
+    }), use_container_width=True, hide_index=True)
+    if total_anomalias > len(anomalias):
+        st.caption(f"Exibindo as {len(anomalias)} mais recentes de {total_anomalias}.")
+
+def exibir_resultados_parciais(situacao):
+    """KPIs assim que ficam prontos e, depois, os gráficos (ver GerenciadorUploads.situacao)."""
+    if 'kpis' in situacao:
+        exibir_kpis(*situacao['kpis'])
+    if all(parte in situacao for parte in ('por_categoria', 'mensais', 'no_tempo')):
+        exibir_graficos(situacao['por_categoria'], situacao['mensais'], situacao['no_tempo'])
+
+def situacao_upload(chave, conteudo):
     """
-    **Instruções para Rodar:**
-    1. Salve o código como `app_streamlit.py`.
-    2. Instale as bibliotecas: `pip install streamlit pandas plotly`.
-    3. Execute no terminal: `streamlit run app_streamlit.py`.
+    Andamento do upload no gerenciador. Submeter é idempotente: o mesmo arquivo
+    não é reprocessado a cada rerun, só se a tarefa pronta tiver sido descartada
+    para dar lugar a uploads de outras sessões (situacao devolve None).
     """
-)
\ No newline at end of file
+    gerenciador = obter_gerenciador()
+    situacao = gerenciador.situacao(chave)
+    while situacao is None:
+        gerenciador.submeter(chave, conteudo)
+        situacao = gerenciador.situacao(chave)
+    return situacao
+
+# Fragmento: enquanto o upload é processado, só este trecho da página é
+# reexecutado (a cada INTERVALO_ATUALIZACAO), e não o script inteiro
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def acompanhar_upload(chave, conteudo):
+    situacao = situacao_upload(chave, conteudo)
+    if situacao['concluida']:
+        # Uma última execução da página inteira troca o acompanhamento pelo painel completo
+        st.rerun()
+    st.progress(situacao['progresso'], text=situacao['etapa'])
+    exibir_resultados_parciais(situacao)
+
+def exibir_upload(chave, conteudo):
+    """
+    Mostra o upload à medida que o processamento em segundo plano avança: a
+    barra de progresso, os KPIs assim que ficam prontos, depois os gráficos e,
+    ao final, a tabela e as assinaturas/cobranças atípicas.
+    """
+    situacao = situacao_upload(chave, conteudo)
+    if not situacao['concluida']:
+        acompanhar_upload(chave, conteudo)
+        return
+    if situacao['erro']:
+        st.error(f"Não foi possível processar o arquivo: {situacao['erro']}")
+        return
+
+    df_final, ordem = situacao['df'], situacao['ordem']
+    exibir_resultados_parciais(situacao)
+    exibir_tabela(len(df_final), lambda pagina, tamanho: df_final.iloc[ordem[(pagina - 1) * tamanho:pagina * tamanho]])
+    if situacao['padroes'] is not None:
+        exibir_padroes(*situacao['padroes'], df_final.attrs['coluna_data'], df_final.attrs['coluna_descricao'],
+                       df_final.attrs['coluna_valor'])
+
+# Só a página: os processos do pool de uploads, iniciados com spawn, importam este
+# script como __mp_main__ e carregam apenas as definições acima (ver GerenciadorUploads)
+if __name__ == '__main__':
+    st.set_page_config(layout="wide")
+    st.title("💸 Dashboard de Análise de Extratos")
+
+    fonte = st.sidebar.radio("Fonte dos dados", ["Upload de CSV", "Banco local"])
+
+    if fonte == "Banco local":
+        st.caption(f"Transações do banco local `{ARQUIVO_BANCO}`, gerado pelo pipeline.")
+
+        if not os.path.exists(ARQUIVO_BANCO):
+            st.info(f"Banco '{ARQUIVO_BANCO}' não encontrado. Rode o pipeline com ARQUIVO_SAIDA .sqlite.")
+        else:
+            versao = os.path.getmtime(ARQUIVO_BANCO)
+            primeira, ultima = consultar_intervalo_banco(ARQUIVO_BANCO, versao)
+            if primeira is None:
+                st.info(f"O banco '{ARQUIVO_BANCO}' ainda não tem transações. Rode o pipeline para carregá-lo.")
+            else:
+                periodo = st.sidebar.date_input("Período", value=(primeira.date(), ultima.date()),
+                                                min_value=primeira.date(), max_value=ultima.date())
+                # Enquanto o usuário escolhe o intervalo, o date_input devolve só a data inicial.
+                # Os limites são date: o filtro vai até o fim do último dia (< fim + 1 dia).
+                inicio, fim = periodo if len(periodo) == 2 else (periodo[0], ultima.date())
+
+                with st.spinner('Consultando o banco...'):
+                    kpis, despesas_por_categoria, despesas_mensais, despesas_no_tempo, total = consultar_banco(
+                        ARQUIVO_BANCO, versao, inicio, fim)
+                exibir_painel(*kpis, despesas_por_categoria, despesas_mensais, despesas_no_tempo, total,
+                              lambda pagina, tamanho: consultar_pagina_banco(ARQUIVO_BANCO, versao, inicio, fim, pagina, tamanho))
+                exibir_padroes(*consultar_padroes_banco(ARQUIVO_BANCO, versao, inicio, fim), 'date', 'title', 'amount')
+
+    else:
+        st.caption("Faça o upload do seu extrato no formato CSV.")
+
+        # Widget de Upload
+        uploaded_file = st.file_uploader("Selecione o arquivo CSV", type=['csv'])
+
+        if uploaded_file is not None:
+
+            # O processamento roda num processo separado (ver processamento_uploads.py):
+            # esta sessão só acompanha o andamento e exibe o que já estiver pronto
+            conteudo = uploaded_file.getvalue()
+            exibir_upload(hash_conteudo(conteudo), conteudo)
+
+    # ----------------------------------------------------
+    # Instrução para Execução
+    # ----------------------------------------------------
+    st.sidebar.markdown(
+        """
+        **Instruções para Rodar:**
+        1. Salve o código como `app_streamlit.py`.
+        2. Instale as bibliotecas: `pip install streamlit pandas plotly`.
+        3. Execute no terminal: `streamlit run app_streamlit.py`.
+        """
+    )
\ No newline at end of file
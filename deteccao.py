@@ -0,0 +1,288 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import carregar_dataset, colunas_dataset
+from ciclo_fatura import atribuir_ciclo_fatura, DIA_FECHAMENTO
+from formatacao import formatar_brl
+from vetorizacao import aplicar_por_valores_distintos
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_ENTRADA = 'extratos_nubank_consolidado_analise.csv' # .csv, .parquet, .feather ou .sqlite
+TITULO_PAGAMENTO = 'Pagamento recebido'
+# Intervalo mediano (em dias) entre cobranças de cada periodicidade reconhecida
+PERIODICIDADES = {
+    'semanal': (5, 9),
+    'quinzenal': (13, 17),
+    'mensal': (26, 35),
+    'bimestral': (55, 66),
+    'trimestral': (85, 97),
+    'anual': (350, 380),
+}
+MIN_OCORRENCIAS_RECORRENTE = 3 # Cobranças necessárias para chamar um estabelecimento de recorrente
+# Regularidade exigida: desvio absoluto mediano (MAD) relativo à mediana, do intervalo e do valor.
+# O MAD ignora um mês pulado ou um reajuste isolado, que desviariam a média/desvio padrão.
+MAX_DESVIO_INTERVALO = 0.2
+MAX_DESVIO_VALOR = 0.1
+# Recorrência pelos ciclos da fatura: presente em quase todas as faturas, com valor estável,
+# mesmo sem intervalo regular (ex.: duas assinaturas com o mesmo nome em dias diferentes)
+MIN_PRESENCA_CICLOS = 0.75
+# Cobranças atípicas: escore robusto (0,6745 * (x - mediana) / MAD, com x = log do valor,
+# já que valores de compras variam em proporção) acima do limite, em estabelecimentos
+# com pelo menos MIN_HISTORICO cobranças
+LIMITE_ESCORE = 3.5
+MIN_HISTORICO = 5
+MAD_MINIMO_LOG = 0.05 # Piso do MAD (~5% do valor): preço fixo que muda não gera escore infinito
+# Tarifas e encargos: títulos (normalizados: minúsculas, sem acentos) que começam com uma
+# destas palavras, ex.: 'Multa de atraso', 'IOF de atraso'. 'Saldo em atraso' não é tarifa
+PALAVRAS_TARIFAS = ['multa', 'juros', 'iof', 'anuidade', 'tarifa']
+# Movimentações da dívida do cartão (saldo em atraso, renegociação, encerramento): não são
+# assinaturas, mesmo quando se repetem a cada fatura, e ficam fora das recorrências
+PALAVRAS_DIVIDA = ['saldo', 'renegociacao', 'encerramento']
+
+_REGEX_PARCELA = re.compile(r'\s*-\s*parcela\s*\d+\s*/\s*\d+\s*$')
+_REGEX_SEPARADORES = re.compile(r'[^a-z0-9]+')
+_REGEX_TARIFAS = re.compile(r'^(?:' + '|'.join(PALAVRAS_TARIFAS) + r')\b')
+_REGEX_DIVIDA = re.compile(r'^(?:' + '|'.join(PALAVRAS_DIVIDA) + r')\b')
+_NOMES_PERIODICIDADES = np.array(list(PERIODICIDADES) + [None], dtype=object)
+# Colunas (e tipos) de recorrencias, para o resultado vazio de um histórico sem cobranças
+_COLUNAS_RECORRENCIAS = {
+    'estabelecimento': object, 'cobrancas': 'int64', 'primeira': 'datetime64[ns]', 'ultima': 'datetime64[ns]',
+    'valor_ultimo': 'float64', 'ciclos': 'int64', 'intervalo_mediano': 'float64', 'desvio_intervalo': 'float64',
+    'valor_tipico': 'float64', 'desvio_valor': 'float64', 'total': 'float64', 'presenca_ciclos': 'float64',
+    'cobrancas_por_ciclo': 'float64', 'periodicidade': object, 'recorrente': 'bool',
+    'variacao_ultimo_pct': 'float64', 'proxima_prevista': 'datetime64[ns]', 'ativa': 'bool',
+}
+
+
+def _normalizar(titulo):
+    """'Netflix.Com - Parcela 2/10' -> ('netflix com', True): minúsculas, sem acentos, sem a parcela."""
+    texto = unicodedata.normalize('NFKD', str(titulo).lower()).encode('ascii', 'ignore').decode()
+    parcelado = _REGEX_PARCELA.search(texto) is not None
+    texto = _REGEX_PARCELA.sub('', texto)
+    return _REGEX_SEPARADORES.sub(' ', texto).strip(), parcelado
+
+
+def normalizar_titulos(titulos):
+    """Estabelecimento normalizado de cada título e se ele é uma parcela. Retorna (estabelecimentos, parcelados)."""
+    titulos = pd.Series(titulos)
+    normalizados, parcelados = aplicar_por_valores_distintos(titulos, _normalizar, dtype=(object, bool))
+    return pd.Series(normalizados, index=titulos.index), pd.Series(parcelados, index=titulos.index)
+
+
+def _casa(estabelecimentos, regex):
+    """Se cada estabelecimento casa com a regex."""
+    return aplicar_por_valores_distintos(estabelecimentos, lambda e: regex.search(e) is not None, dtype=bool)
+
+
+def _mediana_e_mad(valores, grupos):
+    """Mediana e desvio absoluto mediano de `valores` por grupo, alinhados às linhas."""
+    mediana = valores.groupby(grupos, sort=False).transform('median')
+    mad = (valores - mediana).abs().groupby(grupos, sort=False).transform('median')
+    return mediana, mad
+
+
+def _preparar(df, coluna_data, coluna_titulo, coluna_valor, sinal_gasto, dia_fechamento):
+    """
+    Cobranças (valor com o sinal de gasto, sem pagamentos), ordenadas por
+    estabelecimento e data, com o ciclo da fatura como inteiro (ano * 12 + mês)
+    e o intervalo em dias desde a cobrança anterior do mesmo estabelecimento.
+    """
+    valor = pd.to_numeric(df[coluna_valor], errors='coerce') * sinal_gasto
+    datas = pd.to_datetime(df[coluna_data])
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    cobranca = (valor > 0) & datas.notna() & df[coluna_titulo].notna()
+    cobranca &= (df[coluna_titulo] != TITULO_PAGAMENTO)
+
+    df = df[cobranca]
+    estabelecimento, parcelado = normalizar_titulos(df[coluna_titulo])
+    if 'MES_FATURA' in df.columns:
+        mes_fatura = df['MES_FATURA']
+    else:
+        mes_fatura, _ = atribuir_ciclo_fatura(datas[cobranca], dia_fechamento)
+    # 'AAAA-MM (MMM)' -> ano * 12 + mês
+    ciclo = aplicar_por_valores_distintos(mes_fatura, lambda r: int(r[:4]) * 12 + int(r[5:7]), dtype=np.int64)
+
+    posicoes = np.flatnonzero(cobranca.to_numpy())
+    base = pd.DataFrame({
+        'posicao': posicoes,
+        'estabelecimento': estabelecimento.to_numpy(),
+        'parcelado': parcelado.to_numpy(dtype=bool),
+        'data': datas[cobranca].dt.normalize().to_numpy(),
+        'valor': valor[cobranca].to_numpy(),
+        'MES_FATURA': np.asarray(mes_fatura, dtype=object),
+        'ciclo': ciclo,
+    })
+    if base.empty:
+        # Sem cobranças, os intervalos abaixo (np.r_ com o primeiro elemento) criariam uma linha vazia
+        return base
+    base['grupo'] = pd.factorize(base['estabelecimento'])[0]
+    base = base.sort_values(['grupo', 'data'], kind='stable', ignore_index=True)
+
+    mesmo_grupo = np.r_[False, base['grupo'].to_numpy()[1:] == base['grupo'].to_numpy()[:-1]]
+    intervalos = np.r_[np.nan, np.diff(base['data'].to_numpy()).astype('timedelta64[D]').astype(float)]
+    base['intervalo'] = np.where(mesmo_grupo, intervalos, np.nan)
+    base['mesmo_ciclo_anterior'] = mesmo_grupo & np.r_[False, np.diff(base['ciclo'].to_numpy()) == 0]
+    return base
+
+
+def _classificar_periodicidade(intervalo_mediano):
+    """Nome da periodicidade em que cai cada intervalo mediano (None se nenhuma)."""
+    indice = np.full(len(intervalo_mediano), len(PERIODICIDADES))
+    for i, (minimo, maximo) in enumerate(PERIODICIDADES.values()):
+        dentro = (intervalo_mediano >= minimo) & (intervalo_mediano <= maximo) & (indice == len(PERIODICIDADES))
+        indice[dentro] = i
+    return _NOMES_PERIODICIDADES[indice]
+
+
+def _recorrencias(base, data_referencia):
+    """Estatísticas por estabelecimento (sem as parcelas e a dívida) e quais são cobranças recorrentes."""
+    base = base[~(base['parcelado'].to_numpy() | _casa(base['estabelecimento'], _REGEX_DIVIDA))]
+    grupos = base['grupo']
+    intervalo_mediano, intervalo_mad = _mediana_e_mad(base['intervalo'], grupos)
+    valor_mediano, valor_mad = _mediana_e_mad(base['valor'], grupos)
+
+    estatisticas = pd.DataFrame({
+        'estabelecimento': base['estabelecimento'], 'valor': base['valor'], 'data': base['data'],
+        'ciclo': base['ciclo'], 'intervalo_mediano': intervalo_mediano,
+        'desvio_intervalo': intervalo_mad / intervalo_mediano, 'valor_tipico': valor_mediano,
+        'desvio_valor': valor_mad / valor_mediano,
+    }).groupby(grupos.to_numpy(), sort=False).agg(
+        estabelecimento=('estabelecimento', 'first'), cobrancas=('valor', 'size'),
+        primeira=('data', 'first'), ultima=('data', 'last'), valor_ultimo=('valor', 'last'),
+        primeiro_ciclo=('ciclo', 'min'), ultimo_ciclo=('ciclo', 'max'), ciclos=('ciclo', 'nunique'),
+        intervalo_mediano=('intervalo_mediano', 'first'), desvio_intervalo=('desvio_intervalo', 'first'),
+        valor_tipico=('valor_tipico', 'first'), desvio_valor=('desvio_valor', 'first'),
+        total=('valor', 'sum'),
+    )
+
+    # Comportamento entre ciclos: em quantas das faturas do período o estabelecimento aparece
+    estatisticas['presenca_ciclos'] = estatisticas['ciclos'] / (
+        estatisticas['ultimo_ciclo'] - estatisticas['primeiro_ciclo'] + 1)
+    estatisticas['cobrancas_por_ciclo'] = estatisticas['cobrancas'] / estatisticas['ciclos']
+    periodicidade = _classificar_periodicidade(estatisticas['intervalo_mediano'].to_numpy())
+    valor_estavel = estatisticas['desvio_valor'] <= MAX_DESVIO_VALOR
+    por_intervalo = (pd.notna(periodicidade) & (estatisticas['desvio_intervalo'] <= MAX_DESVIO_INTERVALO)
+                     & (estatisticas['cobrancas'] >= MIN_OCORRENCIAS_RECORRENTE))
+    por_ciclos = ((estatisticas['ciclos'] >= MIN_OCORRENCIAS_RECORRENTE)
+                  & (estatisticas['presenca_ciclos'] >= MIN_PRESENCA_CICLOS))
+    estatisticas['periodicidade'] = np.where(por_intervalo, periodicidade, np.where(por_ciclos, 'mensal', None))
+    estatisticas['recorrente'] = valor_estavel & (por_intervalo | por_ciclos)
+    estatisticas['variacao_ultimo_pct'] = (estatisticas['valor_ultimo'] / estatisticas['valor_tipico'] - 1) * 100
+    estatisticas['proxima_prevista'] = estatisticas['ultima'] + pd.to_timedelta(estatisticas['intervalo_mediano'], unit='D')
+    # Cancelada: a próxima cobrança prevista já passou há mais de meio intervalo
+    estatisticas['ativa'] = (estatisticas['proxima_prevista']
+                             + pd.to_timedelta(estatisticas['intervalo_mediano'] / 2, unit='D')) >= data_referencia
+    return estatisticas.drop(columns=['primeiro_ciclo', 'ultimo_ciclo'])
+
+
+def _anomalias(base, recorrentes_mensais):
+    """Linhas de `base` com cobrança atípica: tarifa, valor fora do histórico ou recorrência repetida no ciclo."""
+    grupos = base['grupo']
+    log_valor = np.log(base['valor'])
+    log_mediano, log_mad = _mediana_e_mad(log_valor, grupos)
+    quantidade = grupos.map(grupos.value_counts())
+    escore = 0.6745 * (log_valor - log_mediano) / np.maximum(log_mad, MAD_MINIMO_LOG)
+    valor_mediano = base['valor'].groupby(grupos, sort=False).transform('median')
+
+    tarifa = _casa(base['estabelecimento'], _REGEX_TARIFAS)
+    atipico = ((quantidade >= MIN_HISTORICO) & (escore > LIMITE_ESCORE) & ~base['parcelado']).to_numpy()
+    duplicada = base['mesmo_ciclo_anterior'].to_numpy() & base['grupo'].isin(recorrentes_mensais).to_numpy()
+
+    tipo = np.select([tarifa, duplicada, atipico], ['tarifa', 'duplicada_no_ciclo', 'valor_atipico'], None)
+    marcadas = pd.notna(tipo)
+    return base.loc[marcadas, ['posicao', 'estabelecimento', 'MES_FATURA']].assign(
+        tipo=tipo[marcadas], valor_tipico=valor_mediano[marcadas], escore=escore[marcadas])
+
+
+def detectar_padroes(df, coluna_data='date', coluna_titulo='title', coluna_valor='amount', sinal_gasto=1,
+                     dia_fechamento=DIA_FECHAMENTO, data_referencia=None):
+    """
+    Detecta cobranças recorrentes (assinaturas) e cobranças atípicas no
+    histórico, agrupando pelo título normalizado (minúsculas, sem acentos, sem
+    '- Parcela i/n'). Uma ordenação por estabelecimento e data e agregações por
+    grupo: O(n log n), sem laços por linha nem por estabelecimento.
+
+    sinal_gasto: 1 quando gastos são positivos (extrato do cartão Nubank), -1
+    quando são negativos (extrato da conta). Estornos, créditos e 'Pagamento
+    recebido' ficam de fora.
+    data_referencia: "hoje", para dizer se uma recorrência segue ativa
+    (padrão: a última data do histórico).
+
+    Retorna (recorrencias, anomalias):
+      recorrencias: um estabelecimento por linha (sem as parcelas e as
+        movimentações da dívida, ver PALAVRAS_DIVIDA), com
+        cobrancas, primeira/ultima, intervalo_mediano (dias), periodicidade,
+        valor_tipico (mediana), desvios relativos (MAD / mediana) do intervalo
+        e do valor, ciclos, presenca_ciclos (fração das faturas do período em
+        que aparece) e cobrancas_por_ciclo, variacao_ultimo_pct,
+        proxima_prevista, ativa e recorrente (intervalo regular ou presença
+        em quase todas as faturas, sempre com valor estável); ordenado por
+        recorrente e total.
+      anomalias: as transações de `df` marcadas, com estabelecimento,
+        MES_FATURA, tipo ('tarifa', 'duplicada_no_ciclo' = recorrência mensal
+        cobrada de novo na mesma fatura, 'valor_atipico' = acima do histórico
+        do estabelecimento), valor_tipico e escore; mais recentes primeiro.
+    """
+    base = _preparar(df, coluna_data, coluna_titulo, coluna_valor, sinal_gasto, dia_fechamento)
+    if base.empty:
+        # Nenhuma cobrança (ex.: período sem gastos, extrato só com receitas)
+        recorrencias = pd.DataFrame({c: pd.Series(dtype=t) for c, t in _COLUNAS_RECORRENCIAS.items()})
+        anomalias = df[[coluna_data, coluna_titulo, coluna_valor]].iloc[:0].assign(
+            estabelecimento=pd.Series(dtype=object), MES_FATURA=pd.Series(dtype=object),
+            tipo=pd.Series(dtype=object), valor_tipico=pd.Series(dtype='float64'), escore=pd.Series(dtype='float64'))
+        return recorrencias, anomalias
+    if data_referencia is None:
+        data_referencia = base['data'].max()
+
+    recorrencias = _recorrencias(base, pd.Timestamp(data_referencia))
+    # Só as recorrências de uma cobrança por fatura: uma segunda na mesma fatura é suspeita
+    mensais = recorrencias.index[recorrencias['recorrente'] & (recorrencias['periodicidade'] == 'mensal')
+                                 & (recorrencias['cobrancas_por_ciclo'] < 1.5)]
+    marcadas = _anomalias(base, mensais)
+
+    anomalias = (df[[coluna_data, coluna_titulo, coluna_valor]].iloc[marcadas['posicao'].to_numpy()]
+                 .assign(**{c: marcadas[c].to_numpy() for c in marcadas.columns if c != 'posicao'})
+                 .sort_values(coluna_data, ascending=False, kind='stable'))
+    recorrencias = (recorrencias.sort_values(['recorrente', 'total'], ascending=False, kind='stable')
+                    .reset_index(drop=True))
+    return recorrencias, anomalias
+
+
+# --- EXECUÇÃO ---
+if __name__ == '__main__':
+    presentes = colunas_dataset(ARQUIVO_ENTRADA)
+    colunas = [c for c in ('date', 'title', 'amount', 'MES_FATURA') if c in presentes]
+    recorrencias, anomalias = detectar_padroes(carregar_dataset(ARQUIVO_ENTRADA, colunas))
+
+    assinaturas = recorrencias[recorrencias['recorrente']]
+    print("=" * 70)
+    print("COBRANÇAS RECORRENTES E ATÍPICAS")
+    print(f"{len(assinaturas)} cobranças recorrentes entre {len(recorrencias)} estabelecimentos; "
+          f"{len(anomalias)} cobranças atípicas")
+    print("=" * 70)
+
+    print("\nASSINATURAS / COBRANÇAS RECORRENTES:\n")
+    print(pd.DataFrame({
+        'Estabelecimento': assinaturas['estabelecimento'],
+        'Periodicidade': assinaturas['periodicidade'],
+        'Valor típico': formatar_brl(assinaturas['valor_tipico']),
+        'Cobranças': assinaturas['cobrancas'],
+        'Próxima': assinaturas['proxima_prevista'].dt.strftime('%d/%m/%Y'),
+        'Situação': np.where(assinaturas['ativa'], 'ativa', 'sem cobrança recente'),
+    }).to_string(index=False))
+
+    reajustes = assinaturas[assinaturas['variacao_ultimo_pct'].abs() >= 1]
+    for _, r in reajustes.iterrows():
+        print(f"  * {r['estabelecimento']}: última cobrança {formatar_brl(r['valor_ultimo'])} "
+              f"({r['variacao_ultimo_pct']:+.1f}% sobre o valor típico).")
+
+    print("\nCOBRANÇAS ATÍPICAS (POR TIPO):\n")
+    print(anomalias['tipo'].value_counts().to_string())
+    print("\nMAIS RECENTES:\n")
+    print(anomalias.head(15).assign(amount=formatar_brl(anomalias['amount'].head(15)),
+                                    valor_tipico=formatar_brl(anomalias['valor_tipico'].head(15)))
+          [['date', 'title', 'amount', 'tipo', 'valor_tipico']].to_string(index=False))
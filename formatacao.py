@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from vetorizacao import aplicar_por_valores_distintos
+
+# --- CONFIGURAÇÃO ---
+SIMBOLO_MOEDA = 'R$'
+# Troca os separadores do padrão americano (1,234.56) pelos do brasileiro (1.234,56)
+_SEPARADORES_BR = str.maketrans({',': '.', '.': ','})
+
+
+def _formatar_centavos(centavos):
+    return f"{SIMBOLO_MOEDA} {centavos / 100:,.2f}".translate(_SEPARADORES_BR)
+
+
+def formatar_brl(valores):
+    """
+    Formata valores em reais no padrão brasileiro ('R$ 1.234,56'; negativos
+    como 'R$ -1.234,56'), sem depender do locale do sistema.
+
+    Aceita um número ou um array/Series; uma Series volta como Series 'string'
+    com o mesmo índice, e valores ausentes viram <NA>.
+    """
+    if np.ndim(valores) == 0:
+        return None if pd.isna(valores) else _formatar_centavos(round(float(valores) * 100))
+
+    serie = pd.Series(valores) if not isinstance(valores, pd.Series) else valores
+    numeros = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    validos = ~np.isnan(numeros)
+
+    centavos = np.rint(numeros[validos] * 100).astype(np.int64)
+    textos = np.full(len(numeros), None, dtype=object)
+    textos[validos] = aplicar_por_valores_distintos(centavos, _formatar_centavos)
+
+    resultado = pd.Series(textos, index=serie.index, dtype='string')
+    return resultado if isinstance(valores, pd.Series) else resultado.to_numpy()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from ciclo_fatura import DIA_FECHAMENTO
+
+# --- CONFIGURAÇÃO ---
+# Estabelecimentos sintéticos e o valor típico de cada compra (R$). A frequência
+# segue uma distribuição de Zipf pela ordem da lista: poucos estabelecimentos
+# concentram a maioria das transações, como nos extratos reais.
+ESTABELECIMENTOS = [
+    ('Supermercado Guanabara', 180.0),
+    ('Amazonprimebr', 19.9),
+    ('Rederj', 45.0),
+    ('Uber *Trip', 22.0),
+    ('Ifood *Restaurante', 55.0),
+    ('Metro Rj', 7.5),
+    ('Riocardmais', 50.0),
+    ('Amazon Prime Canais', 29.9),
+    ('Padaria Pao Quente', 18.0),
+    ('Posto Shell', 150.0),
+    ('Netflix.Com', 44.9),
+    ('Spotify', 21.9),
+    ('Tim*Tim', 59.99),
+    ('Prezunic', 95.0),
+    ('Lojas Americanas', 120.0),
+    ('Shopee *Oncomercioshop', 65.0),
+    ('Drogaria Raia', 70.0),
+    ('Cinema Kinoplex', 40.0),
+    ('Livraria Travessa', 85.0),
+    ('Farmacia Pacheco', 60.0),
+]
+EXPOENTE_ZIPF = 1.1
+PROPORCAO_ESTORNOS = 0.01 # Fração das compras que voltam como "Estorno de ..."
+PROPORCAO_PARCELADAS = 0.05 # Fração das compras com sufixo "- Parcela i/n"
+DIA_PAGAMENTO = 23 # Dia em que a linha "Pagamento recebido" entra no extrato
+TITULO_PAGAMENTO = 'Pagamento recebido'
+
+
+def _sortear_compras(rng, num_linhas):
+    """Títulos e valores das compras, sorteados pela distribuição de Zipf."""
+    nomes = np.array([nome for nome, _ in ESTABELECIMENTOS], dtype=object)
+    valores_tipicos = np.array([valor for _, valor in ESTABELECIMENTOS])
+
+    pesos = 1.0 / np.arange(1, len(ESTABELECIMENTOS) + 1) ** EXPOENTE_ZIPF
+    escolhidos = rng.choice(len(ESTABELECIMENTOS), size=num_linhas, p=pesos / pesos.sum())
+
+    # Variação log-normal em torno do valor típico (sempre positiva)
+    valores = np.round(valores_tipicos[escolhidos] * rng.lognormal(0.0, 0.35, num_linhas), 2)
+    titulos = nomes[escolhidos]
+
+    parceladas = rng.random(num_linhas) < PROPORCAO_PARCELADAS
+    if parceladas.any():
+        total = rng.integers(2, 13, parceladas.sum())
+        parcela = rng.integers(1, total + 1)
+        sufixos = np.char.add(np.char.add(' - Parcela ', parcela.astype(str)), np.char.add('/', total.astype(str)))
+        titulos[parceladas] = titulos[parceladas] + sufixos.astype(object)
+
+    estornos = rng.random(num_linhas) < PROPORCAO_ESTORNOS
+    titulos[estornos] = 'Estorno de "' + titulos[estornos] + '"'
+    valores[estornos] = -valores[estornos]
+    return titulos, valores
+
+
+def gerar_extrato_mensal(ano, mes, num_linhas, rng=None, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Gera o extrato de uma fatura (esquema real: date, title, amount).
+
+    As compras caem no ciclo da fatura (do dia seguinte ao fechamento no mês
+    anterior até o fechamento), e o extrato termina com o "Pagamento recebido"
+    da fatura anterior. Linhas ordenadas da mais recente para a mais antiga,
+    como no arquivo exportado pelo Nubank.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_compras = max(num_linhas - 1, 0)
+
+    fim = pd.Timestamp(year=ano, month=mes, day=dia_fechamento)
+    inicio = fim - pd.DateOffset(months=1) + pd.Timedelta(days=1)
+    dias_ciclo = (fim - inicio).days + 1
+    datas = inicio + pd.to_timedelta(rng.integers(0, dias_ciclo, num_compras), unit='D')
+
+    titulos, valores = _sortear_compras(rng, num_compras)
+
+    # O pagamento quita aproximadamente o total de compras do ciclo
+    pagamento = -round(max(valores.sum(), 0.0) * rng.uniform(0.9, 1.0), 2)
+    data_pagamento = inicio.replace(day=min(DIA_PAGAMENTO, inicio.days_in_month))
+
+    df = pd.DataFrame({
+        'date': np.append(datas.to_numpy(), np.datetime64(data_pagamento, 'ns')),
+        'title': np.append(titulos, TITULO_PAGAMENTO),
+        'amount': np.append(valores, pagamento),
+    })
+    if num_linhas == 0:
+        df = df.iloc[:0]
+    return df.sort_values('date', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def gerar_extratos_sinteticos(pasta_destino, num_linhas, num_meses=12, ultimo_mes='2025-10',
+                              semente=42, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Grava `num_meses` extratos Nubank_AAAA-MM-23.csv em `pasta_destino`, somando
+    `num_linhas` transações (divididas igualmente entre os meses), terminando
+    na fatura de `ultimo_mes`. A mesma semente gera sempre os mesmos arquivos.
+
+    Retorna a lista de caminhos gerados, do mais antigo para o mais recente.
+    """
+    pasta_destino = Path(pasta_destino)
+    pasta_destino.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semente)
+
+    meses = pd.period_range(end=pd.Period(ultimo_mes, freq='M'), periods=num_meses, freq='M')
+    linhas_por_mes = np.full(num_meses, num_linhas // num_meses)
+    linhas_por_mes[:num_linhas % num_meses] += 1
+
+    arquivos = []
+    for periodo, linhas in zip(meses, linhas_por_mes):
+        df = gerar_extrato_mensal(periodo.year, periodo.month, int(linhas), rng, dia_fechamento)
+        arquivo = pasta_destino / f"Nubank_{periodo.year}-{periodo.month:02d}-{DIA_PAGAMENTO}.csv"
+        df.to_csv(arquivo, index=False, date_format='%Y-%m-%d', float_format='%.2f', encoding='utf-8')
+        arquivos.append(arquivo)
+    return arquivos
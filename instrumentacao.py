@@ -0,0 +1,228 @@
+import cProfile
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# --- CONFIGURAÇÃO ---
+NUM_FUNCOES_PERFIL = 20 # Funções mais custosas (tempo acumulado) guardadas no modo perfil
+NUM_EXECUCOES_HISTORICO = 5 # Execuções comparadas lado a lado em `python instrumentacao.py <arquivo>`
+
+
+class Instrumentacao:
+    """
+    Métricas por etapa de uma execução do pipeline: tempo, linhas de entrada e
+    de saída, bytes lidos e, com memoria=True, pico de memória.
+
+    memoria: liga o tracemalloc durante a execução para medir o pico de cada
+    etapa (NumPy e pandas registram suas alocações nele). Deixa tudo bem mais
+    lento, por isso é opcional.
+    perfil: roda a execução sob o cProfile; as funções mais custosas entram no
+    resumo e o perfil completo pode ser salvo com salvar_perfil().
+
+    Limites com workers (num_workers > 1 no pipeline): o cProfile só perfila a
+    thread que chamou capturar(), então nem as threads de um ThreadPoolExecutor
+    nem os processos filhos aparecem no perfil. O tracemalloc vale para o
+    processo inteiro: o pico de uma etapa do processo principal inclui as
+    alocações das threads que rodavam ao mesmo tempo, mas não as de processos
+    filhos. As etapas medidas dentro de um worker (ver incorporar) têm tempo e
+    linhas completos, mas nunca pico de memória: no resumo, ficam com
+    em_worker=True e o pico aparece como indisponível ('n/d').
+
+    Etapas podem ser aninhadas (ex.: leitura dentro de extracao); uma etapa
+    executada várias vezes (uma por extrato) é somada no resumo.
+
+    Uso:
+        inst = Instrumentacao(memoria=True)
+        with inst.capturar():
+            with inst.etapa('leitura', bytes_lidos=tamanho) as medicao:
+                df = pd.read_csv(arquivo)
+                medicao['linhas_saida'] = len(df)
+        inst.imprimir_relatorio()
+        inst.salvar_json('metricas.jsonl')
+    """
+
+    def __init__(self, memoria=False, perfil=False):
+        self.memoria = memoria
+        self.perfil = perfil
+        self.medicoes = []
+        self.inicio = datetime.now()
+        self.total_segundos = None
+        self._ativas = []
+        self._perfilador = None
+
+    @contextmanager
+    def capturar(self):
+        """Envolve a execução inteira: liga o tracemalloc/cProfile e mede o tempo total."""
+        ligou_memoria = self.memoria and not tracemalloc.is_tracing()
+        if ligou_memoria:
+            tracemalloc.start()
+        if self.perfil:
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+        self.inicio = datetime.now()
+        inicio = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total_segundos = time.perf_counter() - inicio
+            if self.perfil:
+                self._perfilador.disable()
+            if ligou_memoria:
+                tracemalloc.stop()
+
+    def _atualizar_picos(self):
+        """Leva o pico desde a última leitura a todas as etapas em andamento."""
+        if not (self.memoria and tracemalloc.is_tracing()):
+            return
+        _, pico = tracemalloc.get_traced_memory()
+        for medicao in self._ativas:
+            medicao['pico_mb'] = max(medicao['pico_mb'] or 0, pico / 1024 ** 2)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None, bytes_lidos=None):
+        """
+        Mede o bloco `with` como a etapa `nome`. Devolve o dict da medição, para
+        o bloco preencher o que só se sabe no fim (ex.: medicao['linhas_saida']).
+        """
+        medicao = {'etapa': nome, 'nivel': len(self._ativas), 'segundos': None,
+                   'linhas_entrada': linhas_entrada, 'linhas_saida': None,
+                   'bytes_lidos': bytes_lidos, 'pico_mb': None, 'em_worker': False}
+        self.medicoes.append(medicao)
+        self._atualizar_picos()
+        self._ativas.append(medicao)
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            medicao['segundos'] = time.perf_counter() - inicio
+            self._atualizar_picos()
+            self._ativas.pop()
+
+    def incorporar(self, medicoes):
+        """
+        Acrescenta medições feitas num worker, abaixo da etapa atual. O pico de
+        memória delas não é medido (ver a docstring da classe).
+        """
+        for medicao in medicoes:
+            self.medicoes.append(dict(medicao, nivel=medicao['nivel'] + len(self._ativas), pico_mb=None,
+                                      em_worker=True))
+
+    # -----------------------------------------------------------------
+    # RESULTADOS
+    # -----------------------------------------------------------------
+
+    def resumo(self):
+        """
+        Uma linha por etapa (na ordem em que apareceram), somando as execuções
+        repetidas: etapa, nivel, chamadas, segundos, linhas_entrada, linhas_saida,
+        bytes_lidos, linhas_por_segundo, pico_mb (máximo entre as execuções) e
+        em_worker (alguma execução num worker, sem pico de memória medido).
+        """
+        etapas = {}
+        for medicao in self.medicoes:
+            r = etapas.setdefault(medicao['etapa'], {
+                'etapa': medicao['etapa'], 'nivel': medicao['nivel'], 'chamadas': 0, 'segundos': 0.0,
+                'linhas_entrada': None, 'linhas_saida': None, 'bytes_lidos': None, 'pico_mb': None,
+                'em_worker': False,
+            })
+            r['chamadas'] += 1
+            r['em_worker'] |= medicao.get('em_worker', False)
+            r['segundos'] += medicao['segundos'] or 0.0
+            for chave in ('linhas_entrada', 'linhas_saida', 'bytes_lidos'):
+                if medicao[chave] is not None:
+                    r[chave] = (r[chave] or 0) + int(medicao[chave])
+            if medicao['pico_mb'] is not None:
+                r['pico_mb'] = max(r['pico_mb'] or 0, medicao['pico_mb'])
+
+        for r in etapas.values():
+            linhas = r['linhas_saida'] if r['linhas_saida'] is not None else r['linhas_entrada']
+            r['linhas_por_segundo'] = linhas / r['segundos'] if linhas is not None and r['segundos'] > 0 else None
+        return list(etapas.values())
+
+    def funcoes_mais_custosas(self, n=NUM_FUNCOES_PERFIL):
+        """As `n` funções com maior tempo acumulado no cProfile (modo perfil)."""
+        if self._perfilador is None:
+            return []
+        estatisticas = pstats.Stats(self._perfilador).stats
+        ordenadas = sorted(estatisticas.items(), key=lambda item: item[1][3], reverse=True)[:n]
+        return [{'funcao': f"{Path(arquivo).name}:{linha}({nome})", 'chamadas': nc,
+                 'segundos_proprios': tt, 'segundos_acumulados': ct}
+                for (arquivo, linha, nome), (_, nc, tt, ct, _) in ordenadas]
+
+    def salvar_perfil(self, caminho):
+        """Grava o perfil completo do cProfile (abre com pstats ou snakeviz)."""
+        if self._perfilador is None:
+            raise ValueError("Perfil não capturado: use Instrumentacao(perfil=True).")
+        self._perfilador.dump_stats(caminho)
+
+    def para_dict(self, contexto=None):
+        """Resumo da execução num dict serializável em JSON."""
+        registro = {
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'total_segundos': self.total_segundos,
+            'contexto': contexto or {},
+            'etapas': self.resumo(),
+        }
+        if self.perfil:
+            registro['perfil'] = self.funcoes_mais_custosas()
+        return registro
+
+    def salvar_json(self, caminho, contexto=None):
+        """Acrescenta o resumo como uma linha do arquivo JSON Lines `caminho` (histórico de execuções)."""
+        with open(caminho, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.para_dict(contexto), ensure_ascii=False, default=str) + '\n')
+
+    def imprimir_relatorio(self):
+        total = self.total_segundos or sum(r['segundos'] for r in self.resumo() if r['nivel'] == 0)
+        print("=" * 86)
+        print(f"{'Etapa':<26}{'Chamadas':>9}{'Tempo (s)':>11}{'% total':>9}{'Linhas':>12}{'MB lidos':>10}{'Pico (MB)':>11}")
+        for r in self.resumo():
+            linhas = r['linhas_saida'] if r['linhas_saida'] is not None else r['linhas_entrada']
+            linhas = '-' if linhas is None else f"{linhas:,}"
+            lidos = '-' if r['bytes_lidos'] is None else f"{r['bytes_lidos'] / 1024 ** 2:.1f}"
+            if self.memoria and r['em_worker']:
+                pico = 'n/d' # Medida num worker, onde a memória não é acompanhada
+            else:
+                pico = '-' if r['pico_mb'] is None else f"{r['pico_mb']:.1f}"
+            print(f"{'  ' * r['nivel'] + r['etapa']:<26}{r['chamadas']:>9}{r['segundos']:>11.3f}"
+                  f"{r['segundos'] / total if total else 0:>9.1%}{linhas:>12}{lidos:>10}{pico:>11}")
+        print("=" * 86)
+        for funcao in self.funcoes_mais_custosas(10):
+            print(f"{funcao['segundos_acumulados']:>10.3f}s  {funcao['chamadas']:>9,}x  {funcao['funcao']}")
+
+
+def carregar_historico(caminho):
+    """
+    Lê o JSON Lines gravado por salvar_json: um DataFrame com uma linha por
+    (execução, etapa), para acompanhar a evolução das etapas ao longo do tempo.
+    """
+    linhas = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for texto in f:
+            if not texto.strip():
+                continue
+            registro = json.loads(texto)
+            for etapa in registro['etapas']:
+                linhas.append({'inicio': registro['inicio'], 'total_segundos': registro['total_segundos'],
+                               **registro['contexto'], **etapa})
+    return pd.DataFrame(linhas)
+
+
+# --- EXECUÇÃO ---
+# Ex.: python instrumentacao.py extratos_nubank_metricas.jsonl
+# Mostra o tempo de cada etapa nas últimas execuções registradas.
+if __name__ == '__main__':
+    historico = carregar_historico(sys.argv[1])
+    ultimas = sorted(historico['inicio'].unique())[-NUM_EXECUCOES_HISTORICO:]
+    tabela = (historico[historico['inicio'].isin(ultimas)]
+              .pivot_table(index='etapa', columns='inicio', values='segundos', aggfunc='sum', sort=False))
+    print("Tempo por etapa (s) nas últimas execuções:\n")
+    print(tabela.round(3).to_string())
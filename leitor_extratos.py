@@ -0,0 +1,138 @@
+import io
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError: # Sem pyarrow: leitura pelo motor C do pandas, também tipada (ver _ler_com_pandas)
+    pa = None
+
+# --- CONFIGURAÇÃO ---
+# Esquema do extrato exportado pelo Nubank: date (AAAA-MM-DD), title (texto) e amount (número com ponto)
+COLUNA_DATA = 'date'
+COLUNA_TITULO = 'title'
+COLUNA_VALOR = 'amount'
+# Formatos de data aceitos, testados em ordem: ISO 8601 (o do Nubank, com ou sem hora)
+# e o dia/mês/ano dos extratos exportados por outros bancos e pelo Excel
+FORMATOS_DATA = ['ISO8601', '%d/%m/%Y']
+BLOCO_BYTES_PYARROW = 1 << 20 # Bytes lidos por vez pelo leitor em streaming do PyArrow
+
+
+def _fonte(fonte):
+    """O PyArrow aceita caminhos em str e buffers binários (ex.: io.BytesIO do upload)."""
+    return fonte if hasattr(fonte, 'read') else str(fonte)
+
+
+def ler_cabecalho(fonte):
+    """Nomes das colunas, lendo só a primeira linha. Buffers voltam para o início."""
+    if hasattr(fonte, 'read'):
+        posicao = fonte.tell()
+        primeira = fonte.readline()
+        fonte.seek(posicao)
+        return list(pd.read_csv(io.BytesIO(primeira) if isinstance(primeira, bytes) else io.StringIO(primeira),
+                                nrows=0).columns)
+    return list(pd.read_csv(fonte, nrows=0).columns)
+
+
+def _converter_datas(df, coluna_data):
+    """Converte a coluna de data (lida como texto) tentando cada formato de FORMATOS_DATA."""
+    if coluna_data is None or coluna_data not in df.columns:
+        return df
+    for formato in FORMATOS_DATA[:-1]:
+        try:
+            df[coluna_data] = pd.to_datetime(df[coluna_data], format=formato).dt.as_unit('ns')
+            return df
+        except ValueError:
+            pass
+    df[coluna_data] = pd.to_datetime(df[coluna_data], format=FORMATOS_DATA[-1]).dt.as_unit('ns')
+    return df
+
+
+def _ler_com_pandas(fonte, dtypes, coluna_data, colunas, chunksize):
+    dtypes = dict(dtypes)
+    if coluna_data is not None:
+        dtypes[coluna_data] = 'string'
+    leitor = pd.read_csv(fonte, dtype=dtypes, usecols=colunas, chunksize=chunksize)
+    if chunksize:
+        return (_converter_datas(chunk, coluna_data) for chunk in leitor)
+    return _converter_datas(leitor, coluna_data)
+
+
+def _opcoes_pyarrow(dtypes, colunas):
+    # A data não tem tipo declarado: com os parsers de FORMATOS_DATA, o PyArrow a reconhece
+    # como timestamp (com fuso, se o texto tiver '+00:00'), sem passar por objetos Python
+    tipos = {coluna: pa.float64() if dtype == 'float64' else pa.string() for coluna, dtype in dtypes.items()}
+    parsers = [pa_csv.ISO8601 if formato == 'ISO8601' else formato for formato in FORMATOS_DATA]
+    return pa_csv.ConvertOptions(column_types=tipos, timestamp_parsers=parsers, include_columns=colunas or [])
+
+
+def _para_pandas(tabela, dtypes, coluna_data):
+    reconhecida = False
+    if coluna_data is not None and coluna_data in tabela.column_names:
+        # Datas sem hora são inferidas como date32 (que viraria objetos date no pandas):
+        # a conversão para timestamp em ns é feita ainda no Arrow
+        tipo = tabela.schema.field(coluna_data).type
+        reconhecida = pa.types.is_date(tipo) or pa.types.is_timestamp(tipo)
+        if reconhecida:
+            fuso = tipo.tz if pa.types.is_timestamp(tipo) else None
+            indice = tabela.column_names.index(coluna_data)
+            tabela = tabela.set_column(indice, coluna_data, tabela[coluna_data].cast(pa.timestamp('ns', tz=fuso)))
+
+    df = tabela.to_pandas()
+    for coluna, dtype in dtypes.items():
+        if dtype == 'string' and coluna in df.columns:
+            df[coluna] = df[coluna].astype('string')
+    if not reconhecida:
+        # Nenhum parser reconheceu a coluna inteira (ex.: bloco só com datas vazias)
+        df = _converter_datas(df, coluna_data)
+    return df
+
+
+def _blocos_pyarrow(leitor, tamanho_chunk, dtypes, coluna_data):
+    """Reagrupa os lotes do leitor em streaming em DataFrames de exatamente `tamanho_chunk` linhas."""
+    pendentes, linhas = [], 0
+    for lote in leitor:
+        pendentes.append(lote)
+        linhas += lote.num_rows
+        while linhas >= tamanho_chunk:
+            tabela = pa.Table.from_batches(pendentes, schema=leitor.schema)
+            yield _para_pandas(tabela.slice(0, tamanho_chunk), dtypes, coluna_data)
+            resto = tabela.slice(tamanho_chunk)
+            pendentes, linhas = resto.to_batches(), resto.num_rows
+    if linhas:
+        yield _para_pandas(pa.Table.from_batches(pendentes, schema=leitor.schema), dtypes, coluna_data)
+
+
+def ler_extrato(fonte, coluna_data=COLUNA_DATA, coluna_titulo=COLUNA_TITULO, coluna_valor=COLUNA_VALOR,
+                colunas=None, chunksize=None):
+    """
+    Lê um CSV de extrato numa única passada tipada, sem inferir os tipos das
+    colunas do esquema: data como datetime64 (FORMATOS_DATA), título como
+    'string' e valor como float64. As demais colunas são inferidas.
+
+    Usa o leitor CSV do PyArrow (multithread) quando instalado; sem ele, o
+    motor C do pandas com os mesmos dtypes declarados. Colunas do esquema que
+    não existirem no arquivo são ignoradas; use None para não declarar uma delas.
+
+    fonte: caminho ou buffer binário (ex.: o upload do dashboard).
+    colunas: lista opcional com as únicas colunas a ler.
+    chunksize: se informado, devolve um iterador de DataFrames com esse número
+    de linhas (modo streaming), em vez de um DataFrame.
+    Valores fora do esquema (ex.: data inválida) geram erro, como antes.
+    """
+    presentes = set(colunas or ler_cabecalho(fonte))
+    if coluna_data not in presentes:
+        coluna_data = None
+    dtypes = {coluna: dtype for coluna, dtype in ((coluna_titulo, 'string'), (coluna_valor, 'float64'))
+              if coluna is not None and coluna in presentes and coluna != coluna_data}
+
+    if pa is None:
+        return _ler_com_pandas(fonte, dtypes, coluna_data, colunas, chunksize)
+
+    opcoes = _opcoes_pyarrow(dtypes, colunas)
+    if chunksize:
+        leitor = pa_csv.open_csv(_fonte(fonte), read_options=pa_csv.ReadOptions(block_size=BLOCO_BYTES_PYARROW),
+                                 convert_options=opcoes)
+        return _blocos_pyarrow(leitor, chunksize, dtypes, coluna_data)
+    return _para_pandas(pa_csv.read_csv(_fonte(fonte), convert_options=opcoes), dtypes, coluna_data)
@@ -0,0 +1,285 @@
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from categorizacao import categorizar_descricoes
+from consulta import Consulta
+from deteccao import detectar_padroes
+from leitor_extratos import ler_cabecalho, ler_extrato
+from serie_temporal import reduzir_resolucao
+
+# --- CONFIGURAÇÃO ---
+# Os uploads do dashboard são processados em processos separados (ver GerenciadorUploads),
+# fora da thread que atende a sessão: enquanto um extrato grande é lido, as demais
+# sessões (e a própria página, que mostra o andamento) continuam respondendo
+NUM_PROCESSOS = max(1, (os.cpu_count() or 2) - 1) # Uploads processados ao mesmo tempo; os demais esperam na fila
+MAX_TAREFAS = 8 # Uploads mantidos (prontos ou não); os prontos menos usados recentemente são descartados
+LIMITE_ANOMALIAS_EXIBIDAS = 100 # Cobranças atípicas mais recentes enviadas à tabela
+PROGRESSO_LEITURA = 0.5 # Fração da barra de progresso ocupada pela leitura e categorização
+
+
+def _converter_valores_texto(valores):
+    """
+    Valores lidos como texto: 'R$ -1.234,56' (formato brasileiro, com vírgula
+    decimal e ponto de milhar) ou '-1234.56'. Os não numéricos viram NaN.
+    """
+    texto = valores.astype(str).str.replace('R$', '', regex=False).str.replace(r'\s', '', regex=True)
+    brasileiro = texto.str.contains(',', regex=False)
+    texto = texto.where(~brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce')
+
+
+def process_uploaded_csv(uploaded_file):
+    """
+    Lê e padroniza o DataFrame de extrato CSV, consolidando Crédito e Débito.
+    """
+    # 1. Padronização das Colunas (Adaptando para extratos típicos)
+    # Só o cabeçalho é lido aqui: as colunas são identificadas antes da leitura,
+    # para que ela já saia tipada
+    colunas = ler_cabecalho(uploaded_file)
+
+# Tenta identificar as colunas automaticamente
+# Procura por colunas que podem conter datas, valores e descrições
+    date_col = None
+    value_col = None
+    description_col = None
+
+    for col in colunas:
+        col_lower = col.lower()
+        if any(word in col_lower for word in ['data', 'date', 'dt']):
+            date_col = col
+        elif any(word in col_lower for word in ['valor', 'value', 'amount', 'quantia']):
+            value_col = col
+        elif any(word in col_lower for word in ['descricao', 'description', 'historico', 'desc']):
+            description_col = col
+
+    # Se não encontrou as colunas, usa as primeiras disponíveis (ainda não usadas),
+    # ex.: 'title' no extrato do Nubank (date,title,amount)
+    if not date_col and len(colunas) > 0:
+        date_col = colunas[0]
+    livres = [col for col in colunas if col not in (date_col, value_col)]
+    if not value_col and livres:
+        value_col = livres.pop(0)
+    if not description_col and livres:
+        description_col = livres[0]
+
+    # 2. Leitura do CSV direto do buffer binário, numa passada tipada: data, valor
+    # (float) e descrição (string) já convertidos (ver leitor_extratos.py)
+    try:
+        df = ler_extrato(uploaded_file, date_col, description_col, value_col)
+    except ValueError:
+        # Arquivo fora do esquema (ex.: valores como 'R$ 1.234,56' ou datas em outro
+        # formato): leitura sem tipos e limpeza dos valores como texto
+        uploaded_file.seek(0)
+        df = pd.read_csv(uploaded_file, sep=",", encoding='utf-8')
+        df[value_col] = _converter_valores_texto(df[value_col])
+        if date_col:
+            df[date_col] = pd.to_datetime(df[date_col], errors='coerce', dayfirst=True)
+
+    # Remove linhas com valores NaN
+    df = df.dropna(subset=[value_col])
+
+    # Colunas identificadas, para as análises que dependem delas (ex.: detecção de recorrências)
+    df.attrs['coluna_data'] = date_col
+    df.attrs['coluna_descricao'] = description_col
+    df.attrs['coluna_valor'] = value_col
+
+    # Categoriza as transações
+    if description_col:
+        df['categoria'] = categorizar_descricoes(df[description_col])
+    else:
+        df['categoria'] = 'Outros'
+
+    # Datas inválidas/ausentes (NaT) ficam de fora
+    if date_col:
+        df = df.dropna(subset=[date_col])
+        df['mes_ano'] = df[date_col].dt.to_period('M').astype(str)
+    else:
+        df['mes_ano'] = 'N/A'
+
+    return df
+
+
+# Agregados do upload: cada um é uma consulta preguiçosa (ver consulta.py) que lê
+# só as colunas usadas, sem copiar o DataFrame inteiro
+def calcular_kpis(df):
+    valor = df.attrs['coluna_valor']
+    por_sinal = (Consulta(df)
+                 .derivar('sinal', lambda d: np.sign(d[valor]), [valor])
+                 .agrupar(['sinal'], coluna_valor=valor)
+                 .executar().set_index('sinal')['soma'])
+    receitas = por_sinal.get(1, 0)
+    despesas = abs(por_sinal.get(-1, 0))
+    saldo = receitas - despesas
+    return receitas, despesas, saldo
+
+
+def calcular_despesas_por_categoria(df):
+    # Apenas despesas (valores negativos), em valor absoluto
+    despesas = Consulta(df).com_sinal(-1).agrupar(['categoria'], coluna_valor=df.attrs['coluna_valor']).executar()
+    return despesas.assign(Valor=despesas['soma'].abs())[['categoria', 'Valor']]
+
+
+def calcular_despesas_mensais(df):
+    despesas = Consulta(df).com_sinal(-1).agrupar(['mes_ano'], coluna_valor=df.attrs['coluna_valor']).executar()
+    return despesas.assign(Valor=despesas['soma'].abs())[['mes_ano', 'Valor']]
+
+
+def calcular_despesas_no_tempo(df):
+    # Despesas por dia, reduzidas a semana/mês/... conforme o período, para que o
+    # gráfico receba no máximo MAX_PONTOS_GRAFICO pontos (ver serie_temporal.py)
+    por_dia = (Consulta(df).com_sinal(-1)
+               .derivar('dia', lambda d: d[df.attrs['coluna_data']].dt.normalize(), [df.attrs['coluna_data']])
+               .agrupar(['dia'], coluna_valor=df.attrs['coluna_valor']).executar())
+    return reduzir_resolucao(por_dia.set_index('dia')['soma'].abs())
+
+
+def calcular_padroes(df):
+    """(recorrências, anomalias mais recentes, total de anomalias); None sem data ou descrição."""
+    if not (df.attrs['coluna_data'] and df.attrs['coluna_descricao']):
+        return None
+    # No extrato da conta, gastos são negativos (sinal_gasto=-1)
+    recorrencias, anomalias = detectar_padroes(df, df.attrs['coluna_data'], df.attrs['coluna_descricao'],
+                                               df.attrs['coluna_valor'], sinal_gasto=-1)
+    return recorrencias, anomalias.head(LIMITE_ANOMALIAS_EXIBIDAS), len(anomalias)
+
+
+def ordenar_transacoes(df):
+    # Ordem da tabela (mais recentes primeiro), calculada uma vez por upload: cada
+    # página é só um fatiamento dessas posições, sem reordenar a cada rerun
+    return (df[df.attrs['coluna_data']].reset_index(drop=True)
+            .sort_values(ascending=False, kind='stable').index.to_numpy())
+
+
+# Resultados parciais, na ordem em que ficam prontos para o dashboard: primeiro os
+# KPIs, depois os gráficos e, por último, a detecção de padrões (a mais demorada)
+ETAPAS = [
+    ('kpis', 'Calculando receitas, despesas e saldo', calcular_kpis),
+    ('por_categoria', 'Agrupando as despesas por categoria', calcular_despesas_por_categoria),
+    ('mensais', 'Agrupando as despesas por mês', calcular_despesas_mensais),
+    ('no_tempo', 'Montando a série de despesas', calcular_despesas_no_tempo),
+    ('padroes', 'Procurando assinaturas e cobranças atípicas', calcular_padroes),
+]
+
+
+def _executar_tarefa(conteudo, estado):
+    """
+    Processa um upload num processo do pool. Cada resultado parcial de ETAPAS
+    é publicado em `estado` (um dict do Manager, lido pelo dashboard) assim que
+    fica pronto; o andamento vai na chave 'andamento', uma tupla pequena
+    (etapa, progresso, etapas prontas), a única lida a cada consulta.
+    Retorna (DataFrame do extrato, ordem da tabela).
+    """
+    prontas = ()
+    estado['andamento'] = ('Lendo e categorizando o extrato', 0.0, prontas)
+    df = process_uploaded_csv(io.BytesIO(conteudo))
+    for i, (nome, descricao, funcao) in enumerate(ETAPAS):
+        estado['andamento'] = (descricao, PROGRESSO_LEITURA + (1 - PROGRESSO_LEITURA) * i / (len(ETAPAS) + 1), prontas)
+        # O resultado é publicado antes de a etapa constar como pronta
+        estado[nome] = funcao(df)
+        prontas += (nome,)
+    estado['andamento'] = ('Ordenando as transações', 1 - (1 - PROGRESSO_LEITURA) / (len(ETAPAS) + 1), prontas)
+    return df, ordenar_transacoes(df)
+
+
+class GerenciadorUploads:
+    """
+    Fila de processamento dos uploads do dashboard: cada upload vira uma
+    tarefa num pool de processos, e a sessão que o enviou só consulta o
+    andamento, sem ficar presa à leitura e à categorização. Com mais uploads
+    que processos, os excedentes esperam na fila do pool.
+
+    As tarefas são chaveadas pelo hash do conteúdo: o mesmo arquivo enviado
+    por várias sessões (ou a cada rerun) é processado uma única vez. São
+    mantidas até max_tarefas; além disso, as prontas menos usadas
+    recentemente são descartadas. O DataFrame devolvido é compartilhado entre
+    sessões e deve ser tratado como somente leitura.
+
+    Uso:
+        gerenciador = GerenciadorUploads()
+        gerenciador.submeter(chave, conteudo)
+        situacao = gerenciador.situacao(chave) # repetido até situacao['concluida']
+
+    Uma tarefa pronta pode ser descartada entre duas consultas (por uploads de
+    outras sessões): situacao() devolve None, e o upload deve ser submetido de novo.
+
+    Cada resultado parcial atravessa o Manager uma única vez: depois de lido,
+    fica guardado junto da tarefa, e as consultas seguintes só leem o andamento.
+    """
+
+    def __init__(self, num_processos=NUM_PROCESSOS, max_tarefas=MAX_TAREFAS):
+        # spawn em todas as plataformas: o fork (padrão no Linux) copiaria o servidor do
+        # Streamlit, que tem várias threads, e o processo filho poderia travar em locks
+        # herdados delas. Com spawn, cada processo importa o script principal (o
+        # dashboard, que o Streamlit instala como __main__) como __mp_main__: a página
+        # fica sob `if __name__ == '__main__'` e só as definições são carregadas
+        self.contexto = multiprocessing.get_context('spawn')
+        self.num_processos = num_processos
+        self.max_tarefas = max_tarefas
+        self.executor = ProcessPoolExecutor(max_workers=num_processos, mp_context=self.contexto)
+        self.manager = self.contexto.Manager() # Guarda o andamento de cada tarefa, visível aos dois lados
+        self.tarefas = OrderedDict() # chave -> (futuro, estado, resultados já lidos do estado)
+        self.trava = threading.Lock() # Sessões diferentes rodam em threads diferentes
+
+    def submeter(self, chave, conteudo):
+        """Enfileira o upload, a menos que ele já esteja na fila ou pronto. Tarefas com erro são refeitas."""
+        with self.trava:
+            if chave in self.tarefas:
+                futuro = self.tarefas[chave][0]
+                if not futuro.done() or futuro.exception() is None:
+                    self.tarefas.move_to_end(chave)
+                    return
+            estado = self.manager.dict(andamento=('Na fila', 0.0, ()))
+            try:
+                futuro = self.executor.submit(_executar_tarefa, conteudo, estado)
+            except BrokenProcessPool:
+                # Um processo morreu no meio de uma tarefa (ex.: falta de memória) e o pool
+                # não aceita mais nada: um novo é criado
+                self.executor = ProcessPoolExecutor(max_workers=self.num_processos, mp_context=self.contexto)
+                futuro = self.executor.submit(_executar_tarefa, conteudo, estado)
+            self.tarefas[chave] = (futuro, estado, {})
+            self.tarefas.move_to_end(chave)
+            self._descartar_excedentes(manter=chave)
+
+    def _descartar_excedentes(self, manter):
+        # Tarefas na fila ou em andamento nunca são descartadas (alguma sessão espera por
+        # elas), nem a que acabou de ser submetida, mesmo que já tenha terminado
+        prontas = [chave for chave, (futuro, _, _) in self.tarefas.items() if futuro.done() and chave != manter]
+        for chave in prontas[:max(0, len(self.tarefas) - self.max_tarefas)]:
+            del self.tarefas[chave]
+
+    def situacao(self, chave):
+        """
+        Andamento da tarefa: etapa, progresso (0 a 1), os resultados parciais
+        já prontos (chaves de ETAPAS), concluida e erro (texto ou None). Depois
+        de concluída sem erro, também df e ordem (ver _executar_tarefa).
+        None se a chave não foi submetida ou se a tarefa já foi descartada.
+        """
+        with self.trava:
+            tarefa = self.tarefas.get(chave)
+            if tarefa is None:
+                return None
+            futuro, estado, resultados = tarefa
+            self.tarefas.move_to_end(chave)
+        # done() antes do andamento: uma tarefa concluída já publicou todos os parciais
+        concluida = futuro.done()
+        etapa, progresso, prontas = estado['andamento']
+        for nome in prontas:
+            if nome not in resultados:
+                resultados[nome] = estado[nome]
+        situacao = dict(resultados, etapa=etapa, progresso=progresso, concluida=concluida,
+                        erro=None, df=None, ordem=None)
+        if concluida:
+            erro = futuro.exception()
+            if erro is not None:
+                situacao['erro'] = f"{type(erro).__name__}: {erro}"
+            else:
+                situacao['df'], situacao['ordem'] = futuro.result()
+        return situacao
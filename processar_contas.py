@@ -0,0 +1,141 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# --- CONFIGURAÇÃO ---
+PASTA_SAIDA = Path('saida') # Cada conta ganha uma subpasta com o nome da pasta de extratos
+FORMATO_SAIDA = '.csv' # .csv, .parquet, .feather ou .sqlite (ver armazenamento.py)
+NOME_CONSOLIDADO = 'extratos_nubank_consolidado_analise'
+NOME_POR_FATURA = 'extratos_nubank_final_por_fatura'
+NOME_ANALISE_SEMANAL = 'analise_semanal.csv'
+NOME_RELATORIO = 'relatorio.txt' # Tudo o que as etapas imprimem, por conta
+NOME_MANIFESTO = 'extratos_nubank_manifesto.json'
+NOME_METRICAS = 'metricas.jsonl'
+COLUNA_DATA = 'date'
+
+
+def processar_conta(pasta_conta, pasta_saida, formato=FORMATO_SAIDA, modo_incremental=False,
+                    num_workers=1, tipo_executor='thread', tamanho_chunk=None, dia_fechamento=None,
+                    gravar_metricas=False, conciliar=False):
+    """
+    Roda extração -> ciclo de fatura -> análise semanal para uma conta (uma
+    pasta com os extratos CSV) e grava tudo em `pasta_saida`.
+
+    A saída impressa pelas etapas vai para relatorio.txt, para que contas
+    processadas ao mesmo tempo não misturem as mensagens. Fica no nível do
+    módulo para poder ser enviada a um ProcessPoolExecutor.
+    Retorna um dict com conta, transacoes, segundos e erro (None se deu certo).
+    """
+    # Os scripts só são importados aqui: quem só pede --help não paga pelo pandas
+    pipeline = importlib.import_module('Pipeline_Nubank')
+    por_fatura = importlib.import_module('analise-semanal-nubank')
+    semanal = importlib.import_module('analise-semana')
+    from armazenamento import carregar_dataset
+    from ciclo_fatura import DIA_FECHAMENTO
+
+    pasta_conta, pasta_saida = Path(pasta_conta), Path(pasta_saida)
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    arquivo_consolidado = pasta_saida / (NOME_CONSOLIDADO + formato)
+    dia_fechamento = DIA_FECHAMENTO if dia_fechamento is None else dia_fechamento
+
+    resultado = {'conta': pasta_conta.name, 'transacoes': None, 'segundos': None, 'erro': None}
+    inicio = time.perf_counter()
+    relatorio = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(relatorio):
+            df = pipeline.criar_pipeline_nubank_etl(
+                pasta_conta, arquivo_consolidado, COLUNA_DATA, modo_incremental=modo_incremental,
+                arquivo_manifesto=pasta_saida / NOME_MANIFESTO, num_workers=num_workers,
+                tipo_executor=tipo_executor, tamanho_chunk=tamanho_chunk,
+                arquivo_metricas=pasta_saida / NOME_METRICAS if gravar_metricas else None,
+                dia_fechamento=dia_fechamento, conciliar=conciliar,
+            )
+            if not arquivo_consolidado.exists():
+                raise FileNotFoundError(f"Nenhum extrato CSV em '{pasta_conta}'.")
+            if df is None:
+                # Modo streaming/incremental no banco: o consolidado só existe em disco
+                df = carregar_dataset(arquivo_consolidado, coluna_data=COLUNA_DATA)
+
+            por_fatura.apply_transformations_intervalos(df, COLUNA_DATA, dia_fechamento,
+                                                        arquivo_saida=pasta_saida / (NOME_POR_FATURA + formato))
+            semanal.analisar_semanas(arquivo_consolidado).to_csv(pasta_saida / NOME_ANALISE_SEMANAL,
+                                                                 index=False, encoding='utf-8')
+        resultado['transacoes'] = len(df)
+    except Exception as e:
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+        relatorio.write(traceback.format_exc())
+    finally:
+        resultado['segundos'] = time.perf_counter() - inicio
+        (pasta_saida / NOME_RELATORIO).write_text(relatorio.getvalue(), encoding='utf-8')
+    return resultado
+
+
+def processar_contas(pastas_contas, pasta_saida=PASTA_SAIDA, contas_em_paralelo=None, **opcoes):
+    """
+    Processa várias contas ao mesmo tempo, cada uma num processo (as etapas
+    são limitadas pela CPU, então threads disputariam o GIL). A saída de cada
+    conta vai para pasta_saida/<nome da pasta da conta>.
+
+    contas_em_paralelo: processos simultâneos (None = um por CPU, até o número de contas).
+    opcoes: repassadas a processar_conta (formato, modo_incremental, num_workers, ...).
+    Retorna a lista de resultados de processar_conta, na ordem das pastas.
+    """
+    pastas_contas = [Path(pasta) for pasta in pastas_contas]
+    nomes = [pasta.name for pasta in pastas_contas]
+    repetidos = {nome for nome in nomes if nomes.count(nome) > 1}
+    if repetidos:
+        raise ValueError(f"Contas com o mesmo nome de pasta gravariam na mesma saída: {', '.join(sorted(repetidos))}")
+
+    pasta_saida = Path(pasta_saida)
+    contas_em_paralelo = contas_em_paralelo or min(len(pastas_contas), os.cpu_count() or 1)
+    if contas_em_paralelo <= 1:
+        return [processar_conta(pasta, pasta_saida / pasta.name, **opcoes) for pasta in pastas_contas]
+
+    with ProcessPoolExecutor(max_workers=contas_em_paralelo) as executor:
+        futuros = [executor.submit(processar_conta, pasta, pasta_saida / pasta.name, **opcoes)
+                   for pasta in pastas_contas]
+        return [futuro.result() for futuro in futuros]
+
+
+def imprimir_resumo(resultados):
+    print(f"{'Conta':<30}{'Transações':>12}{'Tempo (s)':>12}  Situação")
+    for r in resultados:
+        transacoes = '-' if r['transacoes'] is None else f"{r['transacoes']:,}"
+        print(f"{r['conta']:<30}{transacoes:>12}{r['segundos']:>12.2f}  {r['erro'] or 'OK'}")
+
+
+# --- EXECUÇÃO ---
+# Ex.: python processar_contas.py extratos/conta_pessoal extratos/conta_empresa --saida saida --formato .parquet
+#      python processar_contas.py extratos/* --incremental --contas-em-paralelo 4
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Extração, ciclo de fatura e análise semanal dos extratos Nubank de uma ou mais contas.")
+    parser.add_argument('contas', nargs='+', type=Path, help="Pastas com os extratos CSV (uma por conta)")
+    parser.add_argument('--saida', type=Path, default=PASTA_SAIDA,
+                        help="Pasta de saída; cada conta ganha uma subpasta (padrão: %(default)s)")
+    parser.add_argument('--formato', default=FORMATO_SAIDA, choices=['.csv', '.parquet', '.feather', '.sqlite'])
+    parser.add_argument('--incremental', action='store_true', help="Reprocessa só os extratos novos/alterados")
+    parser.add_argument('--contas-em-paralelo', type=int, help="Contas processadas ao mesmo tempo (padrão: uma por CPU)")
+    parser.add_argument('--num-workers', type=int, default=1, help="Extratos lidos em paralelo dentro de cada conta")
+    parser.add_argument('--tipo-executor', default='thread', choices=['thread', 'process'])
+    parser.add_argument('--tamanho-chunk', type=int, help="Modo streaming: linhas por bloco")
+    parser.add_argument('--dia-fechamento', type=int, help="Último dia do ciclo da fatura (padrão: o de ciclo_fatura.py)")
+    parser.add_argument('--conciliar', action='store_true',
+                        help="Grava o pareamento de estornos/créditos e pagamentos com a sua origem")
+    parser.add_argument('--metricas', action='store_true', help=f"Grava as métricas de cada etapa em {NOME_METRICAS}")
+    args = parser.parse_args()
+
+    resultados = processar_contas(args.contas, args.saida, args.contas_em_paralelo, formato=args.formato,
+                                  modo_incremental=args.incremental, num_workers=args.num_workers,
+                                  tipo_executor=args.tipo_executor, tamanho_chunk=args.tamanho_chunk,
+                                  dia_fechamento=args.dia_fechamento, gravar_metricas=args.metricas,
+                                  conciliar=args.conciliar)
+    imprimir_resumo(resultados)
+    if any(r['erro'] for r in resultados):
+        raise SystemExit(1)
@@ -0,0 +1,222 @@
+import pandas as pd
+
+from armazenamento import carregar_dataset, colunas_dataset, salvar_dataset
+from categorizacao import categorizar_descricoes
+from ciclo_fatura import atribuir_ciclo_fatura, DIA_FECHAMENTO
+from formatacao import formatar_brl
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_ENTRADA = 'extratos_nubank_consolidado_analise.csv' # .csv, .parquet, .feather ou .sqlite
+ARQUIVO_SAIDA = 'extratos_nubank_series_diarias.csv' # Gasto diário, janelas móveis e acumulado da fatura
+JANELAS_DIAS = [7, 30, 90] # Janelas do gasto móvel total (gasto_7d, gasto_30d, ...)
+JANELA_MEDIA_CATEGORIA = 30 # Dias da média móvel diária de cada categoria
+TITULO_PAGAMENTO = 'Pagamento recebido'
+COLUNA_CATEGORIA = 'categoria'
+# Resoluções testadas, da mais fina para a mais grossa, por reduzir_resolucao
+RESOLUCOES = [('D', 'dia'), ('W', 'semana'), ('MS', 'mês'), ('QS', 'trimestre'), ('YS', 'ano')]
+MAX_PONTOS_GRAFICO = 400 # Pontos enviados por série a um gráfico, qualquer que seja o período
+
+
+def gasto_diario(df, coluna_data='date', coluna_valor='amount', coluna_titulo='title',
+                 coluna_categoria=COLUNA_CATEGORIA):
+    """
+    Matriz dia x categoria com a soma dos gastos (sem 'Pagamento recebido'),
+    indexada por um DatetimeIndex diário contínuo: dias sem transação valem 0.
+
+    A categoria vem da coluna `coluna_categoria`, se existir (ex.: no banco
+    SQLite); senão, é derivada do título. Linhas sem data são ignoradas.
+    """
+    datas = pd.to_datetime(df[coluna_data])
+    if datas.dt.tz is not None:
+        # O dia vale no fuso do extrato; o índice diário fica sem fuso
+        datas = datas.dt.tz_localize(None)
+    validas = datas.notna()
+    if coluna_titulo in df.columns:
+        validas &= (df[coluna_titulo] != TITULO_PAGAMENTO).fillna(True)
+
+    df = df[validas]
+    if coluna_categoria in df.columns:
+        categorias = df[coluna_categoria]
+    else:
+        categorias = categorizar_descricoes(df[coluna_titulo])
+    valor = pd.to_numeric(df[coluna_valor], errors='coerce')
+
+    diario = (valor.groupby([datas[validas].dt.normalize().rename(coluna_data), categorias.rename(COLUNA_CATEGORIA)],
+                            observed=True)
+              .sum()
+              .unstack(fill_value=0.0))
+    diario.columns.name = None
+    if diario.empty:
+        return diario
+    return diario.asfreq('D', fill_value=0.0).sort_index(axis=1)
+
+
+def janelas_moveis(diario, janelas=JANELAS_DIAS, dia_fechamento=DIA_FECHAMENTO):
+    """
+    Série diária do gasto total: gasto_dia, um gasto_<n>d por janela (soma
+    móvel dos últimos n dias, incluindo o dia), MES_FATURA e acumulado_fatura
+    (gasto acumulado desde o início do ciclo da fatura do dia).
+    """
+    total = diario.sum(axis=1)
+    resultado = {'gasto_dia': total}
+    for janela in janelas:
+        resultado[f'gasto_{janela}d'] = total.rolling(f'{janela}D').sum()
+
+    mes_fatura, _ = atribuir_ciclo_fatura(pd.Series(diario.index, index=diario.index), dia_fechamento)
+    resultado['MES_FATURA'] = mes_fatura
+    resultado['acumulado_fatura'] = total.groupby(mes_fatura.to_numpy(), sort=False).cumsum()
+    return pd.DataFrame(resultado, index=diario.index)
+
+
+def medias_moveis_categoria(diario, janela=JANELA_MEDIA_CATEGORIA):
+    """Média móvel do gasto diário de cada categoria nos últimos `janela` dias."""
+    return diario.rolling(f'{janela}D').mean()
+
+
+def variacao_mensal(diario):
+    """
+    Gasto por mês civil e a variação em relação ao mês anterior (em reais e
+    em %). O primeiro e o último mês podem estar incompletos.
+    """
+    gasto = diario.sum(axis=1).resample('MS').sum()
+    return pd.DataFrame({'gasto': gasto, 'variacao': gasto.diff(), 'variacao_pct': gasto.pct_change() * 100})
+
+
+def reduzir_resolucao(serie, max_pontos=MAX_PONTOS_GRAFICO):
+    """
+    Soma a série (indexada por data) na resolução mais fina de RESOLUCOES que
+    caiba em `max_pontos` pontos. Retorna (série reamostrada, nome da
+    resolução), ex.: 10 anos de gastos diários viram ~520 semanas ou 120 meses.
+    """
+    if serie.empty:
+        return serie, RESOLUCOES[0][1]
+    for frequencia, nome in RESOLUCOES:
+        reamostrada = serie.resample(frequencia).sum()
+        if len(reamostrada) <= max_pontos or frequencia == RESOLUCOES[-1][0]:
+            return reamostrada, nome
+
+
+def _inicio_ciclo(dia, dia_fechamento):
+    """Primeiro dia do ciclo da fatura que contém `dia` (o dia seguinte ao fechamento)."""
+    inicio = dia.replace(day=1) + pd.Timedelta(days=dia_fechamento)
+    return inicio if dia.day > dia_fechamento else inicio - pd.DateOffset(months=1)
+
+
+class SerieGastos:
+    """
+    Séries temporais de gasto, mantidas atualizadas à medida que chegam
+    transações de dias novos (ex.: um extrato novo, um upload no dashboard):
+
+      por_dia: gasto do dia, gastos móveis de JANELAS_DIAS e acumulado no
+               ciclo da fatura (ver janelas_moveis);
+      medias_categoria: média móvel diária de cada categoria;
+      por_mes: gasto mensal e variação mês a mês.
+
+    acrescentar() não recalcula o histórico: só os dias a partir do primeiro
+    dia afetado são refeitos, lendo para trás apenas o necessário (a maior
+    janela, o início do ciclo da fatura e o mês anterior). Transações de um
+    dia já existente somam-se a ele.
+
+    Uso:
+        serie = SerieGastos(carregar_dataset('extratos.parquet'))
+        serie.acrescentar(df_extrato_novo)
+        serie.por_dia.tail(30)
+    """
+
+    def __init__(self, df=None, janelas=JANELAS_DIAS, janela_categoria=JANELA_MEDIA_CATEGORIA,
+                 dia_fechamento=DIA_FECHAMENTO, **colunas):
+        self.janelas = list(janelas)
+        self.janela_categoria = janela_categoria
+        self.dia_fechamento = dia_fechamento
+        self.colunas = colunas # coluna_data, coluna_valor, coluna_titulo, coluna_categoria (ver gasto_diario)
+        self.diario = pd.DataFrame(index=pd.DatetimeIndex([], freq='D'))
+        self.por_dia = self.medias_categoria = self.por_mes = None
+        if df is not None:
+            self.acrescentar(df)
+
+    def acrescentar(self, df):
+        """Incorpora as transações de `df` e atualiza as séries a partir do primeiro dia afetado."""
+        novos = gasto_diario(df, **self.colunas)
+        if novos.empty:
+            return self
+        if self.diario.empty:
+            self.diario = novos
+            self.por_dia = janelas_moveis(novos, self.janelas, self.dia_fechamento)
+            self.medias_categoria = medias_moveis_categoria(novos, self.janela_categoria)
+            self.por_mes = variacao_mensal(novos)
+            return self
+
+        # Dias sem transação entre o fim do histórico e os novos dias também entram (com 0)
+        afetado = min(novos.index[0], self.diario.index[-1] + pd.Timedelta(days=1))
+        self.diario = self._juntar(self.diario, novos, afetado)
+
+        # Trecho recalculado: o suficiente para as janelas, o ciclo da fatura e o mês anterior
+        contexto = min(afetado - pd.Timedelta(days=max(self.janelas + [self.janela_categoria]) - 1),
+                       _inicio_ciclo(afetado, self.dia_fechamento))
+        trecho = self.diario.loc[contexto:]
+        self.por_dia = self._substituir(self.por_dia, janelas_moveis(trecho, self.janelas, self.dia_fechamento),
+                                        afetado)
+        self.medias_categoria = self._substituir(self.medias_categoria,
+                                                 medias_moveis_categoria(trecho, self.janela_categoria), afetado)
+
+        mes_afetado = afetado.replace(day=1)
+        mensal = variacao_mensal(self.diario.loc[mes_afetado - pd.DateOffset(months=1):])
+        self.por_mes = self._substituir(self.por_mes, mensal, mes_afetado)
+        return self
+
+    @staticmethod
+    def _juntar(diario, novos, afetado):
+        """Soma `novos` aos dias a partir de `afetado` e estende o índice diário sem lacunas."""
+        colunas = diario.columns.union(novos.columns, sort=True)
+        fim = max(diario.index[-1], novos.index[-1])
+        cauda = (diario.loc[afetado:].reindex(columns=colunas, fill_value=0.0)
+                 .add(novos.reindex(columns=colunas, fill_value=0.0), fill_value=0.0)
+                 .reindex(pd.date_range(afetado, fim, freq='D', name=diario.index.name), fill_value=0.0))
+        cabeca = diario.loc[:afetado - pd.Timedelta(days=1)].reindex(columns=colunas, fill_value=0.0)
+        return pd.concat([cabeca, cauda]).asfreq('D')
+
+    @staticmethod
+    def _substituir(anterior, recalculado, afetado):
+        """Mantém as linhas anteriores a `afetado` e usa as recalculadas a partir dele."""
+        cabeca = anterior.loc[:afetado - pd.Timedelta(days=1)]
+        recalculado = recalculado.loc[afetado:]
+        if not cabeca.columns.equals(recalculado.columns):
+            # Categoria nova: até então, sua média móvel era 0
+            colunas = cabeca.columns.union(recalculado.columns, sort=True)
+            cabeca = cabeca.reindex(columns=colunas, fill_value=0.0)
+            recalculado = recalculado.reindex(columns=colunas, fill_value=0.0)
+        return pd.concat([cabeca, recalculado])
+
+
+# --- EXECUÇÃO ---
+if __name__ == '__main__':
+    presentes = colunas_dataset(ARQUIVO_ENTRADA)
+    colunas = [c for c in ('date', 'title', 'amount', COLUNA_CATEGORIA) if c in presentes]
+    serie = SerieGastos(carregar_dataset(ARQUIVO_ENTRADA, colunas))
+
+    print("=" * 70)
+    print("TENDÊNCIAS DE GASTO")
+    print(f"Período: {serie.diario.index[0]:%d/%m/%Y} a {serie.diario.index[-1]:%d/%m/%Y}")
+    print("=" * 70)
+
+    ultimo = serie.por_dia.iloc[-1]
+    for janela in serie.janelas:
+        print(f"Gasto nos últimos {janela} dias: {formatar_brl(ultimo[f'gasto_{janela}d'])}")
+    print(f"Acumulado na fatura {ultimo['MES_FATURA']}: {formatar_brl(ultimo['acumulado_fatura'])}")
+
+    print("\nVARIAÇÃO MÊS A MÊS:\n")
+    mensal = serie.por_mes.tail(6)
+    print(pd.DataFrame({
+        'Mês': mensal.index.strftime('%Y-%m'),
+        'Gasto': formatar_brl(mensal['gasto']).to_numpy(),
+        'Variação': formatar_brl(mensal['variacao']).fillna('-').to_numpy(),
+        'Variação (%)': mensal['variacao_pct'].map('{:+.1f}%'.format, na_action='ignore').fillna('-').to_numpy(),
+    }).to_string(index=False))
+
+    print(f"\nMAIORES MÉDIAS DIÁRIAS ({serie.janela_categoria} DIAS) POR CATEGORIA:\n")
+    medias = serie.medias_categoria.iloc[-1].sort_values(ascending=False).head(5)
+    for categoria, media in medias.items():
+        print(f"  {categoria}: {formatar_brl(media)}/dia")
+
+    salvar_dataset(serie.por_dia.rename_axis('date').reset_index(), ARQUIVO_SAIDA)
+    print(f"\n--- Séries diárias salvas em: {ARQUIVO_SAIDA} ---")
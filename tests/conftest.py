@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório, sem pacote
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def extrato():
+    """Fábrica de extratos no formato do Nubank: extrato(datas, titulos, valores)."""
+    def criar(datas, titulos, valores):
+        return pd.DataFrame({'date': pd.to_datetime(datas), 'title': titulos, 'amount': valores})
+    return criar
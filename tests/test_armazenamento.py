@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from armazenamento import carregar_dataset, colunas_dataset, ler_dataset_em_chunks, salvar_dataset
+
+
+@pytest.fixture
+def consolidado(extrato):
+    df = extrato(pd.date_range('2025-01-01 10:00', periods=50, freq='37h'),
+                 ['Padaria', 'Uber', 'Netflix.com', 'Mercado', 'Pagamento recebido'] * 10,
+                 [float(v) for v in range(50)])
+    return df.assign(MÊS=df['date'].dt.strftime('%m/%Y'), MES_FATURA=df['date'].dt.strftime('%b/%Y'),
+                     arquivo_origem='Nubank_2025-03-23.csv')
+
+
+@pytest.mark.parametrize('formato', ['.csv', '.parquet', '.feather'])
+def test_formatos_devolvem_os_mesmos_dados(tmp_path, consolidado, formato):
+    caminho = tmp_path / f'consolidado{formato}'
+    salvar_dataset(consolidado, caminho)
+
+    lido = carregar_dataset(caminho)
+    assert pd.api.types.is_datetime64_any_dtype(lido['date'])
+    assert (lido['date'] == consolidado['date']).all()
+    assert (lido[['title', 'amount']] == consolidado[['title', 'amount']]).all().all()
+    assert colunas_dataset(caminho) == list(consolidado.columns)
+
+    blocos = list(ler_dataset_em_chunks(caminho, 20))
+    assert [len(b) for b in blocos] == [20, 20, 10]
+    assert (pd.concat(blocos, ignore_index=True)['amount'] == consolidado['amount']).all()
+
+
+@pytest.mark.parametrize('formato', ['.parquet', '.feather'])
+def test_formatos_colunares_preservam_os_tipos(tmp_path, consolidado, formato):
+    caminho = tmp_path / f'consolidado{formato}'
+    salvar_dataset(consolidado, caminho)
+
+    lido = carregar_dataset(caminho, colunas=['date', 'MES_FATURA'])
+    assert list(lido.columns) == ['date', 'MES_FATURA']
+    assert isinstance(lido['MES_FATURA'].dtype, pd.CategoricalDtype)
+    assert (lido['MES_FATURA'].astype(str) == consolidado['MES_FATURA']).all()
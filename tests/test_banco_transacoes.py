@@ -0,0 +1,68 @@
+import datetime
+
+import pandas as pd
+
+from banco_transacoes import agregar, atualizar_banco, carregar_banco, intervalo_datas, salvar_banco
+from consulta import Consulta
+
+
+def _banco(tmp_path, datas):
+    caminho = tmp_path / 'extratos.sqlite'
+    df = pd.DataFrame({'date': pd.to_datetime(datas), 'title': 'Padaria', 'amount': 10.0,
+                       'arquivo_origem': 'Nubank_2025-03-10.csv'})
+    salvar_banco(df, caminho)
+    return caminho
+
+
+def test_upsert_mantem_repeticoes_legitimas_e_troca_o_extrato_alterado(tmp_path):
+    caminho = _banco(tmp_path, ['2025-03-01 09:00', '2025-03-01 09:00', '2025-03-02 10:00'])
+    novos = pd.DataFrame({'date': pd.to_datetime(['2025-03-01 09:00', '2025-03-01 09:00']), 'title': 'Padaria',
+                          'amount': 10.0, 'arquivo_origem': 'Nubank_2025-03-10.csv'})
+    # Reenviar as mesmas linhas não duplica nada; as duas compras iguais continuam duas
+    atualizar_banco(novos, caminho, [])
+    assert len(carregar_banco(caminho)) == 3
+
+    # Extrato alterado: as linhas antigas dele saem e as novas entram
+    atualizar_banco(novos.assign(amount=12.0), caminho, ['Nubank_2025-03-10.csv'])
+    assert carregar_banco(caminho)['amount'].tolist() == [12.0, 12.0]
+
+
+def test_agregacao_no_banco_confere_com_groupby(tmp_path):
+    datas = pd.date_range('2025-01-01 08:00', periods=120, freq='19h')
+    df = pd.DataFrame({'date': datas, 'title': ['Padaria', 'Uber', 'Pagamento recebido'] * 40,
+                       'amount': [float(v % 17) - 3 for v in range(120)], 'arquivo_origem': 'a.csv'})
+    caminho = tmp_path / 'extratos.sqlite'
+    salvar_banco(df, caminho)
+
+    resultado = agregar(caminho, ['mes_ano', 'title'], filtros={'title': ['Padaria', 'Uber']}, sinal=1)
+    gastos = df[df['title'].isin(['Padaria', 'Uber']) & (df['amount'] > 0)]
+    esperado = gastos.groupby([gastos['date'].dt.strftime('%Y-%m'), 'title'])['amount'].agg(['sum', 'count'])
+    assert resultado['soma'].tolist() == esperado['sum'].tolist()
+    assert resultado['quantidade'].tolist() == esperado['count'].tolist()
+
+
+def test_paginas_do_banco_cobrem_a_ordenacao_completa(tmp_path):
+    caminho = _banco(tmp_path, pd.date_range('2025-01-01', periods=23, freq='31h'))
+    paginas = [carregar_banco(caminho, ['date'], ordem='-date', limite=5, deslocamento=d) for d in range(0, 25, 5)]
+
+    assert [len(p) for p in paginas] == [5, 5, 5, 5, 3]
+    completa = pd.concat(paginas, ignore_index=True)['date']
+    assert completa.tolist() == sorted(carregar_banco(caminho)['date'], reverse=True)
+
+
+def test_fim_do_tipo_date_inclui_o_ultimo_dia_inteiro(tmp_path):
+    caminho = _banco(tmp_path, ['2025-03-01 09:00', '2025-03-05 15:30', '2025-03-06 00:00'])
+    periodo = (datetime.date(2025, 3, 1), datetime.date(2025, 3, 5))
+
+    no_banco = carregar_banco(caminho, filtros={'date': periodo})
+    assert list(no_banco['date'].dt.day) == [1, 5]
+    # A mesma consulta na memória (Consulta sobre um DataFrame) segue a mesma regra
+    em_memoria = Consulta(carregar_banco(caminho)).filtrar({'date': periodo}).executar()
+    assert list(em_memoria['date'].dt.day) == [1, 5]
+    assert Consulta(caminho).filtrar({'date': periodo}).agrupar([]).executar()['quantidade'].iloc[0] == 2
+
+
+def test_intervalo_de_banco_vazio(tmp_path):
+    caminho = _banco(tmp_path, [])
+    assert intervalo_datas(caminho) == (None, None)
+    assert intervalo_datas(_banco(tmp_path, ['2025-03-05 15:30'])) == (pd.Timestamp('2025-03-05 15:30'),) * 2
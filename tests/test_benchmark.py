@@ -0,0 +1,34 @@
+import pandas as pd
+
+from benchmark import _etapa_agregacao_semanal, _etapa_extracao, comparar_com_base, executar_benchmark
+from gerador_extratos import gerar_extratos_sinteticos
+
+
+def test_gerador_e_deterministico(tmp_path):
+    primeiros = gerar_extratos_sinteticos(tmp_path / 'a', 300, 3)
+    segundos = gerar_extratos_sinteticos(tmp_path / 'b', 300, 3)
+    assert [a.name for a in primeiros] == [b.name for b in segundos]
+    assert all(a.read_bytes() == b.read_bytes() for a, b in zip(primeiros, segundos))
+
+
+def test_relatorio_semanal_do_cubo_confere_com_groupby(tmp_path):
+    ctx = {'arquivos': gerar_extratos_sinteticos(tmp_path, 2_000, 4), 'num_workers': 1, 'tipo_executor': 'thread'}
+    ctx['extracao'] = _etapa_extracao(ctx)
+    por_semana, por_mes = _etapa_agregacao_semanal(ctx)
+
+    gastos = ctx['extracao'][ctx['extracao']['title'] != 'Pagamento recebido']
+    for resultado, dimensao in [(por_semana, 'SEMANA_DO_MÊS'), (por_mes, 'MÊS')]:
+        esperado = gastos.groupby(dimensao, observed=True)['amount'].agg(['sum', 'count', 'min', 'max'])
+        resultado = resultado.set_index(dimensao)
+        pd.testing.assert_series_equal(resultado['soma'], esperado['sum'], check_names=False, check_index_type=False)
+        assert (resultado['quantidade'] == esperado['count']).all()
+        assert (resultado['minimo'] == esperado['min']).all() and (resultado['maximo'] == esperado['max']).all()
+
+
+def test_regressao_de_throughput_e_apontada():
+    resultados = executar_benchmark((2, 200), ['categorizacao'], repeticoes=1)
+    assert [r['etapa'] for r in resultados] == ['extracao', 'categorizacao']
+
+    base = [dict(r, linhas_por_segundo=r['linhas_por_segundo'] * 2) for r in resultados]
+    assert [etapa for etapa, _ in comparar_com_base(resultados, base)] == ['extracao', 'categorizacao']
+    assert comparar_com_base(resultados, resultados) == []
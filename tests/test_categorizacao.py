@@ -0,0 +1,32 @@
+import itertools
+
+import pandas as pd
+
+from categorizacao import CATEGORIA_PADRAO, CATEGORIAS, categorizar_descricoes, categorize_transaction
+
+
+def _categoria_por_laco(descricao):
+    """O laço categoria -> palavra-chave que a regex compilada substituiu."""
+    descricao = str(descricao).lower()
+    for categoria, palavras in CATEGORIAS.items():
+        if any(palavra in descricao for palavra in palavras):
+            return categoria
+    return CATEGORIA_PADRAO
+
+
+def test_vence_a_primeira_categoria_do_dicionario():
+    # 'uber' aparece antes no texto, mas Alimentação vem antes de Transporte
+    assert categorize_transaction('Uber para o MERCADO') == 'Alimentação'
+    assert categorize_transaction('Netflix internet') == 'Lazer'
+    assert categorize_transaction('Pix enviado - Padaria') == 'Alimentação'
+    assert categorize_transaction('Loja de roupas') == CATEGORIA_PADRAO
+
+
+def test_confere_com_o_laco_em_todas_as_combinacoes():
+    palavras = [p for lista in CATEGORIAS.values() for p in lista] + ['loja']
+    descricoes = [f'{a.upper()} x {b}' for a, b in itertools.product(palavras, repeat=2)]
+    descricoes += [None, '', 'Supermercado']
+
+    categorias = categorizar_descricoes(pd.Series(descricoes, index=range(10, 10 + len(descricoes))))
+    assert categorias.tolist() == [_categoria_por_laco(d) for d in descricoes]
+    assert categorias.index[0] == 10
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ciclo_fatura import ROTULO_FORA_DO_PERIODO, atribuir_ciclo_fatura
+
+
+def _mapeamento_2025(datas):
+    """Tabela fixa de 2025 (intervalos 17 a 16) que atribuir_ciclo_fatura substituiu."""
+    inicios = pd.to_datetime([f'2025-{m:02d}-17' for m in range(1, 11)])
+    fins = pd.to_datetime([f'2025-{m:02d}-16' for m in range(2, 12)])
+    rotulos = [f'2025-{m:02d} ({s})' for m, s in zip(range(2, 12), ['FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL',
+                                                                    'AGO', 'SET', 'OUT', 'NOV'])]
+    mes = np.select([(datas >= i) & (datas <= f) for i, f in zip(inicios, fins)], rotulos, default='')
+    dia = datas.dt.day
+    semana = np.select([(dia >= 17) & (dia <= 23), dia >= 24, dia <= 7, dia <= 16], [1, 2, 3, 4], default=0)
+    return mes, semana
+
+
+def test_confere_com_a_tabela_fixa_de_2025():
+    datas = pd.Series(pd.date_range('2025-01-17', '2025-11-16', freq='D'))
+    mes_fatura, semana_fatura = atribuir_ciclo_fatura(datas, 16)
+
+    mes_esperado, semana_esperada = _mapeamento_2025(datas)
+    assert (mes_fatura.to_numpy() == mes_esperado).all()
+    assert (semana_fatura.to_numpy() == semana_esperada).all()
+
+
+def test_qualquer_ano_e_data_ausente():
+    datas = pd.Series(pd.to_datetime(['2023-12-20 14:30', '2024-02-29 00:00', None]), index=[7, 8, 9])
+    mes_fatura, semana_fatura = atribuir_ciclo_fatura(datas, 16)
+
+    assert mes_fatura.tolist() == ['2024-01 (JAN)', '2024-03 (MAR)', ROTULO_FORA_DO_PERIODO]
+    assert semana_fatura.tolist() == [1, 2, 0]
+    assert list(mes_fatura.index) == [7, 8, 9]
+
+
+def test_dia_de_fechamento_invalido():
+    with pytest.raises(ValueError):
+        atribuir_ciclo_fatura(pd.Series(pd.to_datetime(['2025-01-01'])), 31)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from compactacao import compactar, expandir, uso_memoria_mb, valor_formatado
+from consulta import Consulta
+from gerador_extratos import gerar_extratos_sinteticos
+from Pipeline_Nubank import criar_pipeline_nubank_etl
+
+
+def test_ida_e_volta_preserva_os_dados(tmp_path):
+    gerar_extratos_sinteticos(tmp_path / 'extratos', 3_000, 6)
+    df = criar_pipeline_nubank_etl(tmp_path / 'extratos', tmp_path / 'saida.parquet', 'date',
+                                   arquivo_manifesto=tmp_path / 'manifesto.json', arquivo_metricas=None)
+    compacto = compactar(df)
+
+    assert uso_memoria_mb(compacto) < uso_memoria_mb(df) / 2
+    assert compacto['centavos'].dtype == np.int64 and isinstance(compacto['title'].dtype, pd.CategoricalDtype)
+    volta = expandir(compacto)
+    assert list(volta.columns) == list(df.columns)
+    for coluna in df.columns:
+        assert (volta[coluna].astype(str) == df[coluna].astype(str)).all(), coluna
+
+
+def test_somas_em_centavos_sao_exatas(extrato):
+    df = extrato(['2025-01-01'] * 3 + ['2025-01-02'], ['Uber', 'Uber', 'Uber', None], [0.1, 0.2, -0.3, None])
+    compacto = compactar(df)
+
+    assert compacto['centavos'].tolist() == [10, 20, -30, pd.NA]
+    assert Consulta(compacto).agrupar([], coluna_valor='centavos').executar()['soma'].iloc[0] == 0
+    assert valor_formatado(compacto).tolist() == ['R$ 0,10', 'R$ 0,20', 'R$ -0,30', pd.NA]
+    # O DataFrame original não é alterado
+    assert df['amount'].tolist()[:3] == [0.1, 0.2, -0.3]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from conciliacao import Deduplicador, conciliar_creditos, conciliar_pagamentos
+
+
+def _processar(dedup, extratos):
+    mantidos = []
+    for df in extratos:
+        mantidos.append(dedup.filtrar(df))
+        dedup.concluir_extrato()
+    return mantidos
+
+
+def test_extrato_repetido_e_removido_inteiro(extrato):
+    df = extrato(['2025-01-10', '2025-01-11'], ['Uber', 'Padaria'], [12.5, 8.0])
+    dedup = Deduplicador()
+    primeiro, segundo, terceiro = _processar(dedup, [df, df.copy(), df.copy()])
+
+    assert len(primeiro) == 2 and segundo.empty and terceiro.empty
+    assert dedup.removidas == 4
+
+
+def test_sobreposicao_entre_extratos_consecutivos(extrato):
+    janeiro = extrato(['2025-01-20', '2025-01-22'], ['Uber', 'Mercado'], [12.5, 100.0])
+    fevereiro = extrato(['2025-01-22', '2025-02-01'], ['Mercado', 'Netflix'], [100.0, 39.9])
+    _, mantidos = _processar(Deduplicador(), [janeiro, fevereiro])
+    assert mantidos['title'].tolist() == ['Netflix']
+
+
+def test_linhas_iguais_no_mesmo_extrato_sao_mantidas(extrato):
+    # Duas passagens de metrô no mesmo dia são compras legítimas
+    dedup = Deduplicador()
+    (mantidos,) = _processar(dedup, [extrato(['2025-01-10'] * 2, ['Metro'] * 2, [5.0, 5.0])])
+    assert len(mantidos) == 2 and dedup.removidas == 0
+
+
+def test_vistas_seguem_ordenadas_e_sem_repeticao(extrato):
+    rng = np.random.default_rng(0)
+    extratos = [extrato(pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 60, 200), 'D'),
+                        rng.choice(['A', 'B', 'C'], 200), rng.integers(1, 50, 200) / 1.0)
+                for _ in range(30)]
+    dedup = Deduplicador()
+    dedup.registrar(extratos[0])
+    _processar(dedup, extratos)
+
+    todas = pd.concat(extratos)
+    unicas = todas.drop_duplicates()
+    assert np.all(np.diff(dedup._vistas) > 0)
+    assert len(dedup._vistas) == len(unicas)
+
+
+def test_estorno_pareia_com_o_debito_anterior_de_mesmo_valor(extrato):
+    df = extrato(['2025-01-05', '2025-01-08', '2025-01-09', '2025-01-10', '2025-01-12', '2025-01-13'],
+                 ['Amazon', 'Amazon', 'Estorno de "Amazon"', 'Amazon', 'Estorno de "Amazon"', 'Estorno de "Uber"'],
+                 [50.0, 30.0, -50.0, 50.0, -50.0, -9.0])
+    pares = conciliar_creditos(df).set_index('indice_credito')['indice_debito']
+
+    # O débito mais recente até a data do crédito; o de 30,00 não tem o mesmo valor
+    assert pares[[2, 4]].tolist() == [0.0, 3.0] and pd.isna(pares[5])
+
+
+def test_dois_creditos_nao_desfazem_o_mesmo_debito(extrato):
+    df = extrato(['2025-01-05', '2025-01-09', '2025-01-10'],
+                 ['Amazon', 'Estorno de "Amazon"', 'Estorno de "Amazon"'], [50.0, -50.0, -50.0])
+    pares = conciliar_creditos(df)
+    assert pares['indice_debito'].notna().tolist() == [True, False]
+
+
+def test_pagamento_quita_a_fatura_do_ciclo_anterior(extrato):
+    df = extrato(['2025-01-20', '2025-02-10', '2025-02-20', '2025-02-25', '2025-03-22'],
+                 ['Uber', 'Mercado', 'Pagamento recebido', 'Padaria', 'Pagamento recebido'],
+                 [20.0, 80.0, -100.0, 15.0, -10.0])
+    pagamentos = conciliar_pagamentos(df, dia_fechamento=16)
+
+    assert pagamentos['fatura_paga'].tolist() == ['2025-02 (FEV)', '2025-03 (MAR)']
+    assert pagamentos['total_fatura'].tolist() == [100.0, 15.0]
+    assert pagamentos['diferenca'].tolist() == [0.0, -5.0]
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from armazenamento import salvar_dataset
+from consulta import Consulta
+
+
+@pytest.fixture
+def transacoes(extrato):
+    df = extrato(pd.date_range('2025-01-03 12:00', periods=90, freq='29h'),
+                 ['Padaria', 'Uber', 'Pagamento recebido', 'Estorno', 'Netflix.com', 'Mercado'] * 15,
+                 [float(v % 23) - 4 for v in range(90)])
+    return df.assign(categoria=df['title'].str[:3], arquivo_origem='a.csv')
+
+
+@pytest.fixture
+def fontes(tmp_path, transacoes):
+    caminhos = [tmp_path / 'transacoes.parquet', tmp_path / 'transacoes.sqlite']
+    for caminho in caminhos:
+        salvar_dataset(transacoes, caminho)
+    return [transacoes] + caminhos
+
+
+def _gastos(fonte):
+    return Consulta(fonte).filtrar({'date': ('2025-01-10', '2025-03-31')}).excluir_pagamentos().com_sinal(1)
+
+
+def test_mesmo_plano_em_todas_as_fontes(fontes, transacoes):
+    por_categoria = [_gastos(f).agrupar(['categoria']).executar() for f in fontes]
+    pagina = [_gastos(f).selecionar(['date', 'title', 'amount']).ordenar('-date').limitar(10, 5).executar()
+              for f in fontes]
+
+    no_periodo = transacoes[transacoes['date'].between('2025-01-10', '2025-03-31')]
+    esperado = no_periodo[(no_periodo['title'] != 'Pagamento recebido') & (no_periodo['amount'] > 0)]
+    assert por_categoria[0]['soma'].tolist() == esperado.groupby('categoria')['amount'].sum().tolist()
+    for resultado in por_categoria[1:]:
+        pd.testing.assert_frame_equal(resultado, por_categoria[0], check_dtype=False)
+    for resultado in pagina[1:]:
+        pd.testing.assert_frame_equal(resultado, pagina[0], check_dtype=False)
+    assert len(pagina[0]) == 10 and pagina[0]['date'].is_monotonic_decreasing
+
+
+def test_derivadas_e_filtros_sobre_elas(fontes):
+    resultados = [Consulta(f).derivar('mes', lambda d: d['date'].dt.month, ['date'])
+                  .filtrar({'mes': [2, 3]}).agrupar(['mes']).executar() for f in fontes]
+    assert resultados[0]['mes'].tolist() == [2, 3]
+    for resultado in resultados[1:]:
+        pd.testing.assert_frame_equal(resultado, resultados[0], check_dtype=False)
+
+
+def test_plano_e_imutavel_e_fonte_nao_e_alterada(transacoes):
+    original = transacoes.copy()
+    base = Consulta(transacoes).com_sinal(1)
+    por_titulo = base.agrupar(['title'])
+    base.derivar('dobro', lambda d: d['amount'] * 2, ['amount']).agrupar(['dobro']).executar()
+
+    assert por_titulo.colunas_necessarias() == ['amount', 'title']
+    assert base.colunas_necessarias() is None and base._derivadas == {}
+    pd.testing.assert_frame_equal(transacoes, original)
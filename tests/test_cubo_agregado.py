@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from cubo_agregado import atualizar_cubo, combinar_cubos, construir_cubo, consultar_cubo
+
+
+def _extratos(extrato):
+    rng = np.random.default_rng(3)
+    partes = []
+    for i, inicio in enumerate(['2025-01-17', '2025-02-17', '2025-03-17']):
+        df = extrato(pd.Timestamp(inicio) + pd.to_timedelta(rng.integers(0, 28, 80), 'D'),
+                     rng.choice(['Padaria', 'Uber', 'Cinema', 'Estorno', 'Pagamento recebido'], 80),
+                     np.round(rng.uniform(-50, 300, 80), 2))
+        partes.append(df.assign(**{'MÊS': df['date'].dt.month, 'SEMANA_DO_MÊS': (df['date'].dt.day - 1) // 7 + 1,
+                                   'arquivo_origem': f'extrato_{i}.csv'}))
+    return partes
+
+
+def _por(cubo, dimensoes, **filtros):
+    return consultar_cubo(cubo, dimensoes, **filtros).set_index(dimensoes)
+
+
+def test_consultas_conferem_com_groupby(extrato):
+    df = pd.concat(_extratos(extrato), ignore_index=True)
+    cubo = construir_cubo(df, dia_fechamento=16)
+
+    despesas = df[(df['title'] != 'Pagamento recebido') & (df['amount'] > 0)]
+    esperado = despesas.groupby('SEMANA_DO_MÊS')['amount'].agg(['sum', 'count', 'min', 'max', 'mean'])
+    resultado = _por(cubo, ['SEMANA_DO_MÊS'], excluir_pagamentos=True, sinal=1)
+    np.testing.assert_allclose(resultado[['soma', 'quantidade', 'minimo', 'maximo', 'media']], esperado)
+    assert _por(cubo, ['MES_FATURA']).index.tolist() == ['2025-02 (FEV)', '2025-03 (MAR)', '2025-04 (ABR)']
+
+
+def test_atualizacao_incremental_e_blocos_conferem_com_a_reconstrucao(extrato):
+    primeiro, segundo, terceiro = _extratos(extrato)
+    alterado = segundo.assign(amount=segundo['amount'] * 2)
+    completo = construir_cubo(pd.concat([primeiro, alterado, terceiro], ignore_index=True))
+
+    anterior = construir_cubo(pd.concat([primeiro, segundo], ignore_index=True))
+    incremental = atualizar_cubo(anterior, construir_cubo(pd.concat([alterado, terceiro])), ['extrato_1.csv'])
+    por_blocos = combinar_cubos([construir_cubo(primeiro), construir_cubo(alterado.iloc[:30]),
+                                 construir_cubo(alterado.iloc[30:]), construir_cubo(terceiro)])
+    for cubo in (incremental, por_blocos):
+        for dimensoes in (['MES_FATURA', 'categoria'], ['arquivo_origem']):
+            pd.testing.assert_frame_equal(_por(cubo, dimensoes), _por(completo, dimensoes))
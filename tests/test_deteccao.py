@@ -0,0 +1,61 @@
+import pandas as pd
+
+from deteccao import detectar_padroes
+
+
+def test_sem_cobrancas_devolve_resultados_vazios(extrato):
+    # Só créditos e pagamentos: nenhuma cobrança sobra depois do filtro
+    df = extrato(['2025-01-05', '2025-02-05', '2025-02-20'],
+                 ['Estorno', 'Estorno', 'Pagamento recebido'], [-50.0, -20.0, 300.0])
+    recorrencias, anomalias = detectar_padroes(df)
+
+    assert recorrencias.empty and anomalias.empty
+    assert recorrencias['recorrente'].dtype == bool
+    assert pd.api.types.is_datetime64_any_dtype(recorrencias['ultima'])
+    assert {'tipo', 'valor_tipico', 'estabelecimento'} <= set(anomalias.columns)
+
+
+def test_historico_vazio(extrato):
+    recorrencias, anomalias = detectar_padroes(extrato([], [], []))
+    assert recorrencias.empty and anomalias.empty
+
+
+def test_extrato_da_conta_so_com_receitas(extrato):
+    df = extrato(['2025-01-05', '2025-02-05'], ['Salario', 'Salario'], [5000.0, 5000.0])
+    recorrencias, anomalias = detectar_padroes(df, sinal_gasto=-1)
+    assert recorrencias.empty and anomalias.empty
+
+
+def test_assinatura_mensal_e_detectada(extrato):
+    datas = pd.date_range('2025-01-10', periods=6, freq='MS') + pd.Timedelta(days=9)
+    df = extrato(datas, ['Netflix.com'] * 6, [39.9] * 6)
+    recorrencias, _ = detectar_padroes(df)
+
+    netflix = recorrencias.set_index('estabelecimento').loc['netflix com']
+    assert netflix['recorrente'] and netflix['periodicidade'] == 'mensal'
+
+
+def test_divida_nao_e_tarifa_nem_assinatura(extrato):
+    datas = pd.date_range('2025-01-20', periods=5, freq='MS') + pd.Timedelta(days=19)
+    df = extrato(list(datas) * 3 + ['2025-03-25', '2025-04-25'],
+                 ['Saldo em atraso'] * 5 + ['Renegociação de pendências (28/Janeiro)'] * 5
+                 + ['Encerramento de dívida'] * 5 + ['Multa de atraso', 'IOF de atraso'],
+                 [809.0, 950.0, 870.0, 910.0, 880.0] + [120.0] * 5 + [300.0] * 5 + [17.0, 3.5])
+    recorrencias, anomalias = detectar_padroes(df)
+
+    assert recorrencias['estabelecimento'].str.match('saldo|renegociacao|encerramento').sum() == 0
+    tarifas = anomalias.loc[anomalias['tipo'] == 'tarifa', 'title']
+    assert sorted(tarifas) == ['IOF de atraso', 'Multa de atraso']
+
+
+def test_valor_atipico_e_assinatura_cobrada_duas_vezes(extrato):
+    compras = pd.date_range('2025-01-03', periods=12, freq='6D')
+    assinatura = pd.date_range('2025-01-20', periods=4, freq='MS') + pd.Timedelta(days=4)
+    df = extrato(list(compras) + list(assinatura) + ['2025-03-27'],
+                 ['Mercado'] * 12 + ['Spotify'] * 5,
+                 [80.0, 95.0, 70.0, 88.0, 102.0, 76.0, 91.0, 84.0, 99.0, 73.0, 1500.0, 86.0] + [21.9] * 5)
+    _, anomalias = detectar_padroes(df)
+
+    mercado = anomalias[anomalias['title'] == 'Mercado']
+    assert mercado['amount'].tolist() == [1500.0] and mercado['tipo'].tolist() == ['valor_atipico']
+    assert set(anomalias.loc[anomalias['title'] == 'Spotify', 'tipo']) == {'duplicada_no_ciclo'}
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from formatacao import formatar_brl
+
+
+def test_numero_isolado():
+    assert formatar_brl(1234.5) == 'R$ 1.234,50'
+    assert formatar_brl(-1234567.891) == 'R$ -1.234.567,89'
+    assert formatar_brl(0.004) == 'R$ 0,00' and formatar_brl(-0.001) == 'R$ 0,00'
+    assert formatar_brl(np.int64(7)) == 'R$ 7,00'
+    assert formatar_brl(float('nan')) is None
+
+
+def test_series_mantem_indice_e_ausentes():
+    valores = pd.Series([39.9, None, -10.5, 39.9, 1e6], index=list('abcde'))
+    formatados = formatar_brl(valores)
+
+    assert formatados.dtype == 'string' and list(formatados.index) == list('abcde')
+    assert formatados.tolist() == ['R$ 39,90', pd.NA, 'R$ -10,50', 'R$ 39,90', 'R$ 1.000.000,00']
+
+
+def test_array_e_texto_numerico():
+    assert formatar_brl(np.array([0.1 + 0.2, 2.675])).tolist() == ['R$ 0,30', 'R$ 2,68']
+    assert formatar_brl(pd.Series(['12.5', 'abc'])).tolist() == ['R$ 12,50', pd.NA]
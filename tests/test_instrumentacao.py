@@ -0,0 +1,41 @@
+from gerador_extratos import gerar_extratos_sinteticos
+from instrumentacao import Instrumentacao, carregar_historico
+from Pipeline_Nubank import criar_pipeline_nubank_etl
+
+
+def test_etapas_repetidas_sao_somadas_e_aninhadas():
+    inst = Instrumentacao(memoria=True)
+    with inst.capturar():
+        with inst.etapa('extracao') as externa:
+            for linhas in (10, 20, 30):
+                with inst.etapa('leitura', bytes_lidos=100) as medicao:
+                    bytearray(1024 * 1024)
+                    medicao['linhas_saida'] = linhas
+            externa['linhas_saida'] = 60
+
+    extracao, leitura = inst.resumo()
+    assert (leitura['nivel'], leitura['chamadas'], leitura['linhas_saida'], leitura['bytes_lidos']) == (1, 3, 60, 300)
+    assert extracao['segundos'] >= leitura['segundos'] and inst.total_segundos >= extracao['segundos']
+    assert leitura['pico_mb'] >= 1 and extracao['pico_mb'] >= leitura['pico_mb']
+
+
+def test_pipeline_grava_o_historico_e_marca_as_etapas_dos_workers(tmp_path):
+    arquivos = gerar_extratos_sinteticos(tmp_path / 'extratos', 600, 3)
+    metricas = tmp_path / 'metricas.jsonl'
+    for num_workers in (1, 2):
+        inst = Instrumentacao(memoria=True)
+        criar_pipeline_nubank_etl(tmp_path / 'extratos', tmp_path / 'saida.parquet', 'date',
+                                  arquivo_manifesto=tmp_path / 'manifesto.json', num_workers=num_workers,
+                                  tipo_executor='process', instrumentacao=inst, arquivo_metricas=metricas)
+        etapas = {r['etapa']: r for r in inst.resumo()}
+        assert etapas['leitura']['chamadas'] == len(arquivos)
+        assert etapas['carga']['linhas_entrada'] == 600
+        # Medida num worker, a leitura fica sem pico de memória
+        em_worker = num_workers > 1
+        assert etapas['leitura']['em_worker'] == em_worker
+        assert (etapas['leitura']['pico_mb'] is None) == em_worker
+        assert etapas['extracao']['pico_mb'] is not None
+
+    historico = carregar_historico(metricas)
+    assert historico['num_workers'].unique().tolist() == [1, 2]
+    assert set(historico['etapa']) >= {'extracao', 'leitura', 'carga'}
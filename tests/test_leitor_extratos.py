@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+import pytest
+
+import leitor_extratos
+from leitor_extratos import ler_extrato
+
+EXTRATO = (b'date,title,amount,parcela\n'
+           b'2025-03-20,Padaria,12.50,\n'
+           b'2025-03-18,"Loja, Centro",199.90,1/3\n'
+           b'2025-03-02,Pagamento recebido,-350.00,\n')
+
+
+@pytest.fixture(params=['pyarrow', 'pandas'])
+def motor(request, monkeypatch):
+    if request.param == 'pandas':
+        monkeypatch.setattr(leitor_extratos, 'pa', None)
+    return request.param
+
+
+def test_leitura_tipada(motor):
+    df = ler_extrato(io.BytesIO(EXTRATO))
+    assert df['date'].dtype == 'datetime64[ns]' and df['amount'].dtype == 'float64'
+    assert isinstance(df['title'].dtype, pd.StringDtype)
+    assert df['title'].tolist() == ['Padaria', 'Loja, Centro', 'Pagamento recebido']
+    assert df['amount'].tolist() == [12.5, 199.9, -350.0]
+
+
+def test_motores_dao_o_mesmo_resultado(tmp_path, motor):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_bytes(EXTRATO)
+    lido = ler_extrato(caminho, colunas=['date', 'amount'])
+    assert list(lido.columns) == ['date', 'amount']
+
+    blocos = list(ler_extrato(caminho, chunksize=2))
+    assert [len(b) for b in blocos] == [2, 1]
+    pd.testing.assert_frame_equal(pd.concat(blocos, ignore_index=True)[['date', 'amount']], lido)
+
+
+def test_data_no_formato_dia_mes_ano_e_data_invalida(motor):
+    df = ler_extrato(io.BytesIO(b'date,title,amount\n20/03/2025,Padaria,12.50\n02/03/2025,Uber,8\n'))
+    assert df['date'].dt.strftime('%Y-%m-%d').tolist() == ['2025-03-20', '2025-03-02']
+    with pytest.raises(ValueError):
+        ler_extrato(io.BytesIO(b'date,title,amount\nontem,Padaria,12.50\n'))
@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+
+from armazenamento import carregar_dataset
+from conciliacao import caminho_conciliacao
+from cubo_agregado import caminho_cubo, consultar_cubo
+from gerador_extratos import gerar_extratos_sinteticos
+from Pipeline_Nubank import criar_pipeline_nubank_etl
+
+
+def _rodar(pasta, saida, **opcoes):
+    return criar_pipeline_nubank_etl(pasta, saida, 'date', arquivo_manifesto=saida.with_suffix('.json'),
+                                     arquivo_metricas=None, **opcoes)
+
+
+def _ordenada(df):
+    return df.sort_values(['arquivo_origem', 'date', 'title', 'amount'], ignore_index=True)
+
+
+def _confere_com_reconstrucao(extratos, saida, tmp_path):
+    completa = tmp_path / 'completa.parquet'
+    _rodar(extratos, completa)
+    pd.testing.assert_frame_equal(_ordenada(carregar_dataset(saida)), _ordenada(carregar_dataset(completa)))
+
+
+def test_modo_incremental_confere_com_a_reconstrucao(tmp_path):
+    extratos, saida = tmp_path / 'extratos', tmp_path / 'consolidado.parquet'
+    arquivos = gerar_extratos_sinteticos(extratos, 600, 4)
+    assert _rodar(extratos, saida, modo_incremental=True) is not None
+
+    # Nada mudou: nada é reescrito
+    assert _rodar(extratos, saida, modo_incremental=True) is None
+    _confere_com_reconstrucao(extratos, saida, tmp_path)
+
+    # Extrato novo: só ele é lido e as transações mantidas não mudam
+    (extratos / 'Nubank_2025-11-23.csv').write_text(
+        'date,title,amount\n2025-11-02,Padaria,12.34\n2025-10-30,Uber,25.00\n', encoding='utf-8')
+    _rodar(extratos, saida, modo_incremental=True)
+    _confere_com_reconstrucao(extratos, saida, tmp_path)
+
+    # Extrato alterado: as linhas antigas dele são substituídas
+    with open(arquivos[1], 'a', encoding='utf-8') as arquivo:
+        arquivo.write('2025-08-01,Livraria Cultura,45.67\n')
+    _rodar(extratos, saida, modo_incremental=True)
+    _confere_com_reconstrucao(extratos, saida, tmp_path)
+    assert (carregar_dataset(saida)['title'] == 'Livraria Cultura').sum() == 1
+
+
+@pytest.mark.parametrize('tipo_executor', ['thread', 'process'])
+def test_extracao_paralela_confere_com_a_sequencial(tmp_path, tipo_executor):
+    extratos = tmp_path / 'extratos'
+    gerar_extratos_sinteticos(extratos, 600, 5)
+    sequencial = _rodar(extratos, tmp_path / 'sequencial.parquet')
+    paralela = _rodar(extratos, tmp_path / 'paralela.parquet', num_workers=3, tipo_executor=tipo_executor)
+    pd.testing.assert_frame_equal(paralela, sequencial)
+
+
+@pytest.mark.parametrize('formato', ['.csv', '.parquet', '.sqlite'])
+def test_modo_streaming_confere_com_a_carga_em_memoria(tmp_path, formato):
+    extratos = tmp_path / 'extratos'
+    gerar_extratos_sinteticos(extratos, 900, 4)
+    _rodar(extratos, tmp_path / f'memoria{formato}')
+    assert _rodar(extratos, tmp_path / f'streaming{formato}', tamanho_chunk=100) is None
+
+    # O streaming grava as colunas de texto sem converter em categóricas (ver EscritorIncremental)
+    memoria = _ordenada(carregar_dataset(tmp_path / f'memoria{formato}'))
+    streaming = _ordenada(carregar_dataset(tmp_path / f'streaming{formato}'))
+    pd.testing.assert_frame_equal(streaming, memoria, check_dtype=False, check_categorical=False)
+    if formato != '.sqlite':
+        cubos = [consultar_cubo(carregar_dataset(caminho_cubo(tmp_path / f'{nome}{formato}')), ['MES_FATURA'])
+                 for nome in ('streaming', 'memoria')]
+        pd.testing.assert_frame_equal(*cubos, check_dtype=False, check_categorical=False)
+
+
+def test_cubo_antigo_e_removido_quando_nao_regenerado(tmp_path):
+    extratos, saida = tmp_path / 'extratos', tmp_path / 'consolidado.parquet'
+    extratos.mkdir()
+    gerar_extratos_sinteticos(extratos, 500, 3)
+    _rodar(extratos, saida, gerar_cubo=True)
+    assert caminho_cubo(saida).exists()
+
+    gerar_extratos_sinteticos(extratos, 800, 4, semente=7)
+    _rodar(extratos, saida, gerar_cubo=False)
+    assert not caminho_cubo(saida).exists()
+
+
+def test_cubo_regenerado_confere_com_a_saida(tmp_path):
+    extratos, saida = tmp_path / 'extratos', tmp_path / 'consolidado.parquet'
+    extratos.mkdir()
+    gerar_extratos_sinteticos(extratos, 500, 3)
+    _rodar(extratos, saida, gerar_cubo=True)
+
+    cubo = consultar_cubo(carregar_dataset(caminho_cubo(saida)), ['MES_FATURA'])
+    transacoes = carregar_dataset(saida)
+    assert cubo['quantidade'].sum() == transacoes['amount'].notna().sum()
+    assert abs(cubo['soma'].sum() - transacoes['amount'].sum()) < 1e-6
+
+
+def test_conciliacao_salva_os_pares_ao_lado_da_saida(tmp_path):
+    extratos, saida = tmp_path / 'extratos', tmp_path / 'consolidado.parquet'
+    extratos.mkdir()
+    (extratos / 'Nubank_2025-02-23.csv').write_text(
+        'date,title,amount\n2025-02-01,Amazonprimebr,19.90\n2025-02-05,Uber,30.00\n', encoding='utf-8')
+    (extratos / 'Nubank_2025-03-23.csv').write_text(
+        'date,title,amount\n2025-03-02,"Estorno de ""Amazonprimebr""",-19.90\n'
+        '2025-03-05,Pagamento recebido,-49.90\n', encoding='utf-8')
+    _rodar(extratos, saida, conciliar=True)
+
+    transacoes = carregar_dataset(saida)
+    creditos = carregar_dataset(caminho_conciliacao(saida, 'creditos'))
+    # Os índices apontam para as linhas da saída
+    assert transacoes.loc[creditos['indice_credito'], 'title'].tolist() == ['Estorno de "Amazonprimebr"']
+    assert transacoes.loc[creditos['indice_debito'].astype(int), 'title'].tolist() == ['Amazonprimebr']
+    pagamentos = carregar_dataset(caminho_conciliacao(saida, 'pagamentos'))
+    assert pagamentos['diferenca'].tolist() == [0.0]
+
+    # Sem conciliar, os pares antigos não ficam para trás
+    _rodar(extratos, saida)
+    assert not caminho_conciliacao(saida, 'creditos').exists()
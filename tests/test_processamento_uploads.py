@@ -0,0 +1,110 @@
+import io
+import time
+
+import pandas as pd
+import pytest
+
+from processamento_uploads import (ETAPAS, GerenciadorUploads, calcular_despesas_mensais,
+                                   calcular_despesas_por_categoria, calcular_kpis, process_uploaded_csv)
+
+EXTRATO_CONTA = b'Data,Valor,Descricao\n2025-01-01,-10.50,Uber\n2025-01-02,100.00,Salario\n'
+EXTRATO_NUBANK = b'date,title,amount\n2025-01-01,Uber,-10.50\n2025-01-02,Estorno,100.00\n'
+
+
+def test_colunas_identificadas_ficam_nos_attrs():
+    df = process_uploaded_csv(io.BytesIO(EXTRATO_CONTA))
+    assert df.attrs == {'coluna_data': 'Data', 'coluna_descricao': 'Descricao', 'coluna_valor': 'Valor'}
+    assert calcular_kpis(df) == (100.0, 10.5, 89.5)
+
+
+def test_extrato_no_formato_do_nubank():
+    df = process_uploaded_csv(io.BytesIO(EXTRATO_NUBANK))
+    assert df.attrs == {'coluna_data': 'date', 'coluna_descricao': 'title', 'coluna_valor': 'amount'}
+    for _, _, funcao in ETAPAS:
+        funcao(df)
+    assert calcular_kpis(df) == (100.0, 10.5, 89.5)
+
+
+def test_valores_em_reais_como_texto():
+    extrato = ('Data,Valor,Descricao\n'
+               '01/01/2025,"R$ -1.234,56",Aluguel\n'
+               '02/01/2025,"R$ 10,00",Estorno\n'
+               '03/01/2025,-10.50,Uber\n'
+               '04/01/2025,abc,Ilegivel\n').encode()
+    df = process_uploaded_csv(io.BytesIO(extrato))
+    assert df['Valor'].tolist() == [-1234.56, 10.0, -10.5]
+    assert df['Data'].dt.day.tolist() == [1, 2, 3]
+
+
+def test_agregados_conferem_e_nao_alteram_o_dataframe():
+    extrato = (b'Data,Valor,Descricao\n2025-01-05,-30.00,Padaria\n2025-01-20,-12.50,Uber\n'
+               b'2025-02-03,-8.00,Padaria\n2025-02-09,2500.00,Salario\n2025-02-28,-99.90,Cinema\n')
+    df = process_uploaded_csv(io.BytesIO(extrato))
+    # O DataFrame do upload é compartilhado pelas sessões sem cópia: nenhuma etapa pode alterá-lo
+    copia = df.copy()
+    for _, _, funcao in ETAPAS:
+        funcao(df)
+    pd.testing.assert_frame_equal(df, copia)
+
+    despesas = df[df['Valor'] < 0]
+    por_categoria = calcular_despesas_por_categoria(df).set_index('categoria')['Valor']
+    assert por_categoria.to_dict() == despesas.groupby('categoria')['Valor'].sum().abs().to_dict()
+    mensais = calcular_despesas_mensais(df).set_index('mes_ano')['Valor']
+    assert mensais.round(2).to_dict() == {'2025-01': 42.5, '2025-02': 107.9}
+
+
+@pytest.fixture
+def gerenciador():
+    gerenciador = GerenciadorUploads(num_processos=1, max_tarefas=1)
+    yield gerenciador
+    gerenciador.executor.shutdown()
+    gerenciador.manager.shutdown()
+
+
+def _esperar(gerenciador, chave, limite=60):
+    fim = time.monotonic() + limite
+    while not gerenciador.situacao(chave)['concluida']:
+        assert time.monotonic() < fim
+        time.sleep(0.05)
+    return gerenciador.situacao(chave)
+
+
+def test_tarefa_concluida_traz_todos_os_resultados(gerenciador):
+    gerenciador.submeter('conta', EXTRATO_CONTA)
+    gerenciador.submeter('conta', EXTRATO_CONTA) # o mesmo upload não vira outra tarefa
+    situacao = _esperar(gerenciador, 'conta')
+
+    assert situacao['erro'] is None and len(gerenciador.tarefas) == 1
+    assert situacao['kpis'] == (100.0, 10.5, 89.5)
+    assert all(nome in situacao for nome, _, _ in ETAPAS)
+    assert len(situacao['df']) == 2 and list(situacao['ordem']) == [1, 0]
+
+
+def test_resultados_parciais_atravessam_o_manager_uma_vez(gerenciador):
+    assert gerenciador.contexto.get_start_method() == 'spawn'
+    gerenciador.submeter('conta', EXTRATO_CONTA)
+    _esperar(gerenciador, 'conta')
+    # Já lidos, os parciais não são buscados de novo: só o andamento é consultado
+    _, estado, _ = gerenciador.tarefas['conta']
+    for nome, _, _ in ETAPAS:
+        del estado[nome]
+    assert gerenciador.situacao('conta')['kpis'] == (100.0, 10.5, 89.5)
+
+
+def test_tarefa_descartada_devolve_none_e_pode_ser_refeita(gerenciador):
+    gerenciador.submeter('conta', EXTRATO_CONTA)
+    _esperar(gerenciador, 'conta')
+    # Outro upload ocupa a única vaga: a tarefa pronta é descartada
+    gerenciador.submeter('nubank', EXTRATO_NUBANK)
+    _esperar(gerenciador, 'nubank')
+
+    assert gerenciador.situacao('conta') is None
+    assert gerenciador.situacao('desconhecida') is None
+    gerenciador.submeter('conta', EXTRATO_CONTA)
+    assert _esperar(gerenciador, 'conta')['kpis'] == (100.0, 10.5, 89.5)
+
+
+def test_erro_no_processamento(gerenciador):
+    gerenciador.submeter('invalido', b'a\nx\n')
+    situacao = _esperar(gerenciador, 'invalido')
+    assert situacao['erro'] and situacao['df'] is None
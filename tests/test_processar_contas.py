@@ -0,0 +1,71 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from armazenamento import carregar_dataset
+from ciclo_fatura import atribuir_ciclo_fatura
+from cubo_agregado import caminho_cubo
+from gerador_extratos import gerar_extratos_sinteticos
+from processar_contas import (NOME_ANALISE_SEMANAL, NOME_CONSOLIDADO, NOME_POR_FATURA, NOME_RELATORIO,
+                              processar_conta, processar_contas)
+
+
+@pytest.mark.parametrize('formato, tamanho_chunk', [('.parquet', None), ('.parquet', 200), ('.sqlite', None),
+                                                    ('.sqlite', 200)])
+def test_dia_fechamento_vale_para_todas_as_saidas(tmp_path, formato, tamanho_chunk):
+    extratos = tmp_path / 'conta'
+    extratos.mkdir()
+    gerar_extratos_sinteticos(extratos, 600, 4, dia_fechamento=5)
+    resultado = processar_conta(extratos, tmp_path / 'saida', formato, tamanho_chunk=tamanho_chunk,
+                                dia_fechamento=5)
+    assert resultado['erro'] is None
+
+    saida = tmp_path / 'saida'
+    por_fatura = carregar_dataset(saida / (NOME_POR_FATURA + formato))
+    esperado, _ = atribuir_ciclo_fatura(pd.to_datetime(por_fatura['date']), 5)
+    assert (por_fatura['MES_FATURA'].astype(str).to_numpy() == esperado.to_numpy()).all()
+
+    consolidado = saida / (NOME_CONSOLIDADO + formato)
+    if formato == '.sqlite':
+        banco = carregar_dataset(consolidado, ['date', 'MES_FATURA'])
+        esperado, _ = atribuir_ciclo_fatura(pd.to_datetime(banco['date']), 5)
+        assert (banco['MES_FATURA'].to_numpy() == esperado.to_numpy()).all()
+    else:
+        cubo = carregar_dataset(caminho_cubo(consolidado))
+        assert set(cubo['MES_FATURA'].astype(str)) == set(esperado)
+
+
+def test_contas_em_paralelo_e_conta_com_erro(tmp_path):
+    pessoal, empresa, vazia = tmp_path / 'pessoal', tmp_path / 'empresa', tmp_path / 'vazia'
+    gerar_extratos_sinteticos(pessoal, 300, 2)
+    gerar_extratos_sinteticos(empresa, 500, 3, semente=1)
+    vazia.mkdir()
+    resultados = processar_contas([pessoal, empresa, vazia], tmp_path / 'saida', contas_em_paralelo=3,
+                                  formato='.parquet')
+
+    assert [(r['conta'], r['transacoes']) for r in resultados] == [('pessoal', 300), ('empresa', 500), ('vazia', None)]
+    assert resultados[0]['erro'] is None and resultados[2]['erro'].startswith('FileNotFoundError')
+    for conta, linhas in (('pessoal', 300), ('empresa', 500)):
+        assert len(carregar_dataset(tmp_path / 'saida' / conta / (NOME_CONSOLIDADO + '.parquet'))) == linhas
+        assert (tmp_path / 'saida' / conta / NOME_ANALISE_SEMANAL).exists()
+    # O traceback da conta que falhou fica no relatório dela
+    assert 'Traceback' in (tmp_path / 'saida' / 'vazia' / NOME_RELATORIO).read_text(encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        processar_contas([pessoal, tmp_path / 'outra' / 'pessoal'], tmp_path / 'saida')
+
+
+def test_linha_de_comando_sai_com_erro_se_uma_conta_falhar(tmp_path):
+    gerar_extratos_sinteticos(tmp_path / 'conta', 200, 2)
+    (tmp_path / 'vazia').mkdir()
+    script = Path(__file__).resolve().parent.parent / 'processar_contas.py'
+    comando = [sys.executable, str(script), '--saida', str(tmp_path / 'saida'), '--contas-em-paralelo', '1']
+
+    ok = subprocess.run(comando + [str(tmp_path / 'conta')], capture_output=True, text=True, cwd=tmp_path)
+    assert ok.returncode == 0 and 'OK' in ok.stdout
+    falha = subprocess.run(comando + [str(tmp_path / 'conta'), str(tmp_path / 'vazia')], capture_output=True,
+                           text=True, cwd=tmp_path)
+    assert falha.returncode == 1 and 'FileNotFoundError' in falha.stdout
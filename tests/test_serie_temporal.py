@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from serie_temporal import SerieGastos, gasto_diario, janelas_moveis, reduzir_resolucao
+
+
+def _transacoes(extrato, inicio, dias, n, semente):
+    rng = np.random.default_rng(semente)
+    df = extrato(pd.Timestamp(inicio) + pd.to_timedelta(np.sort(rng.integers(0, dias, n)), 'D')
+                 + pd.to_timedelta(rng.integers(0, 86_400, n), 's'),
+                 rng.choice(['Padaria', 'Uber', 'Cinema', 'Loja', 'Pagamento recebido'], n),
+                 np.round(rng.uniform(1, 200, n), 2))
+    return df
+
+
+def test_acrescentar_confere_com_a_reconstrucao(extrato):
+    historico = _transacoes(extrato, '2024-11-01', 150, 600, 0)
+    # Um mesmo dia dividido entre duas partes, uma lacuna de dias e uma categoria nova no fim
+    partes = [historico.iloc[:200], historico.iloc[200:201], historico.iloc[201:450],
+              extrato(['2025-05-10 09:00', '2025-05-10 21:00'], ['Escola', 'Uber'], [300.0, 20.0])]
+    serie = SerieGastos(partes[0])
+    for parte in partes[1:]:
+        serie.acrescentar(parte)
+    completa = SerieGastos(pd.concat(partes, ignore_index=True))
+
+    pd.testing.assert_frame_equal(serie.diario, completa.diario)
+    pd.testing.assert_frame_equal(serie.por_dia, completa.por_dia)
+    pd.testing.assert_frame_equal(serie.medias_categoria, completa.medias_categoria)
+    pd.testing.assert_frame_equal(serie.por_mes, completa.por_mes)
+
+
+def test_janelas_e_acumulado_da_fatura(extrato):
+    df = extrato(['2025-01-10 08:00', '2025-01-16 23:00', '2025-01-17 08:00', '2025-01-20 08:00', '2025-01-20 12:00'],
+                 ['Padaria', 'Uber', 'Padaria', 'Pagamento recebido', 'Cinema'], [10.0, 20.0, 5.0, -35.0, 40.0])
+    diario = gasto_diario(df)
+    assert list(diario.columns) == ['Alimentação', 'Lazer', 'Transporte'] and len(diario) == 11
+
+    por_dia = janelas_moveis(diario, janelas=[7], dia_fechamento=16)
+    assert por_dia.loc['2025-01-16', 'gasto_7d'] == 30.0 and por_dia.loc['2025-01-20', 'gasto_7d'] == 65.0
+    # O ciclo da fatura de fevereiro começa no dia 17: o acumulado recomeça
+    assert por_dia.loc['2025-01-16', 'acumulado_fatura'] == 30.0
+    assert por_dia.loc['2025-01-20', 'acumulado_fatura'] == 45.0
+
+
+def test_resolucao_reduzida_cabe_no_grafico_e_preserva_o_total():
+    dias = pd.date_range('2015-01-01', '2024-12-31', freq='D')
+    serie = pd.Series(np.arange(len(dias), dtype=float), index=dias)
+
+    assert reduzir_resolucao(serie.iloc[:300])[1] == 'dia'
+    semanal, resolucao = reduzir_resolucao(serie, max_pontos=600)
+    assert resolucao == 'semana' and len(semanal) <= 600
+    mensal, resolucao = reduzir_resolucao(serie)
+    assert resolucao == 'mês' and len(mensal) == 120 and mensal.sum() == serie.sum()
+    assert reduzir_resolucao(serie, max_pontos=5)[1] == 'ano'
+    assert reduzir_resolucao(serie.iloc[:0])[0].empty
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from vetorizacao import aplicar_por_valores_distintos
+
+
+def test_funcao_roda_uma_vez_por_valor_distinto():
+    chamadas = []
+    resultado = aplicar_por_valores_distintos(pd.Series(['b', 'a', 'b', None, 'a']),
+                                              lambda v: chamadas.append(v) or ('-' if pd.isna(v) else v.upper()))
+    assert resultado.tolist() == ['B', 'A', 'B', '-', 'A']
+    assert chamadas[:2] == ['b', 'a'] and len(chamadas) == 3
+
+
+def test_tuplas_viram_um_array_por_item():
+    textos, longos = aplicar_por_valores_distintos(np.array(['ab', 'c', 'ab']), lambda v: (v * 2, len(v) > 1),
+                                                   dtype=(object, bool))
+    assert textos.tolist() == ['abab', 'cc', 'abab'] and longos.dtype == bool and longos.tolist() == [True, False, True]
+
+    vazios = aplicar_por_valores_distintos(np.array([], dtype=np.int64), lambda v: (v, v), dtype=(object, bool))
+    assert [len(v) for v in vazios] == [0, 0]
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+
+def aplicar_por_valores_distintos(valores, funcao, dtype=object):
+    """
+    funcao(valor) para cada linha de `valores`, calculada uma única vez por valor
+    distinto (pd.factorize) e devolvida como array NumPy alinhado às linhas.
+    Com uma tupla de dtypes, funcao devolve tuplas e sai um array por item.
+    """
+    codigos, unicos = pd.factorize(valores)
+    resultados = [funcao(valor) for valor in unicos]
+    ausentes = codigos < 0
+    if ausentes.any():
+        # Ausentes ficam com o código -1, ou seja, com o último resultado
+        resultados.append(funcao(pd.Series(valores).iloc[np.argmax(ausentes)]))
+    if isinstance(dtype, tuple):
+        itens = list(zip(*resultados)) or [()] * len(dtype)
+        return tuple(np.array(item, dtype=tipo)[codigos] for item, tipo in zip(itens, dtype))
+    return np.array(resultados, dtype=dtype)[codigos]